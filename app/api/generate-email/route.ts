@@ -1,6 +1,6 @@
 import OpenAI from 'openai';
 import { NextRequest, NextResponse } from 'next/server';
-import { Influencer, saveEmailDraft } from '../../lib/db';
+import { DASHBOARD_DRAFT_VERSION, Influencer, saveEmailDraft } from '../../lib/db';
 import { z } from 'zod';
 import { zodResponseFormat } from "openai/helpers/zod";
 
@@ -97,7 +97,7 @@ export async function POST(request: NextRequest) {
         
         // Save the email draft to the database
         if (influencer.username && email.subject && email.body) {
-          saveEmailDraft(influencer.username, email.subject, email.body);
+          saveEmailDraft(influencer.username, email.subject, email.body, DASHBOARD_DRAFT_VERSION);
           console.log('Email draft saved to database for', influencer.username);
         }
         
@@ -1,63 +1,41 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { spawn } from 'child_process';
-import path from 'path';
-import fs from 'fs';
+import { startRun } from '../../lib/runDaemon';
 
-export async function GET() {
+export async function GET(request: NextRequest) {
   try {
-    // Get the root directory of the project
-    const rootDir = path.resolve('.');
-    const progressFilePath = path.join(rootDir, 'outreach_progress.json');
-    const controlFilePath = path.join(rootDir, 'outreach_control.json');
-    
-    // Check if progress file exists - if it does and shows process is running, don't start a new one
-    if (fs.existsSync(progressFilePath)) {
-      try {
-        const progressData = JSON.parse(fs.readFileSync(progressFilePath, 'utf8'));
-        if (progressData.progress.is_running) {
-          return NextResponse.json({
-            status: 'already_running',
-            message: 'An outreach process is already running',
-            progress: progressData.progress
-          });
-        }
-      } catch (e) {
-        console.error('Error reading progress file:', e);
-        // Continue and attempt to start a new process if the file is corrupt
-      }
+    // ?resume=1 continues the last interrupted run instead of starting over
+    const resume = request.nextUrl.searchParams.get('resume') === '1';
+    // ?campaign=<name> runs a campaign from CAMPAIGNS_FILE instead of HASHTAGS
+    const campaign = request.nextUrl.searchParams.get('campaign');
+
+    // Runs execute in the resident Python daemon, which starts on first use
+    const result = await startRun('outreach', resume, campaign);
+
+    if (result.status === 'already_running') {
+      return NextResponse.json({
+        status: 'already_running',
+        message: 'An outreach process is already running',
+        progress: result.run?.progress
+      });
     }
-    
-    // Initialize control file to "run"
-    fs.writeFileSync(controlFilePath, JSON.stringify({
-      command: "run",
-      timestamp: Date.now()
-    }));
-    
-    console.log('Starting outreach.py from directory:', rootDir);
-    
-    // Start the outreach.py process with unbuffered output
-    const pythonProcess = spawn('python3', ['-u', 'outreach.py'], {
-      cwd: rootDir,
-      detached: true, // Run in the background
-      stdio: 'ignore'  // Detach stdin/stdout/stderr
-    });
-    
-    // Detach the process to run in background
-    pythonProcess.unref();
-    
+
+    if (result.status !== 'started') {
+      throw new Error(result.error || `Unexpected daemon response: ${JSON.stringify(result)}`);
+    }
+
     return NextResponse.json({
       status: 'started',
       message: 'Outreach process started',
-      pid: pythonProcess.pid
+      resume
     });
   } catch (error) {
     console.error('Error starting outreach process:', error);
-    return NextResponse.json({ 
+    return NextResponse.json({
       status: 'error',
-      message: 'Error starting outreach process', 
+      message: 'Error starting outreach process',
       error: String(error)
     }, { status: 500 });
   }
 }
 
-export const dynamic = 'force-dynamic';
\ No newline at end of file
+export const dynamic = 'force-dynamic';
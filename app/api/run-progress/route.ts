@@ -0,0 +1,44 @@
+import { NextRequest } from 'next/server';
+import { watchRun, RunProcess } from '../../lib/runDaemon';
+
+// Server-sent events with every progress update of the current run:
+// /api/run-progress?process=yolo (or outreach), with &campaign=<name> for a
+// campaign's run. The last event has done: true.
+export async function GET(request: NextRequest) {
+  const runProcess = request.nextUrl.searchParams.get('process') as RunProcess;
+  const campaign = request.nextUrl.searchParams.get('campaign');
+  if (runProcess !== 'outreach' && runProcess !== 'yolo') {
+    return new Response(JSON.stringify({ error: 'process must be outreach or yolo' }), { status: 400 });
+  }
+
+  const encoder = new TextEncoder();
+  let close: (() => void) | null = null;
+  const stream = new ReadableStream({
+    async start(controller) {
+      try {
+        close = await watchRun(runProcess, (data) => {
+          controller.enqueue(encoder.encode(`data: ${JSON.stringify(data)}\n\n`));
+          if (data.done) {
+            controller.close();
+          }
+        }, campaign);
+      } catch (error) {
+        controller.enqueue(encoder.encode(`data: ${JSON.stringify({ done: true, error: String(error) })}\n\n`));
+        controller.close();
+      }
+    },
+    cancel() {
+      close?.();
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      Connection: 'keep-alive'
+    }
+  });
+}
+
+export const dynamic = 'force-dynamic';
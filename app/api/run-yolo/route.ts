@@ -1,71 +1,32 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { spawn } from 'child_process';
-import path from 'path';
-import fs from 'fs/promises';
+import { startRun, stopRun } from '../../lib/runDaemon';
 
-// Track running process
-let runningProcess: any = null;
-
-export async function GET() {
+export async function GET(request: NextRequest) {
   try {
-    // Check if there's already a running process
-    const controlFile = path.join(process.cwd(), 'yolo_control.json');
-    const progressFile = path.join(process.cwd(), 'yolo_progress.json');
+    // ?resume=1 continues the last interrupted run instead of starting over
+    const resume = request.nextUrl.searchParams.get('resume') === '1';
+    // ?campaign=<name> runs a campaign from CAMPAIGNS_FILE instead of HASHTAGS
+    const campaign = request.nextUrl.searchParams.get('campaign');
     
-    try {
-      const control = JSON.parse(await fs.readFile(controlFile, 'utf-8'));
-      const progress = JSON.parse(await fs.readFile(progressFile, 'utf-8'));
-      
-      // Check if process is actually running
-      if (progress.is_running) {
-        return NextResponse.json({ 
-          status: 'already_running',
-          message: 'YOLO process is already running',
-          progress: progress.latest_update
-        });
-      }
-    } catch (error) {
-      // Files don't exist or can't be read, which is fine
-    }
+    // Runs execute in the resident Python daemon, which starts on first use
+    const result = await startRun('yolo', resume, campaign);
     
-    // Clear any existing progress files
-    try {
-      await fs.unlink(progressFile);
-    } catch (error) {
-      // File doesn't exist, which is fine
+    if (result.status === 'already_running') {
+      return NextResponse.json({ 
+        status: 'already_running',
+        message: 'YOLO process is already running',
+        progress: result.run?.progress
+      });
     }
     
-    // Start the YOLO process
-    const scriptPath = path.join(process.cwd(), 'yolo_outreach.py');
-    
-    runningProcess = spawn('python', [scriptPath], {
-      cwd: process.cwd(),
-      env: { ...process.env },
-      detached: false
-    });
-    
-    runningProcess.on('error', (error: any) => {
-      console.error('Failed to start YOLO process:', error);
-      runningProcess = null;
-    });
-    
-    runningProcess.on('exit', (code: number) => {
-      console.log(`YOLO process exited with code ${code}`);
-      runningProcess = null;
-    });
-    
-    // Log output for debugging
-    runningProcess.stdout.on('data', (data: Buffer) => {
-      console.log('YOLO stdout:', data.toString());
-    });
-    
-    runningProcess.stderr.on('data', (data: Buffer) => {
-      console.error('YOLO stderr:', data.toString());
-    });
+    if (result.status !== 'started') {
+      throw new Error(result.error || `Unexpected daemon response: ${JSON.stringify(result)}`);
+    }
     
     return NextResponse.json({ 
       status: 'started',
-      message: 'YOLO process started successfully'
+      message: 'YOLO process started successfully',
+      resume
     });
     
   } catch (error) {
@@ -80,26 +41,15 @@ export async function GET() {
 
 export async function POST(request: NextRequest) {
   try {
-    const { command } = await request.json();
+    const { command, campaign } = await request.json();
     
     if (command === 'stop') {
-      const controlFile = path.join(process.cwd(), 'yolo_control.json');
-      
-      // Write stop command to control file
-      await fs.writeFile(
-        controlFile,
-        JSON.stringify({ command: 'stop', timestamp: Date.now() })
-      );
-      
-      // Also try to kill the process if we have a reference
-      if (runningProcess) {
-        runningProcess.kill('SIGTERM');
-        runningProcess = null;
-      }
+      // The run stops at its next progress update and is cancelled if it doesn't
+      const result = await stopRun('yolo', campaign);
       
       return NextResponse.json({ 
         status: 'success',
-        message: 'Stop command sent'
+        message: result.status === 'not_running' ? 'YOLO process is not running' : 'Stop command sent'
       });
     }
     
@@ -115,4 +65,4 @@ export async function POST(request: NextRequest) {
       message: 'Failed to process command'
     }, { status: 500 });
   }
-}
\ No newline at end of file
+}
@@ -1,4 +1,5 @@
 import Database from 'better-sqlite3';
+import { createHash } from 'crypto';
 import path from 'path';
 import { fileURLToPath } from 'url';
 
@@ -54,15 +55,30 @@ export function updateEmailSentStatus(username: string, sent: boolean = true): v
   ).run(sent ? 1 : 0, sent ? now : null, username);
 }
 
+// Version stored with drafts saved by hand; the Python draft store reuses
+// them for as long as the bio is unchanged (see MANUAL_DRAFT_VERSION in draft_store.py)
+export const MANUAL_DRAFT_VERSION = 'manual';
+
+// Version stored with drafts generated by the dashboard's own prompt
+export const DASHBOARD_DRAFT_VERSION = 'dashboard-v1';
+
+// Same hash as bio_hash() in draft_store.py
+function bioHash(bio: string | null | undefined): string {
+  return createHash('sha256').update((bio || '').trim(), 'utf8').digest('hex').slice(0, 16);
+}
+
 export function saveEmailDraft(
   username: string, 
   subject: string, 
-  body: string
+  body: string,
+  templateVersion: string = MANUAL_DRAFT_VERSION
 ): void {
   const now = new Date().toISOString();
+  const row = db.prepare('SELECT bio FROM influencers WHERE username = ?').get(username) as any;
   db.prepare(
-    'UPDATE influencers SET email_subject = ?, email_body = ?, email_generated_at = ? WHERE username = ?'
-  ).run(subject, body, now, username);
+    'UPDATE influencers SET email_subject = ?, email_body = ?, email_generated_at = ?, ' +
+    'draft_bio_hash = ?, draft_template_version = ? WHERE username = ?'
+  ).run(subject, body, now, bioHash(row?.bio), templateVersion, username);
 }
 
 export function getEmailDraft(username: string): { subject: string; body: string } | null {
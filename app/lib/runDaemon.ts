@@ -0,0 +1,125 @@
+import net from 'net';
+import path from 'path';
+import fs from 'fs';
+import { spawn } from 'child_process';
+
+// Unix socket of the resident Python run daemon (run_daemon.py)
+const SOCKET_PATH = process.env.RUN_DAEMON_SOCKET || '/tmp/outreach_run_daemon.sock';
+
+// The daemon imports everything before it listens, so the first start takes a while
+const START_TIMEOUT_MS = 90000;
+
+export type RunProcess = 'outreach' | 'yolo';
+
+function connect(): Promise<net.Socket> {
+  return new Promise((resolve, reject) => {
+    const socket = net.createConnection(SOCKET_PATH);
+    socket.once('connect', () => resolve(socket));
+    socket.once('error', reject);
+  });
+}
+
+function startDaemon() {
+  const rootDir = process.cwd();
+  const log = fs.openSync(path.join(rootDir, 'run_daemon.log'), 'a');
+  const daemon = spawn('python3', ['-u', 'run_daemon.py', '--socket', SOCKET_PATH], {
+    cwd: rootDir,
+    env: { ...process.env },
+    detached: true, // Keep the daemon alive independently of this server
+    stdio: ['ignore', log, log]
+  });
+  daemon.unref();
+  fs.closeSync(log);
+}
+
+// Connect to the daemon, starting it first if nothing is listening
+async function connectOrStart(): Promise<net.Socket> {
+  try {
+    return await connect();
+  } catch (error: any) {
+    if (error.code !== 'ENOENT' && error.code !== 'ECONNREFUSED') {
+      throw error;
+    }
+  }
+
+  startDaemon();
+  const deadline = Date.now() + START_TIMEOUT_MS;
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 500));
+    try {
+      return await connect();
+    } catch (error) {
+      if (Date.now() > deadline) {
+        throw new Error(`Run daemon did not start listening on ${SOCKET_PATH}`);
+      }
+    }
+  }
+}
+
+// Read JSON lines from the socket, calling onLine for each until it returns false
+function readLines(socket: net.Socket, onLine: (data: any) => boolean | void): Promise<void> {
+  return new Promise((resolve, reject) => {
+    let buffer = '';
+    socket.setEncoding('utf-8');
+    socket.on('data', (chunk: string) => {
+      buffer += chunk;
+      let newline;
+      while ((newline = buffer.indexOf('\n')) >= 0) {
+        const line = buffer.slice(0, newline);
+        buffer = buffer.slice(newline + 1);
+        if (line.trim() && onLine(JSON.parse(line)) === false) {
+          socket.end();
+          resolve();
+          return;
+        }
+      }
+    });
+    socket.on('end', () => resolve());
+    socket.on('error', reject);
+  });
+}
+
+// Send one command to the daemon and return its response
+export async function sendCommand(command: Record<string, any>): Promise<any> {
+  const socket = await connectOrStart();
+  let response: any = null;
+  const done = readLines(socket, (data) => {
+    response = data;
+    return false;
+  });
+  socket.write(JSON.stringify(command) + '\n');
+  await done;
+  if (response === null) {
+    throw new Error('Run daemon closed the connection without a response');
+  }
+  return response;
+}
+
+// A campaign from CAMPAIGNS_FILE runs with its own hashtags next to the process's own run
+export function startRun(runProcess: RunProcess, resume: boolean, campaign?: string | null) {
+  return sendCommand({ command: 'start', process: runProcess, resume, campaign: campaign || undefined });
+}
+
+export function stopRun(runProcess: RunProcess, campaign?: string | null) {
+  return sendCommand({ command: 'stop', process: runProcess, campaign: campaign || undefined });
+}
+
+// Stream the progress of the current run; the last line has done: true
+export async function watchRun(runProcess: RunProcess, onLine: (data: any) => void,
+                               campaign?: string | null): Promise<() => void> {
+  const socket = await connectOrStart();
+  let finished = false;
+  readLines(socket, (data) => {
+    finished = !!data.done;
+    onLine(data);
+    return !finished;
+  })
+    .then(() => {
+      if (!finished) {
+        onLine({ done: true, error: 'Run daemon closed the connection' });
+      }
+    })
+    .catch((error) => onLine({ done: true, error: String(error) }));
+  socket.write(JSON.stringify({ command: 'watch', process: runProcess, campaign: campaign || undefined }) + '\n');
+  return () => socket.destroy();
+}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pooled SmtpSender against a connection-per-email sender.
+
+Runs a minimal local SMTP stand-in that accepts AUTH and delays session
+setup to mimic the TLS handshake and login of a real provider.
+
+Usage: python bench_smtp.py [--messages 50] [--handshake-ms 300] [--send-ms 20]
+"""
+
+import argparse
+import asyncio
+import smtplib
+import socketserver
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from smtp_sender import SmtpSender
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to satisfy smtplib: EHLO, AUTH, MAIL, RCPT, DATA, NOOP, RSET, QUIT."""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self) -> None:
+        server = self.server
+        time.sleep(server.handshake_ms / 2000)
+        self.reply("220 localhost stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                time.sleep(server.handshake_ms / 2000)
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                time.sleep(server.send_ms / 1000)
+                server.received += 1
+                self.reply("250 2.0.0 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_ms: float, send_ms: float):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.handshake_ms = handshake_ms
+        self.send_ms = send_ms
+        self.received = 0
+
+def send_per_connection(port: int, count: int) -> float:
+    """Old behaviour: connect, log in, send and quit for every message."""
+    started = time.perf_counter()
+    for i in range(count):
+        msg = MIMEMultipart()
+        msg['From'] = "bench@example.com"
+        msg['To'] = f"user{i}@example.com"
+        msg['Subject'] = "Benchmark"
+        msg.attach(MIMEText("Hello", 'plain'))
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.login("bench@example.com", "secret")
+        server.send_message(msg)
+        server.quit()
+    return time.perf_counter() - started
+
+async def send_pooled(port: int, count: int, pool_size: int) -> tuple:
+    """New behaviour: persistent sessions through SmtpSender."""
+    sender = SmtpSender("127.0.0.1", port, "bench@example.com", "secret", use_tls=False,
+                        max_per_minute=count, pool_size=pool_size)
+    started = time.perf_counter()
+    await asyncio.gather(*(sender.send(f"user{i}@example.com", "Benchmark", "Hello") for i in range(count)))
+    elapsed = time.perf_counter() - started
+    stats = sender.stats()
+    await sender.close()
+    return elapsed, stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SMTP sending strategies against a local stand-in.')
+    parser.add_argument('--messages', type=int, default=50, help='Messages per strategy (default: 50)')
+    parser.add_argument('--handshake-ms', type=float, default=300,
+                        help='Simulated greeting + TLS/login cost per session (default: 300)')
+    parser.add_argument('--send-ms', type=float, default=20, help='Simulated cost per message (default: 20)')
+    parser.add_argument('--pool-size', type=int, default=1, help='SmtpSender worker threads (default: 1)')
+    args = parser.parse_args()
+
+    server = StandInSMTPServer(args.handshake_ms, args.send_ms)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"Stand-in SMTP on port {port}: handshake {args.handshake_ms}ms, send {args.send_ms}ms, "
+          f"{args.messages} messages per strategy")
+
+    legacy = send_per_connection(port, args.messages)
+    print(f"connection per email: {legacy:.2f}s ({args.messages / legacy:.1f} msg/s)")
+
+    pooled, stats = asyncio.run(send_pooled(port, args.messages, args.pool_size))
+    print(f"pooled SmtpSender:    {pooled:.2f}s ({args.messages / pooled:.1f} msg/s), "
+          f"speedup {legacy / pooled:.1f}x")
+    print(f"sender stats: {stats}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark interpreter startup of the CLI entry paths with `python -X importtime`.
+
+Each path is imported in a fresh interpreter (in a scratch directory, so
+nothing is written next to the code); its wall time, total import time and
+the heaviest third-party packages it loads are reported. With --compare,
+the same paths are also measured on another git revision of the code.
+
+Usage: python bench_startup.py [--runs 3] [--top 5] [--compare REV] [path ...]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+# Entry paths and the statement that loads what they need
+PATHS = {
+    "db": "from db_helper import DatabaseHelper; from run_ledger import RunLedger; "
+          "from contact_index import ContactIndex; from draft_store import DraftStore",
+    "migrate": "from outreach import check_db_columns",
+    "status": "import verification_worker",
+    "campaigns": "import campaign",
+    "outreach": "import outreach",
+    "yolo": "import yolo_outreach",
+}
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _local_module(name: str) -> bool:
+    return os.path.exists(os.path.join(ROOT_DIR, name + ".py"))
+
+def export_revision(revision: str, dest: str) -> None:
+    """Write the tree of a git revision to a directory."""
+    archive = subprocess.run(["git", "archive", revision], cwd=ROOT_DIR, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(dest)
+
+def measure(statement: str, workdir: str, code_dir: str = ROOT_DIR) -> Tuple[float, float, Dict[str, float]]:
+    """
+    Import in a fresh interpreter; returns wall seconds, import seconds and
+    the import seconds of each third-party package that was loaded.
+    """
+    env = {**os.environ, "PYTHONPATH": code_dir + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=workdir, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr[-2000:]}")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package",
+    # nested imports are indented under the module that imported them
+    total = 0.0
+    packages: Dict[str, Tuple[int, float]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        seconds = int(fields[1]) / 1e6
+        name = fields[2].rstrip()[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0:
+            total += seconds
+        package = name.split(".")[0]
+        if _local_module(package) or package.startswith("_") or package in sys.stdlib_module_names:
+            continue
+        # A package's outermost import includes its submodules
+        if package not in packages or depth < packages[package][0]:
+            packages[package] = (depth, seconds)
+    return wall, total, {package: seconds for package, (_, seconds) in packages.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark startup imports of the CLI entry paths.')
+    parser.add_argument('paths', nargs='*', help=f"Paths to measure (default: all of {', '.join(PATHS)})")
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per path, the median is reported')
+    parser.add_argument('--top', type=int, default=5, help='Heaviest third-party packages to list per path')
+    parser.add_argument('--compare', metavar='REV', help='Also measure a git revision (e.g. HEAD~1) for comparison')
+    args = parser.parse_args()
+    unknown = [path for path in args.paths if path not in PATHS]
+    if unknown:
+        parser.error(f"Unknown paths: {', '.join(unknown)}")
+
+    def median_run(statement: str, workdir: str, code_dir: str = ROOT_DIR) -> Tuple[float, float, Dict[str, float]]:
+        runs = [measure(statement, workdir, code_dir) for _ in range(max(1, args.runs))]
+        return (statistics.median(run[0] for run in runs), statistics.median(run[1] for run in runs), runs[-1][2])
+
+    with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as baseline_dir:
+        if args.compare:
+            export_revision(args.compare, baseline_dir)
+        for path in args.paths or list(PATHS):
+            wall, imports, packages = median_run(PATHS[path], workdir)
+            line = f"{path:<10} wall {wall:5.2f}s  imports {imports:5.2f}s"
+            if args.compare:
+                try:
+                    baseline: Optional[float] = median_run(PATHS[path], workdir, baseline_dir)[0]
+                except RuntimeError:
+                    # The path doesn't exist in that revision
+                    baseline = None
+                line += (f"  {args.compare}: {baseline:5.2f}s ({wall / baseline:4.0%})" if baseline
+                         else f"  {args.compare}: n/a")
+            heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+            print(line + "  " + ", ".join(f"{package} {seconds:.2f}s" for package, seconds in heaviest))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import logging
+import os
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+
+# browser_use is imported when a browser is created, so reading a profile stays cheap
+if TYPE_CHECKING:
+    from browser_use import Browser
+    from browser_use.browser.context import BrowserContext
+
+logger = logging.getLogger(__name__)
+
+# Resource types that are never needed to read profile text and overlays
+DEFAULT_BLOCKED_TYPES = "image,media,font"
+
+# Analytics and tracking hosts whose requests are dropped
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com,googletagmanager.com,doubleclick.net,connect.facebook.net,"
+    "graph.instagram.com/logging_client_events,facebook.com/tr"
+)
+
+# Chrome flags that cut CPU and bandwidth in headless runs
+CHROME_ARGS = [
+    "--disable-gpu",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    "--disable-background-networking",
+    "--disable-renderer-backgrounding",
+]
+
+def _parse_viewport(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+class BrowserProfile:
+    """
+    How browsers for checks and DMs are launched.
+
+    Defaults to headless Chromium with a small viewport, and every context
+    drops images, media, fonts and analytics requests. Contexts are isolated
+    from each other so they can run checks in parallel; the logged-in
+    Instagram session is loaded into each from the cookies file, which
+    browser_use writes back when a context closes.
+    """
+
+    def __init__(self, headless: bool = True, binary_path: Optional[str] = None,
+                 cookies_file: Optional[str] = None, viewport: Tuple[int, int] = (1280, 900),
+                 blocked_types: Optional[List[str]] = None, blocked_domains: Optional[List[str]] = None):
+        self.headless = headless
+        self.binary_path = binary_path
+        self.cookies_file = cookies_file
+        self.viewport = viewport
+        self.blocked_types = set(blocked_types if blocked_types is not None else DEFAULT_BLOCKED_TYPES.split(","))
+        self.blocked_domains = blocked_domains if blocked_domains is not None else DEFAULT_BLOCKED_DOMAINS.split(",")
+        self.requests = {"allowed": 0, "blocked": 0}
+        self.page_loads: List[Dict[str, float]] = []
+
+    @property
+    def account(self) -> str:
+        """Name of the Instagram session this profile logs in with, for per-account limits."""
+        return self.cookies_file or "default"
+
+    @classmethod
+    def from_env(cls) -> "BrowserProfile":
+        """Create a profile from the BROWSER_* environment variables."""
+        def csv(name: str, default: str) -> List[str]:
+            return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+        return cls(
+            headless=os.getenv("BROWSER_HEADLESS", "true").lower() != "false",
+            binary_path=os.getenv("BROWSER_BINARY_PATH") or None,
+            cookies_file=os.getenv("BROWSER_COOKIES_FILE", "instagram_cookies.json") or None,
+            viewport=_parse_viewport(os.getenv("BROWSER_VIEWPORT", "1280x900")),
+            blocked_types=csv("BROWSER_BLOCK_RESOURCES", DEFAULT_BLOCKED_TYPES),
+            blocked_domains=csv("BROWSER_BLOCK_DOMAINS", DEFAULT_BLOCKED_DOMAINS),
+        )
+
+    def create_browser(self) -> "Browser":
+        """Create a browser with this profile's launch and context settings."""
+        from browser_use import Browser, BrowserConfig
+        from browser_use.browser.context import BrowserContextConfig
+
+        width, height = self.viewport
+        return Browser(config=BrowserConfig(
+            headless=self.headless,
+            browser_binary_path=self.binary_path,
+            extra_browser_args=CHROME_ARGS,
+            new_context_config=BrowserContextConfig(
+                window_width=width,
+                window_height=height,
+                no_viewport=False,
+                cookies_file=self.cookies_file,
+                # Without this, contexts on a user-provided Chrome share its first tab
+                force_new_context=True,
+            ),
+        ))
+
+    async def prepare_context(self, ctx: "BrowserContext") -> None:
+        """Install request blocking on a browser context before it loads any page."""
+        if not self.blocked_types and not self.blocked_domains:
+            return
+        session = await ctx.get_session()
+        await session.context.route("**/*", self._route)
+
+    async def _route(self, route) -> None:
+        request = route.request
+        if (request.resource_type in self.blocked_types or
+                any(domain in request.url for domain in self.blocked_domains)):
+            self.requests["blocked"] += 1
+            await route.abort()
+        else:
+            self.requests["allowed"] += 1
+            await route.continue_()
+
+    async def record_page_load(self, page) -> Optional[Dict[str, float]]:
+        """Read navigation timing of the page's last load and keep it for stats()."""
+        try:
+            timing = await page.evaluate("""() => {
+                const nav = performance.getEntriesByType('navigation')[0];
+                if (!nav) return null;
+                return {
+                    dom_content_loaded_ms: nav.domContentLoadedEventEnd - nav.startTime,
+                    load_ms: nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null,
+                    transfer_bytes: nav.transferSize
+                };
+            }""")
+        except Exception as e:
+            logger.debug(f"Could not read page load timing: {e}")
+            return None
+        if timing:
+            self.page_loads.append(timing)
+        return timing
+
+    def stats(self) -> Dict[str, Any]:
+        """Request blocking counts and average page load timing."""
+        def average(key: str) -> Optional[float]:
+            values = [load[key] for load in self.page_loads if load.get(key) is not None]
+            return round(sum(values) / len(values), 1) if values else None
+
+        return {
+            "requests": dict(self.requests),
+            "page_loads": len(self.page_loads),
+            "avg_dom_content_loaded_ms": average("dom_content_loaded_ms"),
+            "avg_load_ms": average("load_ms"),
+            "avg_document_bytes": average("transfer_bytes"),
+        }
@@ -0,0 +1,139 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Resources a run can be budgeted on, with the environment variable setting each limit
+BUDGET_LIMIT_VARS = {
+    "minutes": "BUDGET_MINUTES",
+    "llm_usd": "BUDGET_LLM_USD",
+    "llm_tokens": "BUDGET_LLM_TOKENS",
+    "apify_runs": "BUDGET_APIFY_RUNS",
+    "browser_checks": "BUDGET_BROWSER_CHECKS",
+    "sends": "BUDGET_SENDS",
+}
+
+# USD per million input and output tokens, used to price LLM usage
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+class BudgetExhausted(Exception):
+    """Raised when work would need a resource whose budget is used up."""
+
+    def __init__(self, resource: str):
+        super().__init__(f"Budget exhausted: {resource}")
+        self.resource = resource
+
+def llm_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of one completion; unknown models are priced like gpt-4o."""
+    # Dated model names ("gpt-4o-mini-2024-07-18") match their base name
+    base = next((name for name in sorted(MODEL_PRICES, key=len, reverse=True)
+                 if (model or "").startswith(name)), "gpt-4o")
+    input_price, output_price = MODEL_PRICES[base]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+class Budget:
+    """
+    Limits on what one run may spend, shared by all stages.
+
+    Countable work (actor runs, browser checks, sends) is acquired before it
+    starts and fails with BudgetExhausted once the limit is reached; LLM usage
+    is recorded from each response and blocks further requests once over the
+    limit. Resources without a limit are only tracked.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None):
+        self.limits = {resource: limit for resource, limit in (limits or {}).items() if limit}
+        self.spent: Dict[str, float] = {resource: 0 for resource in BUDGET_LIMIT_VARS}
+        self.started_at = time.monotonic()
+        self.stopped_by: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "Budget":
+        """Create a budget from the BUDGET_* environment variables (unset or 0 means no limit)."""
+        return cls({resource: float(os.getenv(var, "0") or 0) for resource, var in BUDGET_LIMIT_VARS.items()})
+
+    def _spent(self, resource: str) -> float:
+        if resource == "minutes":
+            return (time.monotonic() - self.started_at) / 60
+        return self.spent[resource]
+
+    def remaining(self, resource: str) -> float:
+        """What is left of a resource, or infinity if it has no limit."""
+        if resource not in self.limits:
+            return float("inf")
+        return max(0.0, self.limits[resource] - self._spent(resource))
+
+    def exhausted(self) -> Optional[str]:
+        """The first resource that is used up, or None while everything has budget left."""
+        for resource in self.limits:
+            if self.remaining(resource) <= 0:
+                if self.stopped_by is None:
+                    self.stopped_by = resource
+                    logger.info(f"Budget for {resource} is used up")
+                return resource
+        return None
+
+    def check(self, *resources: str) -> None:
+        """Raise BudgetExhausted if time or any of the given resources is used up."""
+        for resource in ("minutes",) + resources:
+            if self.remaining(resource) <= 0:
+                if self.stopped_by is None:
+                    self.stopped_by = resource
+                raise BudgetExhausted(resource)
+
+    def acquire(self, resource: str, amount: float = 1) -> None:
+        """Take `amount` of a resource before using it; raises BudgetExhausted if there isn't enough."""
+        self.check()
+        if self.remaining(resource) < amount:
+            if self.stopped_by is None:
+                self.stopped_by = resource
+            raise BudgetExhausted(resource)
+        self.spent[resource] += amount
+
+    def record_llm_usage(self, model: str, usage: Dict[str, Any]) -> None:
+        """Add the tokens and cost of one completion from its 'usage' block."""
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        self.spent["llm_tokens"] += prompt_tokens + completion_tokens
+        self.spent["llm_usd"] += llm_cost(model, prompt_tokens, completion_tokens)
+
+    def summary(self) -> Dict[str, Any]:
+        """Spent, limit and remaining per resource, and which one stopped the run."""
+        resources = {}
+        for resource in BUDGET_LIMIT_VARS:
+            spent = self._spent(resource)
+            resources[resource] = {
+                "spent": round(spent, 4 if resource == "llm_usd" else 1),
+                "limit": self.limits.get(resource),
+                "remaining": round(self.remaining(resource), 4) if resource in self.limits else None,
+            }
+        return {"stopped_by": self.stopped_by, "resources": resources}
+
+# Budget of the current run. Runs sharing a process (see run_daemon.py) each
+# set their own, which the tasks and threads they start inherit.
+_current_budget: ContextVar[Optional[Budget]] = ContextVar("budget", default=None)
+
+# Budget for code running outside of any run
+_budget_instance: Optional[Budget] = None
+
+def get_budget() -> Budget:
+    """Get the budget of the current run, created from the environment on first use."""
+    global _budget_instance
+    budget = _current_budget.get()
+    if budget is not None:
+        return budget
+    if _budget_instance is None:
+        _budget_instance = Budget.from_env()
+    return _budget_instance
+
+def start_budget(budget: Optional[Budget] = None) -> Budget:
+    """Start a run with a fresh budget (from the environment unless one is given)."""
+    budget = budget or Budget.from_env()
+    _current_budget.set(budget)
+    return budget
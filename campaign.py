@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Campaigns: several hashtag sets run side by side in one process.
+
+A campaign has its own hashtags, results limit, message templates, budget
+and progress id, and runs the outreach or YOLO process. Campaigns running
+in the same process share the verification engine's browser, the rate
+limiter, the profile and email memos, and a username claimed by one
+campaign is skipped by the others while it runs.
+
+Campaigns are defined in CAMPAIGNS_FILE, a JSON list such as:
+
+    [{"name": "golf", "process": "yolo", "hashtags": ["golf", "golfswing"],
+      "results_limit": 100, "message_mode": "template", "template_version": "template-v1",
+      "budget": {"minutes": 60, "sends": 50}}]
+
+Usage: python campaign.py [--resume] [name ...]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from budget import BUDGET_LIMIT_VARS, Budget
+import progress_monitor
+
+logger = logging.getLogger(__name__)
+
+# JSON file with the campaign definitions
+CAMPAIGNS_FILE = os.getenv("CAMPAIGNS_FILE", "campaigns.json")
+
+PROCESSES = ("outreach", "yolo")
+
+# Campaign names end up in progress and control file names
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+class Campaign:
+    """One hashtag set and its settings; unset settings fall back to the environment."""
+
+    def __init__(self, name: Optional[str], process: str, hashtags: Optional[List[str]] = None,
+                 results_limit: Optional[int] = None, template_version: Optional[str] = None,
+                 message_mode: Optional[str] = None, budget: Optional[Dict[str, float]] = None):
+        if process not in PROCESSES:
+            raise ValueError(f"Unknown process {process!r}, expected one of {', '.join(PROCESSES)}")
+        if name is not None and not _NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid campaign name {name!r}: use letters, digits, '_' and '-'")
+        unknown = set(budget or {}) - set(BUDGET_LIMIT_VARS)
+        if unknown:
+            raise ValueError(f"Unknown budget resources for campaign {name}: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.process = process
+        self.hashtags = hashtags or os.getenv("HASHTAGS", "golf,golfswing").split(",")
+        self.results_limit = results_limit or int(os.getenv("RESULTS_LIMIT", "100"))
+        self.template_version = template_version
+        self.message_mode = message_mode
+        self.budget = budget or {}
+
+    @classmethod
+    def from_env(cls, process: str) -> "Campaign":
+        """The unnamed campaign a process runs when started on its own."""
+        return cls(None, process)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Campaign":
+        hashtags = data.get("hashtags")
+        if isinstance(hashtags, str):
+            hashtags = hashtags.split(",")
+        if not data.get("name"):
+            raise ValueError(f"Campaign without a name: {data}")
+        return cls(data["name"], data.get("process", "yolo"), hashtags=hashtags,
+                   results_limit=data.get("results_limit"), template_version=data.get("template_version"),
+                   message_mode=data.get("message_mode"), budget=data.get("budget"))
+
+    @property
+    def progress_id(self) -> str:
+        """Id of the campaign's progress and control files and its runs in the ledger."""
+        return self.process if self.name is None else f"{self.process}_{self.name}"
+
+    def new_budget(self) -> Budget:
+        """A budget from the environment with the campaign's own limits on top."""
+        budget = Budget.from_env()
+        budget.limits.update({resource: limit for resource, limit in self.budget.items() if limit})
+        return budget
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "process": self.process, "progress_id": self.progress_id,
+                "hashtags": self.hashtags, "results_limit": self.results_limit,
+                "template_version": self.template_version, "message_mode": self.message_mode,
+                "budget": self.budget}
+
+def load_campaigns(path: str = CAMPAIGNS_FILE) -> Dict[str, Campaign]:
+    """Read the campaign definitions, by name."""
+    with open(path) as f:
+        campaigns = [Campaign.from_dict(data) for data in json.load(f)]
+    by_name = {campaign.name: campaign for campaign in campaigns}
+    if len(by_name) != len(campaigns):
+        raise ValueError(f"Duplicate campaign names in {path}")
+    return by_name
+
+# Campaign of the current run; each campaign's task sets its own
+_current_campaign: ContextVar[Optional[Campaign]] = ContextVar("campaign", default=None)
+
+def get_campaign(process: str = "outreach") -> Campaign:
+    """The campaign being run, or the process's unnamed campaign from the environment."""
+    return _current_campaign.get() or Campaign.from_env(process)
+
+def use_campaign(campaign: Campaign) -> None:
+    """Make a campaign current for this task and what it starts, including its progress monitor."""
+    _current_campaign.set(campaign)
+    # Named campaigns run inside another process, which handles its own signals
+    progress_monitor.use_monitor(progress_monitor.get_monitor(campaign.progress_id,
+                                                              handle_signals=campaign.name is None))
+
+# Usernames being handled by a running campaign, and the campaign handling each
+_claims: Dict[str, str] = {}
+_claims_lock = threading.Lock()
+
+def claim_usernames(usernames: List[str], owner: str) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Claim usernames for a run; returns the ones it got and, for the others,
+    the run that already has them.
+    """
+    claimed, taken = [], {}
+    with _claims_lock:
+        for username in usernames:
+            holder = _claims.setdefault(username, owner)
+            if holder == owner:
+                claimed.append(username)
+            else:
+                taken[username] = holder
+    return claimed, taken
+
+def release_usernames(owner: str) -> None:
+    """Release everything a run claimed once it ends."""
+    with _claims_lock:
+        for username in [username for username, holder in _claims.items() if holder == owner]:
+            del _claims[username]
+
+async def run_campaign(campaign: Campaign, resume: bool = False, engine=None) -> None:
+    """Run a campaign's process in the current task; the engine is shared and left open."""
+    import outreach
+    import yolo_outreach
+
+    use_campaign(campaign)
+    if campaign.process == "outreach":
+        await outreach.run_with_monitoring(resume=resume, engine=engine)
+    else:
+        await yolo_outreach.main(resume=resume, engine=engine)
+
+async def run_campaigns(campaigns: List[Campaign], resume: bool = False) -> Dict[str, str]:
+    """Run campaigns concurrently with one shared verification engine; returns how each ended."""
+    import outreach
+    from llm_cassette import close_clients
+    from verification import VerificationEngine
+
+    await asyncio.to_thread(outreach.check_db_columns)
+    engine = VerificationEngine(outreach.get_view_count, outreach.Influencer)
+    for campaign in campaigns:
+        # Clears a stop left in the control file by an earlier run
+        progress_monitor.get_monitor(campaign.progress_id, handle_signals=False).reset()
+    try:
+        results = await asyncio.gather(*(run_campaign(campaign, resume, engine) for campaign in campaigns),
+                                       return_exceptions=True)
+    finally:
+        await engine.close()
+        await close_clients()
+
+    outcomes = {}
+    for campaign, result in zip(campaigns, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Campaign {campaign.name} failed: {result}")
+            outcomes[campaign.name] = "failed"
+        else:
+            outcomes[campaign.name] = progress_monitor.get_monitor(campaign.progress_id).last_progress.get("stage")
+    return outcomes
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    resume = '--resume' in args
+    names = [arg for arg in args if not arg.startswith('--')]
+
+    campaigns = load_campaigns()
+    unknown = [name for name in names if name not in campaigns]
+    if unknown:
+        sys.exit(f"Unknown campaigns: {', '.join(unknown)} (defined in {CAMPAIGNS_FILE}: {', '.join(campaigns)})")
+    selected = [campaigns[name] for name in names] if names else list(campaigns.values())
+
+    outcomes = asyncio.run(run_campaigns(selected, resume=resume))
+    for name, outcome in outcomes.items():
+        print(f"{name}: {outcome}")
+
+if __name__ == '__main__':
+    main()
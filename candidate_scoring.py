@@ -0,0 +1,130 @@
+import heapq
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Candidates scoring below this are dropped before any expensive stage; off
+# (0) by default, so candidates are only ranked
+SCORE_PRUNE_THRESHOLD = float(os.getenv("SCORE_PRUNE_THRESHOLD", "0"))
+
+# Rank given to candidates without post data (e.g. usernames from the cache);
+# they are never pruned
+NEUTRAL_SCORE = 0.5
+
+# Weights of the features in the score; they sum to 1 so scores stay in [0, 1]
+FEATURE_WEIGHTS = np.array([
+    0.35,  # share of the candidate's posts that are videos/reels
+    0.20,  # average likes (log scaled)
+    0.10,  # average comments (log scaled)
+    0.15,  # average video views (log scaled)
+    0.10,  # share of caption hashtags that are target hashtags
+    0.10,  # posts per week in the sample
+])
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def build_features(posts: List[Dict[str, Any]], target_hashtags: Iterable[str],
+                   is_video_post: Callable[[Dict[str, Any]], bool],
+                   extract_hashtags: Callable[[str], List[str]]) -> List[float]:
+    """Raw feature row for one candidate's hashtag posts, in FEATURE_WEIGHTS order."""
+    targets = {tag.strip().lower() for tag in target_hashtags}
+    videos = [post for post in posts if is_video_post(post)]
+
+    tags = [tag for post in posts for tag in extract_hashtags(post.get("caption") or "")]
+    relevance = sum(1 for tag in tags if tag in targets) / len(tags) if tags else 0.0
+
+    timestamps = [ts for ts in (_parse_timestamp(post.get("timestamp")) for post in posts) if ts]
+    span_weeks = max((max(timestamps) - min(timestamps)) / (7 * 86400), 1.0) if timestamps else 1.0
+
+    return [
+        len(videos) / len(posts),
+        sum(post.get("likesCount") or 0 for post in posts) / len(posts),
+        sum(post.get("commentsCount") or 0 for post in posts) / len(posts),
+        sum(post.get("videoViewCount") or post.get("videoPlayCount") or 0 for post in videos) / len(videos) if videos else 0.0,
+        relevance,
+        len(posts) / span_weeks,
+    ]
+
+def score_features(features: np.ndarray) -> np.ndarray:
+    """Score a (candidates x features) matrix in one pass; scores are in [0, 1]."""
+    if features.size == 0:
+        return np.zeros(0)
+    scaled = features.astype(float).copy()
+    # Counts are heavy-tailed, so compare them on a log scale
+    scaled[:, 1:4] = np.log1p(scaled[:, 1:4])
+    # Normalize each feature by the best candidate in the batch
+    col_max = scaled.max(axis=0)
+    col_max[col_max == 0] = 1.0
+    scaled /= col_max
+    return scaled @ FEATURE_WEIGHTS
+
+def score_candidates(usernames: List[str], posts_by_user: Dict[str, List[Dict[str, Any]]],
+                     target_hashtags: Iterable[str],
+                     is_video_post: Callable[[Dict[str, Any]], bool],
+                     extract_hashtags: Callable[[str], List[str]]) -> Dict[str, float]:
+    """Score the candidates that have hashtag posts; candidates without posts are left out."""
+    with_posts = [username for username in usernames if posts_by_user.get(username)]
+    scores: Dict[str, float] = {}
+    if not with_posts:
+        return scores
+
+    features = np.array([
+        build_features(posts_by_user[username], target_hashtags, is_video_post, extract_hashtags)
+        for username in with_posts
+    ])
+    for username, score in zip(with_posts, score_features(features)):
+        scores[username] = round(float(score), 4)
+    return scores
+
+class CandidateQueue:
+    """Max-priority queue of candidates by score; ties keep insertion order."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = 0
+
+    def push(self, username: str, score: float) -> None:
+        heapq.heappush(self._heap, (-score, self._counter, username))
+        self._counter += 1
+
+    def pop(self) -> Tuple[str, float]:
+        score, _, username = heapq.heappop(self._heap)
+        return username, -score
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+def rank_candidates(usernames: List[str], scores: Dict[str, float],
+                    threshold: float = SCORE_PRUNE_THRESHOLD) -> Tuple[List[str], List[str]]:
+    """
+    Order candidates highest score first and prune scored ones below the threshold.
+
+    Returns (ranked, pruned). Unscored candidates rank at NEUTRAL_SCORE.
+    """
+    queue = CandidateQueue()
+    pruned = []
+    for username in usernames:
+        score = scores.get(username)
+        if score is None:
+            queue.push(username, NEUTRAL_SCORE)
+        elif threshold and score < threshold:
+            pruned.append(username)
+        else:
+            queue.push(username, score)
+
+    ranked = []
+    while queue:
+        username, _ = queue.pop()
+        ranked.append(username)
+    return ranked, pruned
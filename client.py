@@ -1,8 +1,10 @@
 import os
+import asyncio
 import logging
 from typing import Dict, List, Any, Optional
-from apify_client import ApifyClient
 from dotenv import load_dotenv
+from budget import BudgetExhausted, get_budget
+from rate_limiter import get_rate_limiter
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -15,6 +17,8 @@ class ApifyHelper:
         if not self.token:
             raise ValueError("APIFY_TOKEN environment variable is not set")
         
+        # Imported here, not at module load, so DB-only commands don't pay for it
+        from apify_client import ApifyClient
         self.client = ApifyClient(token=self.token)
         self.hashtag_scraper_id = "apify/instagram-hashtag-scraper"
         self.post_scraper_id = "apify/instagram-post-scraper"
@@ -24,6 +28,19 @@ class ApifyHelper:
             "apifyProxyGroups": ["RESIDENTIAL"]
         }
     
+    def _run_actor_sync(self, actor_id: str, run_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run an actor, wait for it to finish and return its dataset items."""
+        run = self.client.actor(actor_id).call(run_input=run_input)
+        return self.client.dataset(run["defaultDatasetId"]).list_items().items
+    
+    async def run_actor(self, actor_id: str, run_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run an actor in a worker thread so the blocking client doesn't stall the event loop."""
+        # Every actor run counts against the run's budget
+        get_budget().acquire("apify_runs")
+        # and waits for one of the account's concurrent run slots
+        async with get_rate_limiter().slot("apify_runs"):
+            return await asyncio.to_thread(self._run_actor_sync, actor_id, run_input)
+    
     async def scrape_hashtags(self, hashtags: List[str], results_limit: int) -> List[Dict[str, Any]]:
         """Scrape posts from Instagram hashtags."""
         # If we have a very large limit, we need to be careful not to overload the API
@@ -41,13 +58,11 @@ class ApifyHelper:
         }
 
         try:
-            # Run the actor and wait for it to finish
-            run = self.client.actor(self.hashtag_scraper_id).call(run_input=input_data)
-            
-            # Fetch and return the actor run's dataset items
-            dataset_items = self.client.dataset(run["defaultDatasetId"]).list_items().items
+            dataset_items = await self.run_actor(self.hashtag_scraper_id, input_data)
             logger.info(f"Scraped {len(dataset_items)} posts from hashtags")
             return dataset_items
+        except BudgetExhausted:
+            raise
         except Exception as e:
             logger.error(f"Error scraping hashtags: {e}")
             return []
@@ -63,17 +78,55 @@ class ApifyHelper:
         }
         
         try:
-            # Run the actor and wait for it to finish
-            run = self.client.actor(self.post_scraper_id).call(run_input=input_data)
-            
-            # Fetch and return the actor run's dataset items
-            dataset_items = self.client.dataset(run["defaultDatasetId"]).list_items().items
+            dataset_items = await self.run_actor(self.post_scraper_id, input_data)
             logger.info(f"Scraped {len(dataset_items)} posts for {username}")
             return dataset_items
+        except BudgetExhausted:
+            raise
         except Exception as e:
             logger.error(f"Error scraping posts for {username}: {e}")
             return []
     
+    async def scrape_posts_for_users(self, usernames: List[str], limit_per_user: int = 30,
+                                     batch_size: int = 20, max_parallel_runs: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Scrape recent posts for many users, several users per actor run.
+
+        Returns posts grouped by owner username. Users whose batch failed or
+        who returned no posts are left out.
+        """
+        batches = [usernames[i:i + batch_size] for i in range(0, len(usernames), batch_size)]
+        logger.info(f"Scraping posts for {len(usernames)} users in {len(batches)} batches")
+        runs = asyncio.Semaphore(max_parallel_runs)
+        
+        async def scrape_batch(batch: List[str]) -> List[Dict[str, Any]]:
+            input_data = {
+                "username": batch,
+                "resultsLimit": limit_per_user,
+                "proxy": self.proxy_config
+            }
+            async with runs:
+                try:
+                    return await self.run_actor(self.post_scraper_id, input_data)
+                except BudgetExhausted:
+                    # Left out like a failed batch; callers fall back for these users
+                    logger.info(f"No Apify budget left for batch starting with {batch[0]}")
+                    return []
+                except Exception as e:
+                    logger.error(f"Error scraping posts for batch starting with {batch[0]}: {e}")
+                    return []
+        
+        posts_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        wanted = {username.lower(): username for username in usernames}
+        for items in await asyncio.gather(*(scrape_batch(batch) for batch in batches)):
+            for item in items:
+                owner = wanted.get((item.get('ownerUsername') or '').lower())
+                if owner:
+                    posts_by_user.setdefault(owner, []).append(item)
+        
+        logger.info(f"Scraped posts for {len(posts_by_user)} of {len(usernames)} users")
+        return posts_by_user
+    
     async def scrape_user_profile(self, username: str) -> Optional[Dict[str, Any]]:
         """Scrape profile information for an Instagram user."""
         logger.info(f"Scraping profile for user: {username}")
@@ -85,11 +138,7 @@ class ApifyHelper:
         }
         
         try:
-            # Run the actor and wait for it to finish
-            run = self.client.actor(self.profile_scraper_id).call(run_input=input_data)
-            
-            # Fetch the actor run's dataset items
-            dataset_items = self.client.dataset(run["defaultDatasetId"]).list_items().items
+            dataset_items = await self.run_actor(self.profile_scraper_id, input_data)
             
             if dataset_items:
                 logger.info(f"Successfully scraped profile for {username}")
@@ -97,6 +146,8 @@ class ApifyHelper:
             else:
                 logger.warning(f"No profile data found for {username}")
                 return None
+        except BudgetExhausted:
+            raise
         except Exception as e:
             logger.error(f"Error scraping profile for {username}: {e}")
             return None
\ No newline at end of file
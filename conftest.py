@@ -0,0 +1 @@
+# Makes the flat modules at the repository root importable from tests/
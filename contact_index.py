@@ -0,0 +1,61 @@
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from db_helper import DatabaseHelper
+
+logger = logging.getLogger(__name__)
+
+class ContactIndex:
+    """
+    In-memory check and contact state of a run's candidates.
+
+    Loaded for all candidates with one query up front and updated as
+    candidates are checked, queued and sent to, so the run never asks the
+    database per username whether someone was already contacted.
+    """
+
+    def __init__(self, db: Optional[DatabaseHelper] = None):
+        self.db = db or DatabaseHelper()
+        self.states: Dict[str, Dict[str, Any]] = {}
+
+    def preload(self, usernames: List[str]) -> int:
+        """Load the state of a batch of usernames with a single query."""
+        self.states.update(self.db.get_contact_states(usernames))
+        return len(self.states)
+
+    def is_contacted(self, username: str) -> bool:
+        """Whether a message was sent to the user or is waiting in the outbox."""
+        state = self.states.get(username, {})
+        return bool(state.get('email_sent') or state.get('dm_sent') or state.get('queued'))
+
+    def verdict(self, username: str) -> Optional[bool]:
+        """The stored influencer verdict, or None if the user wasn't checked yet."""
+        state = self.states.get(username, {})
+        return state.get('is_influencer') if state.get('checked_influencer') else None
+
+    def partition(self, usernames: List[str]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Split candidates into (to_process, contacted, not_influencers), keeping
+        their order. Candidates in the last two groups need no further work.
+        """
+        to_process, contacted, not_influencers = [], [], []
+        for username in usernames:
+            if self.is_contacted(username):
+                contacted.append(username)
+            elif self.verdict(username) is False:
+                not_influencers.append(username)
+            else:
+                to_process.append(username)
+        return to_process, contacted, not_influencers
+
+    def mark_checked(self, username: str, is_influencer: bool) -> None:
+        state = self.states.setdefault(username, {})
+        state['checked_influencer'] = True
+        state['is_influencer'] = is_influencer
+
+    def mark_queued(self, username: str) -> None:
+        self.states.setdefault(username, {})['queued'] = True
+
+    def mark_sent(self, item: Dict[str, Any]) -> None:
+        """Record a delivered outbox message; used as the delivery worker's callback."""
+        self.states.setdefault(item['username'], {})[f"{item['channel']}_sent"] = True
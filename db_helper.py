@@ -10,10 +10,16 @@ logger = logging.getLogger(__name__)
 class DatabaseHelper:
     """Helper class for interacting with the SQLite database."""
     
+    # Database paths whose schema was already applied by this process
+    _initialized_paths: Set[str] = set()
+    
     def __init__(self, db_path: str = 'influencers.db'):
         self.db_path = db_path
-        # Initialize the database if it doesn't exist
-        self.init_db()
+        # Initialize the database if it doesn't exist (once per process, helpers
+        # are created all over the pipeline)
+        if os.path.abspath(db_path) not in DatabaseHelper._initialized_paths:
+            self.init_db()
+            DatabaseHelper._initialized_paths.add(os.path.abspath(db_path))
         
     def get_connection(self):
         """Get a connection to the SQLite database."""
@@ -194,12 +200,21 @@ class DatabaseHelper:
             # Get current timestamp
             now = conn.execute("SELECT datetime('now')").fetchone()[0]
             
+            # Upsert instead of INSERT OR REPLACE so columns not listed here
+            # (drafts, sent flags) survive a re-check
             cursor.execute('''
-                INSERT OR REPLACE INTO influencers (
+                INSERT INTO influencers (
                     username, full_name, bio, email, is_influencer, 
                     checked_influencer, checked_influencer_at
                 )
                 VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(username) DO UPDATE SET
+                    full_name = excluded.full_name,
+                    bio = excluded.bio,
+                    email = excluded.email,
+                    is_influencer = excluded.is_influencer,
+                    checked_influencer = excluded.checked_influencer,
+                    checked_influencer_at = excluded.checked_influencer_at
             ''', (username, full_name, bio, email, is_influencer, 
                  checked_influencer, now if checked_influencer else None))
             
@@ -301,7 +316,7 @@ class DatabaseHelper:
             cursor.execute(f'''
                 SELECT username, full_name, bio, email, is_influencer, 
                        needs_email_extraction, profile_updated_at, email_extracted_at,
-                       checked_influencer, checked_influencer_at
+                       checked_influencer, checked_influencer_at, email_sent, dm_sent
                 FROM influencers
                 WHERE username IN ({placeholders})
             ''', usernames)
@@ -318,7 +333,9 @@ class DatabaseHelper:
                     'profile_updated_at': row[6],
                     'email_extracted_at': row[7],
                     'checked_influencer': bool(row[8]) if row[8] is not None else False,
-                    'checked_influencer_at': row[9]
+                    'checked_influencer_at': row[9],
+                    'email_sent': bool(row[10]),
+                    'dm_sent': bool(row[11])
                 }
             
             return profiles
@@ -328,6 +345,41 @@ class DatabaseHelper:
         finally:
             conn.close()
     
+    def get_contact_states(self, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the check and contact state of usernames with a single query.
+        
+        'queued' is set when a message to the user is waiting in or was sent
+        through the outbox. Usernames unknown to the database are left out.
+        """
+        if not usernames:
+            return {}
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            placeholders = ','.join(['?'] * len(usernames))
+            cursor.execute(f'''
+                SELECT i.username, i.checked_influencer, i.is_influencer, i.email_sent, i.dm_sent,
+                       EXISTS (SELECT 1 FROM outbox o WHERE o.username = i.username AND o.state != 'failed')
+                FROM influencers i
+                WHERE i.username IN ({placeholders})
+            ''', usernames)
+            return {
+                row[0]: {
+                    'checked_influencer': bool(row[1]),
+                    'is_influencer': bool(row[2]),
+                    'email_sent': bool(row[3]),
+                    'dm_sent': bool(row[4]),
+                    'queued': bool(row[5])
+                }
+                for row in cursor.fetchall()
+            }
+        except Exception as e:
+            logger.error(f"Error getting contact states: {e}")
+            return {}
+        finally:
+            conn.close()
+    
     def get_usernames_without_emails(self) -> List[str]:
         """Get usernames that don't have emails."""
         conn = self.get_connection()
@@ -458,6 +510,740 @@ class DatabaseHelper:
         finally:
             conn.close()
     
+    def save_email_draft(self, username: str, subject: str, body: str,
+                         bio_hash: Optional[str] = None, template_version: Optional[str] = None):
+        """
+        Store a generated message draft so it survives a crash before sending.
+        
+        Args:
+            username: Instagram username
+            subject: Message subject
+            body: Message body
+            bio_hash: Hash of the bio the draft was generated from
+            template_version: Version of the prompt/template used to generate the draft
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+
+            # Get current timestamp
+            now = conn.execute("SELECT datetime('now')").fetchone()[0]
+
+            cursor.execute('''
+                UPDATE influencers
+                SET email_subject = ?,
+                    email_body = ?,
+                    email_generated_at = ?,
+                    draft_bio_hash = ?,
+                    draft_template_version = ?
+                WHERE username = ?
+            ''', (subject, body, now, bio_hash, template_version, username))
+
+            conn.commit()
+            logger.info(f"Saved message draft for {username} (template {template_version})")
+        except Exception as e:
+            logger.error(f"Error saving message draft for {username}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+
+    def get_email_drafts(self, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get stored message drafts for specific usernames."""
+        if not usernames:
+            return {}
+
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+
+            # Create a placeholder string with the correct number of placeholders
+            placeholders = ','.join(['?' for _ in usernames])
+
+            cursor.execute(f'''
+                SELECT username, email_subject, email_body, email_generated_at,
+                       draft_bio_hash, draft_template_version
+                FROM influencers
+                WHERE username IN ({placeholders})
+                AND email_subject IS NOT NULL AND email_body IS NOT NULL
+            ''', usernames)
+
+            drafts = {}
+            for row in cursor.fetchall():
+                drafts[row[0]] = {
+                    'subject': row[1],
+                    'body': row[2],
+                    'generated_at': row[3],
+                    'bio_hash': row[4],
+                    'template_version': row[5]
+                }
+
+            return drafts
+        except Exception as e:
+            logger.error(f"Error getting message drafts: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def enqueue_outbox(self, username: str, channel: str, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a message for delivery.
+        
+        Args:
+            username: Instagram username the message is for
+            channel: 'email' or 'dm'
+            payload: Message data, e.g. 'to', 'subject' and 'body'
+            
+        Returns:
+            bool: True if the message is waiting for delivery, False if it was
+            already sent, given up on after too many attempts, or is being sent
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            
+            # A message that is still waiting picks up the latest draft; one
+            # that was sent, failed for good or is being sent is left alone
+            cursor.execute('''
+                INSERT INTO outbox (username, channel, payload)
+                VALUES (?, ?, ?)
+                ON CONFLICT(username, channel) DO UPDATE SET
+                    payload = excluded.payload
+                WHERE outbox.state = 'pending'
+            ''', (username, channel, json.dumps(payload)))
+            
+            cursor.execute('''
+                SELECT state FROM outbox WHERE username = ? AND channel = ?
+            ''', (username, channel))
+            state = cursor.fetchone()[0]
+            
+            conn.commit()
+            return state == 'pending'
+        except Exception as e:
+            logger.error(f"Error queueing {channel} message for {username}: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+    
+    def release_outbox_items(self, ids: List[int], worker_id: str) -> int:
+        """Return claimed messages that were not attempted to the queue, keeping their attempt count."""
+        if not ids:
+            return 0
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE outbox SET state = 'pending', worker_id = NULL, lease_expires_at = NULL
+                WHERE id = ? AND worker_id = ? AND state = 'sending'
+            ''', [(item_id, worker_id) for item_id in ids])
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error releasing outbox messages: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+    
+    def claim_outbox_batch(self, channel: str, limit: int, worker_id: str,
+                           lease_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` due messages for a channel to a worker by moving them to 'sending'.
+        
+        Messages whose lease expired (their worker was killed or stalled) can
+        be claimed again; the worker renews a lease right before each send.
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            
+            # Take the write lock up front so two workers never claim the same rows
+            conn.execute('BEGIN IMMEDIATE')
+            
+            # Rows left in 'sending' before leases existed have none and count as expired
+            cursor.execute('''
+                SELECT id, username, payload, attempts FROM outbox
+                WHERE channel = ?
+                AND ((state = 'pending' AND datetime(next_attempt_at) <= datetime('now'))
+                     OR (state = 'sending' AND (lease_expires_at IS NULL
+                                                OR datetime(lease_expires_at) <= datetime('now'))))
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            ''', (channel, limit))
+            
+            items = []
+            for row in cursor.fetchall():
+                items.append({
+                    'id': row[0],
+                    'username': row[1],
+                    'channel': channel,
+                    'payload': json.loads(row[2]),
+                    'attempts': row[3],
+                    'worker_id': worker_id
+                })
+            
+            if items:
+                cursor.executemany('''
+                    UPDATE outbox SET state = 'sending', worker_id = ?, lease_expires_at = datetime('now', ?)
+                    WHERE id = ?
+                ''', [(worker_id, f"+{int(lease_seconds)} seconds", item['id']) for item in items])
+            
+            conn.commit()
+            return items
+        except Exception as e:
+            logger.error(f"Error claiming {channel} outbox messages: {e}")
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
+    
+    def renew_outbox_lease(self, item: Dict[str, Any], lease_seconds: float) -> bool:
+        """Extend the lease on a claimed message; False if its worker no longer holds it."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE outbox SET lease_expires_at = datetime('now', ?)
+                WHERE id = ? AND worker_id = ? AND state = 'sending'
+            ''', (f"+{int(lease_seconds)} seconds", item['id'], item['worker_id']))
+            conn.commit()
+            return cursor.rowcount == 1
+        except Exception as e:
+            logger.error(f"Error renewing lease on outbox message {item.get('id')}: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+    
+    def complete_outbox_item(self, item: Dict[str, Any]):
+        """
+        Mark a message as sent and record the send on the influencer.
+        
+        Raises the database error if the send could not be recorded, so the
+        caller never carries on as if it had been.
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            payload = item['payload']
+            
+            cursor.execute('''
+                UPDATE outbox
+                SET state = 'sent', attempts = attempts + 1, sent_at = datetime('now'), last_error = NULL,
+                    worker_id = NULL, lease_expires_at = NULL
+                WHERE id = ?
+            ''', (item['id'],))
+            
+            if item['channel'] == 'email':
+                cursor.execute(
+                    "UPDATE influencers SET email_sent = 1, email_sent_at = datetime('now'), "
+                    "email_subject = ?, email_body = ? WHERE username = ?",
+                    (payload.get('subject'), payload.get('body'), item['username'])
+                )
+            else:
+                cursor.execute(
+                    "UPDATE influencers SET dm_sent = 1, dm_sent_at = datetime('now'), "
+                    "dm_message = ? WHERE username = ?",
+                    (payload.get('body'), item['username'])
+                )
+            
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error completing outbox message {item.get('id')}: {e}")
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def fail_outbox_item(self, item: Dict[str, Any], error: str, retry_in_seconds: Optional[float]):
+        """
+        Record a failed delivery attempt.
+        
+        Args:
+            item: Claimed outbox message
+            error: Error description
+            retry_in_seconds: Delay before the next attempt, or None to give up
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            # A worker that lost the lease leaves the message to its new holder
+            if retry_in_seconds is None:
+                cursor.execute('''
+                    UPDATE outbox
+                    SET state = 'failed', attempts = attempts + 1, last_error = ?,
+                        worker_id = NULL, lease_expires_at = NULL
+                    WHERE id = ? AND worker_id = ?
+                ''', (error, item['id'], item['worker_id']))
+            else:
+                cursor.execute('''
+                    UPDATE outbox
+                    SET state = 'pending', attempts = attempts + 1, last_error = ?,
+                        next_attempt_at = datetime('now', ?), worker_id = NULL, lease_expires_at = NULL
+                    WHERE id = ? AND worker_id = ?
+                ''', (error, f"+{int(retry_in_seconds)} seconds", item['id'], item['worker_id']))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording failure for outbox message {item.get('id')}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def get_outbox_counts(self) -> Dict[str, Dict[str, int]]:
+        """Get the number of outbox messages per channel and state."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT channel, state, COUNT(*) FROM outbox GROUP BY channel, state")
+            counts: Dict[str, Dict[str, int]] = {}
+            for channel, state, count in cursor.fetchall():
+                counts.setdefault(channel, {})[state] = count
+            return counts
+        except Exception as e:
+            logger.error(f"Error getting outbox counts: {e}")
+            return {}
+        finally:
+            conn.close()
+    
+    def start_run(self, run_id: str, process: str, usernames: List[str]):
+        """Register a new run with the usernames it will process."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO runs (run_id, process, usernames) VALUES (?, ?, ?)
+            ''', (run_id, process, json.dumps(usernames)))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error starting run {run_id}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def get_unfinished_run(self, process: str) -> Optional[Dict[str, Any]]:
+        """Get the latest run of a process if it didn't complete."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT run_id, status, usernames, started_at FROM runs
+                WHERE process = ?
+                ORDER BY started_at DESC, rowid DESC LIMIT 1
+            ''', (process,))
+            row = cursor.fetchone()
+            if not row or row[1] == 'completed':
+                return None
+            return {
+                'run_id': row[0],
+                'status': row[1],
+                'usernames': json.loads(row[2]) if row[2] else [],
+                'started_at': row[3]
+            }
+        except Exception as e:
+            logger.error(f"Error getting unfinished {process} run: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def finish_run(self, run_id: str, status: str):
+        """Set the final status of a run ('completed' or 'failed')."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE runs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE run_id = ?
+            ''', (status, run_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error finishing run {run_id}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def record_run_stage(self, run_id: str, username: str, stage: str, data: Any = None):
+        """Record that a username completed a stage in a run, with the stage's result."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO run_ledger (run_id, username, stage, data) VALUES (?, ?, ?, ?)
+                ON CONFLICT(run_id, username, stage) DO UPDATE SET
+                    data = excluded.data,
+                    completed_at = CURRENT_TIMESTAMP
+            ''', (run_id, username, stage, json.dumps(data)))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording stage {stage} for {username} in run {run_id}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def get_run_ledger(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get the completed stages of a run as {username: {stage: data}}."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT username, stage, data FROM run_ledger WHERE run_id = ?
+            ''', (run_id,))
+            ledger: Dict[str, Dict[str, Any]] = {}
+            for username, stage, data in cursor.fetchall():
+                ledger.setdefault(username, {})[stage] = json.loads(data) if data else None
+            return ledger
+        except Exception as e:
+            logger.error(f"Error loading ledger for run {run_id}: {e}")
+            return {}
+        finally:
+            conn.close()
+    
+    def enqueue_verifications(self, usernames: List[str]) -> int:
+        """
+        Queue usernames for influencer verification by the worker processes.
+        
+        Usernames that were already checked or are already queued are skipped.
+        
+        Returns:
+            int: Number of usernames newly queued
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR IGNORE INTO verification_queue (username)
+                SELECT ? WHERE NOT EXISTS (
+                    SELECT 1 FROM influencers WHERE username = ? AND checked_influencer = 1
+                )
+            ''', [(username, username) for username in usernames])
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error queueing usernames for verification: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+    
+    def claim_verification_batch(self, worker_id: str, limit: int, lease_seconds: float) -> List[str]:
+        """
+        Lease up to `limit` usernames to a worker.
+        
+        Pending usernames that are due (retries wait for their backoff) and
+        usernames whose lease expired (their worker died or stalled) can be
+        claimed. The lease must be renewed before it runs out.
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            
+            # Take the write lock up front so two workers never claim the same rows
+            conn.execute('BEGIN IMMEDIATE')
+            
+            cursor.execute('''
+                SELECT username FROM verification_queue
+                WHERE (state = 'pending' AND (next_attempt_at IS NULL OR datetime(next_attempt_at) <= datetime('now')))
+                OR (state = 'leased' AND datetime(lease_expires_at) <= datetime('now'))
+                ORDER BY attempts, created_at, rowid
+                LIMIT ?
+            ''', (limit,))
+            usernames = [row[0] for row in cursor.fetchall()]
+            
+            if usernames:
+                cursor.executemany('''
+                    UPDATE verification_queue
+                    SET state = 'leased', worker_id = ?, lease_expires_at = datetime('now', ?)
+                    WHERE username = ?
+                ''', [(worker_id, f"+{int(lease_seconds)} seconds", username) for username in usernames])
+            
+            conn.commit()
+            return usernames
+        except Exception as e:
+            logger.error(f"Error claiming verifications for worker {worker_id}: {e}")
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
+    
+    def renew_verification_leases(self, worker_id: str, usernames: List[str], lease_seconds: float) -> List[str]:
+        """Extend the worker's leases; returns the usernames it still holds."""
+        if not usernames:
+            return []
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            placeholders = ','.join(['?'] * len(usernames))
+            cursor.execute(f'''
+                UPDATE verification_queue SET lease_expires_at = datetime('now', ?)
+                WHERE worker_id = ? AND state = 'leased' AND username IN ({placeholders})
+            ''', [f"+{int(lease_seconds)} seconds", worker_id] + usernames)
+            cursor.execute(f'''
+                SELECT username FROM verification_queue
+                WHERE worker_id = ? AND state = 'leased' AND username IN ({placeholders})
+            ''', [worker_id] + usernames)
+            held = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+            return held
+        except Exception as e:
+            logger.error(f"Error renewing leases for worker {worker_id}: {e}")
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
+    
+    def complete_verification(self, worker_id: str, username: str, is_influencer: bool) -> bool:
+        """
+        Record a worker's verdict and mark the user as checked.
+        
+        Returns:
+            bool: False if the worker no longer held the lease, in which case
+                  nothing is written
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE verification_queue
+                SET state = 'done', is_influencer = ?, checked_at = datetime('now'),
+                    lease_expires_at = NULL, last_error = NULL
+                WHERE username = ? AND worker_id = ? AND state = 'leased'
+            ''', (is_influencer, username, worker_id))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            
+            # Only the verdict is known here; profile columns are left as they are
+            cursor.execute('''
+                INSERT INTO influencers (username, is_influencer, checked_influencer, checked_influencer_at)
+                VALUES (?, ?, 1, datetime('now'))
+                ON CONFLICT(username) DO UPDATE SET
+                    is_influencer = excluded.is_influencer,
+                    checked_influencer = 1,
+                    checked_influencer_at = excluded.checked_influencer_at
+            ''', (username, is_influencer))
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error completing verification of {username}: {e}")
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+    
+    def release_verification(self, worker_id: str, username: str):
+        """Give a leased username back to the queue unchecked, e.g. when its worker stops."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE verification_queue
+                SET state = 'pending', worker_id = NULL, lease_expires_at = NULL
+                WHERE username = ? AND worker_id = ? AND state = 'leased'
+            ''', (username, worker_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error releasing verification of {username}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def fail_verification(self, username: str, error_class: str, error: str,
+                          retry_in_seconds: Optional[float], worker_id: Optional[str] = None):
+        """
+        Record a failed check and schedule its retry.
+        
+        The user is not marked as checked, so the failure doesn't drop them
+        from later runs.
+        
+        Args:
+            username: Instagram username that failed
+            error_class: Coarse error class (see verification.classify_error)
+            error: Error description
+            retry_in_seconds: Delay before the next attempt, or None to give up
+            worker_id: Worker holding the lease, or None for checks run outside the queue
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            state = 'failed' if retry_in_seconds is None else 'pending'
+            delay = None if retry_in_seconds is None else f"+{int(retry_in_seconds)} seconds"
+            if worker_id is not None:
+                cursor.execute('''
+                    UPDATE verification_queue
+                    SET state = ?, attempts = attempts + 1, error_class = ?, last_error = ?,
+                        next_attempt_at = datetime('now', ?), worker_id = NULL, lease_expires_at = NULL
+                    WHERE username = ? AND worker_id = ? AND state = 'leased'
+                ''', (state, error_class, error, delay, username, worker_id))
+            else:
+                cursor.execute('''
+                    INSERT INTO verification_queue (username, state, attempts, error_class, last_error, next_attempt_at)
+                    VALUES (?, ?, 1, ?, ?, datetime('now', ?))
+                    ON CONFLICT(username) DO UPDATE SET
+                        state = excluded.state,
+                        attempts = verification_queue.attempts + 1,
+                        error_class = excluded.error_class,
+                        last_error = excluded.last_error,
+                        next_attempt_at = excluded.next_attempt_at,
+                        worker_id = NULL,
+                        lease_expires_at = NULL
+                ''', (username, state, error_class, error, delay))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording failed verification of {username}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def resolve_verification_retries(self, verdicts: Dict[str, bool]):
+        """Close scheduled retries of usernames that were checked outside the queue."""
+        if not verdicts:
+            return
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE verification_queue
+                SET state = 'done', is_influencer = ?, checked_at = datetime('now'), next_attempt_at = NULL
+                WHERE username = ? AND state IN ('pending', 'failed')
+            ''', [(is_influencer, username) for username, is_influencer in verdicts.items()])
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error resolving verification retries: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def get_due_verification_retries(self, limit: int) -> List[str]:
+        """Get usernames whose failed check is due for another attempt, fewest attempts first."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT username FROM verification_queue
+                WHERE state = 'pending' AND attempts > 0
+                AND datetime(next_attempt_at) <= datetime('now')
+                ORDER BY attempts, next_attempt_at
+                LIMIT ?
+            ''', (limit,))
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting due verification retries: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def get_verification_results(self, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the queue state and verdict of the given usernames."""
+        if not usernames:
+            return {}
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            placeholders = ','.join(['?'] * len(usernames))
+            cursor.execute(f'''
+                SELECT username, state, is_influencer, attempts, error_class, last_error, next_attempt_at
+                FROM verification_queue
+                WHERE username IN ({placeholders})
+            ''', usernames)
+            return {
+                row[0]: {
+                    'state': row[1],
+                    'is_influencer': bool(row[2]) if row[2] is not None else None,
+                    'attempts': row[3],
+                    'error_class': row[4],
+                    'last_error': row[5],
+                    'next_attempt_at': row[6]
+                }
+                for row in cursor.fetchall()
+            }
+        except Exception as e:
+            logger.error(f"Error getting verification results: {e}")
+            return {}
+        finally:
+            conn.close()
+    
+    def heartbeat_verification_worker(self, worker_id: str, profile: str, stats: Dict[str, Any]):
+        """Register a verification worker or refresh its heartbeat and stats."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO verification_workers (worker_id, profile, stats) VALUES (?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET
+                    profile = excluded.profile,
+                    stats = excluded.stats,
+                    heartbeat_at = CURRENT_TIMESTAMP
+            ''', (worker_id, profile, json.dumps(stats)))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording heartbeat of worker {worker_id}: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+    
+    def get_verification_stats(self, window_seconds: float, alive_seconds: float) -> Dict[str, Any]:
+        """
+        Aggregate verification progress across workers.
+        
+        Args:
+            window_seconds: Period over which completed checks are counted
+            alive_seconds: Workers without a heartbeat for this long are reported as gone
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT state, COUNT(*) FROM verification_queue GROUP BY state")
+            queue = {state: count for state, count in cursor.fetchall()}
+            
+            # Usernames waiting for a retry or given up on, by error class
+            cursor.execute('''
+                SELECT error_class, state, COUNT(*) FROM verification_queue
+                WHERE attempts > 0 AND state IN ('pending', 'failed')
+                GROUP BY error_class, state
+            ''')
+            errors: Dict[str, Dict[str, int]] = {}
+            for error_class, state, count in cursor.fetchall():
+                errors.setdefault(error_class or 'other', {})['retrying' if state == 'pending' else 'failed'] = count
+            
+            window = f"-{int(window_seconds)} seconds"
+            cursor.execute('''
+                SELECT worker_id, COUNT(*) FROM verification_queue
+                WHERE state = 'done' AND datetime(checked_at) > datetime('now', ?)
+                GROUP BY worker_id
+            ''', (window,))
+            recent = {worker_id: count for worker_id, count in cursor.fetchall()}
+            
+            cursor.execute('''
+                SELECT worker_id, profile, stats, started_at, heartbeat_at,
+                       datetime(heartbeat_at) > datetime('now', ?)
+                FROM verification_workers ORDER BY started_at
+            ''', (f"-{int(alive_seconds)} seconds",))
+            workers = [
+                {
+                    'worker_id': row[0],
+                    'profile': row[1],
+                    'stats': json.loads(row[2]) if row[2] else {},
+                    'started_at': row[3],
+                    'heartbeat_at': row[4],
+                    'alive': bool(row[5]),
+                    'recent_checks': recent.get(row[0], 0)
+                }
+                for row in cursor.fetchall()
+            ]
+            
+            total_recent = sum(recent.values())
+            return {
+                'queue': queue,
+                'errors': errors,
+                'workers': workers,
+                'alive_workers': sum(1 for worker in workers if worker['alive']),
+                'recent_checks': total_recent,
+                'checks_per_minute': round(total_recent / window_seconds * 60, 2) if window_seconds else 0
+            }
+        except Exception as e:
+            logger.error(f"Error getting verification stats: {e}")
+            return {}
+        finally:
+            conn.close()
+    
     def clean_expired_cache(self):
         """Remove expired cache entries (older than 30 minutes)."""
         conn = self.get_connection()
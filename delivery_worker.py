@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Background delivery worker for the outbox table.
+
+Discovery and generation stages enqueue messages into the outbox; this
+worker drains it per channel with batching, per-channel rate limits and
+retries with exponential backoff. Messages survive restarts: a new run
+picks up whatever is still pending, including messages left unsent once
+the run's send budget was used up. Several workers can drain the outbox
+at once (concurrent runs, or a run next to `python delivery_worker.py`):
+each message is leased to one worker, and a message whose worker died is
+only picked up again once its lease has expired.
+
+Usage: python delivery_worker.py   (drains all due messages and exits)
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
+
+from db_helper import DatabaseHelper
+from budget import BudgetExhausted, get_budget
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Sender for one channel: takes a claimed outbox item, returns True on success
+ChannelSender = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+class SendRefused(Exception):
+    """Raised by a channel sender that deliberately didn't send a message; it is failed without retrying."""
+
+# How long a claimed message stays with its worker; the lease is renewed
+# right before each send, so this only needs to outlast one send
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "600"))
+
+# Per-channel pacing shared by all workers in the process, so concurrent
+# runs don't each send at the full channel rate
+_pacing: Dict[Tuple[str, float], TokenBucket] = {}
+_pacing_lock = threading.Lock()
+
+def _channel_bucket(channel: str, rate: float) -> TokenBucket:
+    """One send at a time per channel, spaced evenly at the channel's rate."""
+    with _pacing_lock:
+        bucket = _pacing.get((channel, rate))
+        if bucket is None:
+            bucket = _pacing[(channel, rate)] = TokenBucket(rate, 60, capacity=1)
+        return bucket
+
+class DeliveryWorker:
+    """Drain the outbox, one loop per channel."""
+
+    def __init__(self, senders: Dict[str, ChannelSender], db: Optional[DatabaseHelper] = None,
+                 per_minute: Optional[Dict[str, float]] = None,
+                 progress: Optional[Callable[..., None]] = None,
+                 on_delivered: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 worker_id: Optional[str] = None):
+        self.senders = senders
+        # Owner of the messages this worker claims; unique per worker, even within a process
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = OUTBOX_LEASE_SECONDS
+        self.db = db or DatabaseHelper()
+        self.per_minute = per_minute or {
+            "email": float(os.getenv("OUTBOX_EMAIL_PER_MINUTE", "20")),
+            "dm": float(os.getenv("OUTBOX_DM_PER_MINUTE", "6")),
+        }
+        self.batch_size = int(os.getenv("OUTBOX_BATCH_SIZE", "10"))
+        self.max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+        self.base_backoff = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "60"))
+        self.poll_interval = 1.0
+        self.progress = progress
+        # Called with each delivered item, e.g. to keep a contact index current
+        self.on_delivered = on_delivered
+        self.stats: Dict[str, Dict[str, int]] = {
+            channel: {"sent": 0, "retried": 0, "failed": 0} for channel in senders
+        }
+        self._pacing = {channel: _channel_bucket(channel, rate)
+                        for channel, rate in self.per_minute.items() if rate}
+
+    def _report(self, stage: str, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        if self.progress:
+            self.progress(stage, message, data)
+        else:
+            logger.info(message)
+
+    def backoff_seconds(self, attempts: int) -> float:
+        """Exponential backoff with jitter for the given number of previous attempts."""
+        return self.base_backoff * (2 ** attempts) * random.uniform(0.8, 1.2)
+
+    async def _pace(self, channel: str) -> None:
+        """Wait until the channel's rate limit allows another send."""
+        bucket = self._pacing.get(channel)
+        if bucket:
+            await bucket.acquire()
+
+    async def _deliver(self, item: Dict[str, Any]) -> None:
+        """Send one claimed message and record the outcome; raises BudgetExhausted before sending if out of sends."""
+        channel = item['channel']
+        username = item['username']
+        # Later items of a batch may have waited past their lease and been taken over
+        if not await asyncio.to_thread(self.db.renew_outbox_lease, item, self.lease_seconds):
+            self._report("delivery", f"Skipping {channel} to {username}, another worker took it over",
+                         {"username": username, "channel": channel})
+            return
+        get_budget().acquire("sends")
+        await self._pace(channel)
+
+        try:
+            success = await self.senders[channel](item)
+            error = None if success else "send returned failure"
+        except SendRefused as e:
+            await asyncio.to_thread(self.db.fail_outbox_item, item, str(e), None)
+            self.stats[channel]["failed"] += 1
+            self._report("delivery", f"Not sending {channel} to {username}: {e}",
+                         {"username": username, "channel": channel})
+            return
+        except Exception as e:
+            success = False
+            error = f"{type(e).__name__}: {e}"
+
+        if success:
+            try:
+                await asyncio.to_thread(self.db.complete_outbox_item, item)
+            except Exception as e:
+                # Stop rather than keep sending messages that can't be recorded;
+                # the item keeps its lease, so it isn't sent again until that runs out
+                self._report("error", f"Delivered {channel} to {username} but could not record it: {e}",
+                             {"username": username, "channel": channel, "error": str(e)})
+                raise
+            self.stats[channel]["sent"] += 1
+            if self.on_delivered:
+                self.on_delivered(item)
+            self._report("delivery", f"Delivered {channel} to {username}",
+                         {"username": username, "channel": channel})
+            return
+
+        attempts = item['attempts'] + 1
+        if attempts >= self.max_attempts:
+            await asyncio.to_thread(self.db.fail_outbox_item, item, error, None)
+            self.stats[channel]["failed"] += 1
+            self._report("error", f"Giving up on {channel} to {username} after {attempts} attempts: {error}",
+                         {"username": username, "channel": channel, "attempts": attempts})
+        else:
+            delay = self.backoff_seconds(item['attempts'])
+            await asyncio.to_thread(self.db.fail_outbox_item, item, error, delay)
+            self.stats[channel]["retried"] += 1
+            self._report("delivery", f"Retrying {channel} to {username} in {int(delay)}s: {error}",
+                         {"username": username, "channel": channel, "attempts": attempts})
+
+    async def _drain_channel(self, channel: str, idle: asyncio.Event) -> None:
+        """Claim and deliver batches for one channel until idle is signalled and nothing is due."""
+        budget = get_budget()
+        while True:
+            # Never claim more than the send budget has left
+            limit = min(self.batch_size, budget.remaining("sends"))
+            if limit < 1 or budget.remaining("minutes") <= 0:
+                self._report("delivery", f"Send or time budget used up, leaving remaining {channel} messages queued",
+                             {"channel": channel, "budget": budget.summary()})
+                return
+            batch = await asyncio.to_thread(self.db.claim_outbox_batch, channel, int(limit),
+                                            self.worker_id, self.lease_seconds)
+            if batch:
+                for i, item in enumerate(batch):
+                    try:
+                        await self._deliver(item)
+                    except BudgetExhausted:
+                        # The other channel took the last sends; unsent messages stay queued
+                        await asyncio.to_thread(self.db.release_outbox_items,
+                                                [unsent['id'] for unsent in batch[i:]], self.worker_id)
+                        break
+                    except BaseException:
+                        # Stopped mid-batch: hand back what wasn't attempted; the message
+                        # being sent keeps its lease in case it already went out
+                        await asyncio.to_thread(self.db.release_outbox_items,
+                                                [unsent['id'] for unsent in batch[i + 1:]], self.worker_id)
+                        raise
+                continue
+            if idle.is_set():
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self, idle: Optional[asyncio.Event] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Deliver messages until `idle` is set and no messages are due.
+
+        Producers set `idle` once they will enqueue nothing more. Messages
+        scheduled for a later retry stay in the outbox for the next run.
+        Without an event the worker drains what is currently due and returns.
+        """
+        if idle is None:
+            idle = asyncio.Event()
+            idle.set()
+
+        await asyncio.gather(*(self._drain_channel(channel, idle) for channel in self.senders))
+        return self.stats
+
+async def main():
+    """Drain all due outbox messages using the YOLO senders."""
+    from yolo_outreach import outbox_senders, close_smtp_sender
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    worker = DeliveryWorker(outbox_senders())
+    stats = await worker.run()
+    await close_smtp_sender()
+    logger.info(f"Delivery finished: {stats}, outbox: {worker.db.get_outbox_counts()}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
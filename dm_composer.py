@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Scripted Instagram DM composer.
+
+Drives the known DM flow directly with Playwright: open the profile, open the
+thread through the Message button or the options menu, make sure the thread
+is empty, then type the message (Shift+Enter between lines) and send it.
+Returns None when the page doesn't match the known layout so the caller can
+fall back to the browser agent.
+
+Usage: python dm_composer.py fixtures/dm/<mock>.html   (run the flow against a local mock)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Selectors for each step of the flow; the first visible match wins
+SELECTORS = {
+    "message_button": [
+        'div[role="button"]:text-is("Message")',
+        'button:text-is("Message")',
+    ],
+    "options_button": [
+        'svg[aria-label="Options"]',
+        '[role="button"]:has(svg[aria-label="Options"])',
+    ],
+    "send_message_item": [
+        'button:text-is("Send message")',
+        'div[role="dialog"] [role="button"]:text-is("Send message")',
+    ],
+    "dismiss_dialog": [
+        'button:text-is("Not Now")',
+        'button:text-is("Not now")',
+    ],
+    "composer": [
+        'div[role="textbox"][contenteditable="true"]',
+        'textarea[placeholder^="Message"]',
+    ],
+    "thread_message": [
+        'div[role="grid"] div[role="row"]',
+    ],
+    "send_button": [
+        'div[role="button"]:text-is("Send")',
+        'button:text-is("Send")',
+    ],
+}
+
+STEP_TIMEOUT_MS = int(os.getenv("DM_SCRIPTED_STEP_TIMEOUT_MS", "8000"))
+
+# How long to wait for an existing conversation to show up once the composer
+# is open; the thread history usually loads after the composer does
+THREAD_SETTLE_MS = int(os.getenv("DM_THREAD_SETTLE_MS", "3000"))
+
+def profile_url(username: str) -> str:
+    return f"https://www.instagram.com/{username}/"
+
+async def _find(page, *steps: str, timeout_ms: int = STEP_TIMEOUT_MS):
+    """Return the first visible element for any of the steps, waiting up to the timeout, or None."""
+    selector = ", ".join(selector for step in steps for selector in SELECTORS[step])
+    try:
+        locator = page.locator(selector).first
+        await locator.wait_for(state="visible", timeout=timeout_ms)
+        return locator
+    except Exception:
+        return None
+
+async def _dismiss_dialogs(page) -> None:
+    button = await _find(page, "dismiss_dialog", timeout_ms=1000)
+    if button is not None:
+        await button.click()
+
+async def _open_thread(page) -> Optional[str]:
+    """Open the DM thread from the profile; returns the route used or None."""
+    # Wait for whichever entry point the profile shows, then prefer the Message button
+    if await _find(page, "message_button", "options_button") is None:
+        return None
+    button = await _find(page, "message_button", timeout_ms=500)
+    if button is not None:
+        await button.click()
+        return "message_button"
+
+    options = await _find(page, "options_button", timeout_ms=500)
+    if options is None:
+        return None
+    await options.click()
+    item = await _find(page, "send_message_item", timeout_ms=3000)
+    if item is None:
+        return None
+    await item.click()
+    return "options_menu"
+
+async def _type_message(page, composer, message: str) -> None:
+    """Type the message into the composer in one go, using Shift+Enter for line breaks."""
+    await composer.click()
+    lines = message.split("\n")
+    for i, line in enumerate(lines):
+        if line:
+            await page.keyboard.insert_text(line)
+        if i < len(lines) - 1:
+            await page.keyboard.press("Shift+Enter")
+
+async def _composer_text(composer) -> str:
+    try:
+        return (await composer.evaluate("el => el.value !== undefined ? el.value : el.innerText")).strip()
+    except Exception:
+        return ""
+
+async def send_dm_scripted(page, username: str, message: str,
+                           url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Send a DM through the known page flow.
+
+    Returns a result dict with the route taken in 'path', or None if the
+    layout wasn't recognized before anything was typed. Failures after typing
+    started are returned as results, since an agent retry could send twice.
+    """
+    path = None
+    typed = False
+    try:
+        await page.goto(url or profile_url(username), wait_until="domcontentloaded")
+        await _dismiss_dialogs(page)
+
+        route = await _open_thread(page)
+        if route is None:
+            logger.info(f"No Message button or options route found for {username}")
+            return None
+
+        composer = await _find(page, "composer")
+        if composer is None:
+            logger.info(f"DM composer didn't open for {username}")
+            return None
+        await _dismiss_dialogs(page)
+
+        path = f"scripted:{route}"
+        if await _find(page, "thread_message", timeout_ms=THREAD_SETTLE_MS) is not None:
+            return {
+                'success': False,
+                'error': f'Conversation with @{username} already exists, not sending',
+                'existing_thread': True,
+                'path': path
+            }
+
+        typed = True
+        await _type_message(page, composer, message)
+        await page.keyboard.press("Enter")
+
+        # The composer empties once the message is sent; click Send if Enter didn't do it
+        for _ in range(20):
+            if not await _composer_text(composer):
+                break
+            await asyncio.sleep(0.25)
+        else:
+            send = await _find(page, "send_button", timeout_ms=1000)
+            if send is None:
+                return {
+                    'success': False,
+                    'error': 'Message was typed but could not be sent',
+                    'path': path
+                }
+            await send.click()
+
+        return {
+            'success': True,
+            'message': f'Successfully sent DM to @{username}',
+            'path': path
+        }
+    except Exception as e:
+        logger.warning(f"Scripted DM flow failed for {username}: {e}")
+        if typed:
+            return {'success': False, 'error': f'Scripted DM flow failed: {e}', 'path': path}
+        return None
+
+async def _run_mock(mock_path: str) -> Dict[str, Any]:
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            message = "Hi there!\nLoved your last reel.\n\nWould you like to try Ace Trace?"
+            result = await send_dm_scripted(page, "mock_user", message,
+                                            url="file://" + os.path.abspath(mock_path))
+            if result and result.get('success'):
+                # The mocks record what was sent so the line breaks can be checked
+                result['sent_text'] = await page.evaluate("window.sentMessages")
+            return {'result': result or {'fallback': 'agent'}}
+        finally:
+            await browser.close()
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python dm_composer.py <mock.html>")
+        sys.exit(1)
+    print(json.dumps(asyncio.run(_run_mock(sys.argv[1]))))
+
+if __name__ == '__main__':
+    main()
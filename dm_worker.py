@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Long-lived Instagram DM worker.
+
+Keeps one browser warm and sends DMs for jobs received as JSON lines, either
+over a local Unix socket (default) or over stdin/stdout (--stdio). Each job
+line looks like {"id": "...", "username": "...", "message": "..."} and gets
+exactly one result line back: {"id": "...", "success": true, ...}.
+
+Usage:
+    python dm_worker.py [--socket /tmp/instagram_dm_worker.sock]
+    python dm_worker.py --stdio
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+import time
+from typing import Dict, Any, Optional
+
+# browser_use reads this on import
+os.environ["ANONYMIZED_TELEMETRY"] = "false"
+
+from browser_use import Agent, Browser
+from llm_cassette import chat_llm, close_clients
+from dm_composer import send_dm_scripted
+from browser_profile import BrowserProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.getenv("DM_WORKER_SOCKET", "/tmp/instagram_dm_worker.sock")
+
+# Restart the browser after this many jobs to keep memory in check
+RECYCLE_AFTER = int(os.getenv("DM_WORKER_RECYCLE_AFTER", "50"))
+
+# Exit when no job arrived for this long (0 disables), so auto-started workers don't linger
+IDLE_TIMEOUT = float(os.getenv("DM_WORKER_IDLE_SECONDS", "900"))
+
+# Send through the scripted page flow and only run the agent on unrecognized layouts
+DM_SCRIPTED = os.getenv("DM_SCRIPTED", "true").lower() != "false"
+
+SEND_DM_TASK = """
+    Go to https://www.instagram.com/{username}/
+    Click on the "Message" button on their profile page. If there is "Message" button, open a menu via triple dot on the right side of profile name at the top of the page.
+    Wait for the DM conversation to open. Make sure there is no previous conversation. If there is a conversation, finish the task here.
+    Type the following message in the message input field and send it:
+    <message>
+    {message}
+    </message>
+    Do not send each line of the message separately. Send the entire message at once - type the whole message, do not use enter key, for new line use Shift+Enter.
+    Once the message is typed and sent (Enter key pressed or send button clicked), return true.
+    Do not wait for confirmation - just ensure the message was typed and sent.
+    """
+
+async def send_dm_with_browser(browser: Browser, username: str, message: str,
+                               profile: Optional[BrowserProfile] = None) -> Dict[str, Any]:
+    """
+    Send a direct message to an Instagram user in a fresh context of an open browser.
+
+    The scripted flow is tried first; the agent only runs when it doesn't
+    recognize the page.
+
+    Returns:
+        dict: Result with success status, any error message and the path used
+    """
+    try:
+        async with await browser.new_context() as ctx:
+            if profile is not None:
+                await profile.prepare_context(ctx)
+            
+            if DM_SCRIPTED:
+                page = await ctx.get_current_page()
+                result = await send_dm_scripted(page, username, message)
+                if result is not None:
+                    return result
+            
+            agent = Agent(
+                task=SEND_DM_TASK.format(username=username, message=message),
+                llm=chat_llm('gpt-4o'),
+                browser=browser,
+                browser_context=ctx,
+            )
+
+            # Run the agent
+            history = await agent.run()
+
+            # Try to parse the result
+            try:
+                result = history.final_result()
+                if result and 'true' in result.lower():
+                    return {
+                        'success': True,
+                        'message': f'Successfully sent DM to @{username}',
+                        'path': 'agent'
+                    }
+                else:
+                    return {
+                        'success': False,
+                        'error': 'Failed to send DM - could not confirm message was sent',
+                        'path': 'agent'
+                    }
+            except Exception as e:
+                return {
+                    'success': False,
+                    'error': f'Failed to parse result: {str(e)}',
+                    'path': 'agent'
+                }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Browser automation error: {str(e)}',
+            'browser_error': True
+        }
+
+class DMWorker:
+    """Runs DM jobs one at a time on a warm browser."""
+
+    def __init__(self, profile: Optional[BrowserProfile] = None):
+        self.profile = profile or BrowserProfile.from_env()
+        self.browser: Optional[Browser] = None
+        self.jobs_on_browser = 0
+        self.jobs_done = 0
+        self.paths: Dict[str, int] = {}
+        self.last_job_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def _reset_browser(self) -> None:
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+        self.browser = None
+        self.jobs_on_browser = 0
+
+    async def handle(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one DM job and return its result line."""
+        job_id = job.get('id')
+        username = job.get('username')
+        message = job.get('message')
+        if not username or not message:
+            return {'id': job_id, 'success': False, 'error': 'Job needs username and message'}
+
+        async with self._lock:
+            started = time.perf_counter()
+            if self.browser is None or self.jobs_on_browser >= RECYCLE_AFTER:
+                await self._reset_browser()
+                self.browser = self.profile.create_browser()
+
+            result = await send_dm_with_browser(self.browser, username, message, self.profile)
+            self.jobs_on_browser += 1
+            self.jobs_done += 1
+            self.last_job_at = time.monotonic()
+            path = result.get('path', 'none')
+            self.paths[path] = self.paths.get(path, 0) + 1
+            logger.info(f"DM to {username} via {path}: {'sent' if result.get('success') else result.get('error')}")
+
+            # A browser-level failure usually means Chrome died; start fresh next time
+            if result.pop('browser_error', False):
+                await self._reset_browser()
+
+            result.update({'id': job_id, 'username': username,
+                           'elapsed': round(time.perf_counter() - started, 2)})
+            return result
+
+    async def handle_line(self, line: str) -> Optional[Dict[str, Any]]:
+        """Parse one protocol line and return the response, or None for blank lines."""
+        if not line.strip():
+            return None
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError:
+            return {'success': False, 'error': 'Invalid JSON job'}
+
+        if job.get('command') == 'ping':
+            return {'id': job.get('id'), 'pong': True, 'jobs_done': self.jobs_done, 'paths': self.paths}
+        return await self.handle(job)
+
+    async def close(self) -> None:
+        await self._reset_browser()
+
+async def serve_socket(worker: DMWorker, socket_path: str) -> None:
+    """Serve JSON-lines jobs on a Unix socket until idle for IDLE_TIMEOUT."""
+    if os.path.exists(socket_path):
+        # Another live worker owns the socket; otherwise it's left over from a crash
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            logger.info(f"DM worker already running on {socket_path}")
+            return
+        except OSError:
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    async def on_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await worker.handle_line(line.decode())
+                if response is not None:
+                    writer.write((json.dumps(response) + '\n').encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(on_client, path=socket_path)
+    logger.info(f"DM worker listening on {socket_path}")
+    try:
+        async with server:
+            while True:
+                await asyncio.sleep(5)
+                idle_for = time.monotonic() - worker.last_job_at
+                if IDLE_TIMEOUT and idle_for > IDLE_TIMEOUT and not worker._lock.locked():
+                    logger.info(f"DM worker idle for {int(idle_for)}s, shutting down")
+                    break
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+async def serve_stdio(worker: DMWorker) -> None:
+    """Serve JSON-lines jobs on stdin, writing one result line per job to stdout."""
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        response = await worker.handle_line(line)
+        if response is not None:
+            sys.stdout.write(json.dumps(response) + '\n')
+            sys.stdout.flush()
+
+async def main():
+    parser = argparse.ArgumentParser(description='Long-lived Instagram DM worker.')
+    parser.add_argument('--socket', dest='socket_path', default=DEFAULT_SOCKET_PATH,
+                        help=f'Unix socket to listen on (default: {DEFAULT_SOCKET_PATH})')
+    parser.add_argument('--stdio', action='store_true',
+                        help='Read jobs from stdin and write results to stdout instead of a socket')
+    args = parser.parse_args()
+
+    # stdout carries results in stdio mode, so logs go to stderr
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    worker = DMWorker()
+    try:
+        if args.stdio:
+            await serve_stdio(worker)
+        else:
+            await serve_socket(worker, args.socket_path)
+    finally:
+        await worker.close()
+        await close_clients()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+from db_helper import DatabaseHelper
+
+logger = logging.getLogger(__name__)
+
+# Version the dashboard stores with drafts saved by hand; see DraftStore
+MANUAL_DRAFT_VERSION = "manual"
+
+def bio_hash(bio: Optional[str]) -> str:
+    """Return a short stable hash of a bio, used to detect bio changes."""
+    return hashlib.sha256((bio or '').strip().encode('utf-8')).hexdigest()[:16]
+
+class DraftStore:
+    """
+    Reuse message drafts stored in the database instead of regenerating them.
+
+    A stored draft is valid for an influencer as long as their bio and the
+    prompt/template version it was generated with are unchanged. Drafts saved
+    by hand from the dashboard were written or reviewed by a person, so they
+    are reused under any version while the bio is unchanged. Drafts without
+    a bio hash (saved before drafts were tracked) are regenerated.
+    """
+
+    def __init__(self, template_version: str, db: Optional[DatabaseHelper] = None):
+        self.template_version = template_version
+        self.db = db or DatabaseHelper()
+        self.drafts: Dict[str, Dict[str, Any]] = {}
+        self.loaded: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, usernames: List[str]) -> int:
+        """Load stored drafts for a batch of usernames with a single query."""
+        self.drafts.update(self.db.get_email_drafts(usernames))
+        self.loaded.update(usernames)
+        return len(self.drafts)
+
+    def is_valid(self, influencer: Dict[str, Any], draft: Dict[str, Any]) -> bool:
+        """Check whether a stored draft still matches the influencer's bio and the current version."""
+        if draft.get('bio_hash') is None or draft['bio_hash'] != bio_hash(influencer.get('bio')):
+            return False
+        return draft.get('template_version') in (self.template_version, MANUAL_DRAFT_VERSION)
+
+    def get(self, influencer: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Return a reusable draft for the influencer, or None if one has to be generated."""
+        username = influencer.get('username')
+        draft = self.drafts.get(username)
+        # Preloaded usernames never hit the database again
+        if draft is None and username not in self.loaded:
+            draft = self.db.get_email_drafts([username]).get(username)
+
+        if draft and self.is_valid(influencer, draft):
+            self.hits += 1
+            return {'subject': draft['subject'], 'body': draft['body']}
+
+        self.misses += 1
+        return None
+
+    def save(self, influencer: Dict[str, Any], message: Dict[str, str]) -> None:
+        """Persist a freshly generated draft keyed on the current bio and version."""
+        username = influencer.get('username')
+        draft = {
+            'subject': message['subject'],
+            'body': message['body'],
+            'bio_hash': bio_hash(influencer.get('bio')),
+            'template_version': self.template_version
+        }
+        self.db.save_email_draft(username, draft['subject'], draft['body'],
+                                 bio_hash=draft['bio_hash'],
+                                 template_version=draft['template_version'])
+        self.drafts[username] = draft
@@ -0,0 +1,398 @@
+"""
+Record/replay layer for OpenAI chat completion calls.
+
+Every chat completion request made through the clients created here is keyed
+by model plus a hash of the normalized messages. In record mode live
+responses are appended to a JSON-lines cassette; in replay mode they are
+served from it, so pipelines can be benchmarked offline and repeatably.
+
+Live completions (with the cassette on or off) are also metered against the
+run's budget (see budget.py): token usage is recorded from each response and
+requests are refused once the LLM budget is used up. They wait for request
+and token capacity in the process's rate limiter (see rate_limiter.py);
+replayed responses don't.
+
+Configured with environment variables:
+    LLM_CASSETTE_MODE        off (default) | record | replay | strict
+                             replay falls back to a live call (and records it)
+                             on a miss, strict raises CassetteMiss instead
+    LLM_CASSETTE_PATH        cassette file (default: llm_cassette.jsonl)
+    LLM_CASSETTE_LATENCY_MS  simulated latency per replayed call in ms, or
+                             "recorded" to replay the latency seen when recording
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from budget import BudgetExhausted, get_budget
+from rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")
+CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+CASSETTE_LATENCY_MS = os.getenv("LLM_CASSETTE_LATENCY_MS", "0")
+
+class CassetteMiss(Exception):
+    """Raised in strict replay mode when a request has no recorded response."""
+
+def normalize_content(content: Any) -> Any:
+    """Normalize message content so cosmetic differences don't change the key."""
+    if isinstance(content, str):
+        return ' '.join(content.split())
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, dict) and part.get('type') == 'text':
+                parts.append({'type': 'text', 'text': ' '.join(part.get('text', '').split())})
+            elif isinstance(part, dict) and part.get('type') == 'image_url':
+                # Browser agent screenshots differ on every run; only their presence counts
+                parts.append({'type': 'image_url'})
+            else:
+                parts.append(part)
+        return parts
+    return content
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """Build the cassette key for a chat completion request payload."""
+    messages = [
+        {'role': message.get('role'), 'content': normalize_content(message.get('content'))}
+        for message in payload.get('messages', [])
+    ]
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{payload.get('model')}:{digest}"
+
+class Cassette:
+    """JSON-lines store of recorded chat completion responses."""
+
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = CASSETTE_MODE,
+                 latency_ms: str = CASSETTE_LATENCY_MS):
+        self.path = path
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.play_counts: Dict[str, int] = {}
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "live": 0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Load previously recorded entries."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.entries.setdefault(entry['key'], []).append(entry)
+        logger.info(f"Loaded {sum(len(e) for e in self.entries.values())} cassette entries from {self.path}")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode in ("replay", "strict")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode in ("record", "replay")
+
+    def has(self, key: str) -> bool:
+        """Whether a response was recorded for a key."""
+        with self._lock:
+            return bool(self.entries.get(key))
+
+    def play(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the next recorded entry for a key, repeating the last one when exhausted."""
+        with self._lock:
+            entries = self.entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                return None
+            index = self.play_counts.get(key, 0)
+            self.play_counts[key] = index + 1
+            self.stats["hits"] += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def record(self, key: str, model: str, response: Dict[str, Any], latency_ms: float) -> None:
+        """Append a live response to the cassette."""
+        entry = {"key": key, "model": model, "latency_ms": round(latency_ms, 1), "response": response}
+        with self._lock:
+            self.entries.setdefault(key, []).append(entry)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.stats["recorded"] += 1
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        """Simulated latency in seconds for a replayed entry."""
+        if self.latency_ms == "recorded":
+            return entry.get("latency_ms", 0) / 1000
+        return float(self.latency_ms or 0) / 1000
+
+def _chat_payload(request: httpx.Request) -> Optional[Dict[str, Any]]:
+    """Return the JSON payload if the request is a non-streaming chat completion."""
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    payload = json.loads(request.content or b'{}')
+    if payload.get('stream'):
+        return None
+    return payload
+
+def _check_budget() -> None:
+    get_budget().check("llm_usd", "llm_tokens")
+
+def _estimate_tokens(payload: Dict[str, Any]) -> int:
+    """Rough token count of a request (about 4 characters per token) plus its output allowance."""
+    # Screenshots count as their presence only, like in the cassette key
+    messages = [normalize_content(message.get('content')) for message in payload.get('messages', [])]
+    return len(json.dumps(messages)) // 4 + int(payload.get('max_tokens') or payload.get('max_completion_tokens') or 0)
+
+def _record_usage(payload: Dict[str, Any], response: httpx.Response, estimated_tokens: int) -> None:
+    usage = {}
+    if response.status_code == 200:
+        usage = response.json().get('usage') or {}
+        get_budget().record_llm_usage(payload.get('model'), usage)
+    # Settle the token estimate against what the request actually used
+    get_rate_limiter().refund("openai_tokens", estimated_tokens - (usage.get('total_tokens') or 0))
+
+class CassetteTransport(httpx.BaseTransport):
+    """Sync httpx transport that records or replays chat completions (no cassette: only meters them)."""
+
+    def __init__(self, cassette: Optional[Cassette], wrapped: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.wrapped = wrapped or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        payload = _chat_payload(request)
+        if payload is None:
+            return self.wrapped.handle_request(request)
+
+        key = request_key(payload)
+        if self.cassette and self.cassette.replaying:
+            entry = self.cassette.play(key)
+            if entry:
+                time.sleep(self.cassette.replay_delay(entry))
+                return httpx.Response(200, json=entry["response"], request=request)
+            if self.cassette.mode == "strict":
+                raise CassetteMiss(f"No recorded response for {key}")
+
+        _check_budget()
+        limiter = get_rate_limiter()
+        estimated_tokens = _estimate_tokens(payload)
+        limiter.acquire_sync("openai_requests")
+        limiter.acquire_sync("openai_tokens", estimated_tokens)
+        started = time.perf_counter()
+        response = self.wrapped.handle_request(request)
+        response.read()
+        _record_usage(payload, response, estimated_tokens)
+        if self.cassette is None:
+            return response
+        self.cassette.stats["live"] += 1
+        if self.cassette.recording and response.status_code == 200:
+            self.cassette.record(key, payload.get('model'), response.json(),
+                                 (time.perf_counter() - started) * 1000)
+        return response
+
+    def close(self) -> None:
+        self.wrapped.close()
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """Async httpx transport that records or replays chat completions (no cassette: only meters them)."""
+
+    def __init__(self, cassette: Optional[Cassette], wrapped: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.wrapped = wrapped or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        payload = _chat_payload(request)
+        if payload is None:
+            return await self.wrapped.handle_async_request(request)
+
+        key = request_key(payload)
+        if self.cassette and self.cassette.replaying:
+            entry = self.cassette.play(key)
+            if entry:
+                await asyncio.sleep(self.cassette.replay_delay(entry))
+                return httpx.Response(200, json=entry["response"], request=request)
+            if self.cassette.mode == "strict":
+                raise CassetteMiss(f"No recorded response for {key}")
+
+        _check_budget()
+        limiter = get_rate_limiter()
+        estimated_tokens = _estimate_tokens(payload)
+        await limiter.acquire("openai_requests")
+        await limiter.acquire("openai_tokens", estimated_tokens)
+        started = time.perf_counter()
+        response = await self.wrapped.handle_async_request(request)
+        await response.aread()
+        _record_usage(payload, response, estimated_tokens)
+        if self.cassette is None:
+            return response
+        self.cassette.stats["live"] += 1
+        if self.cassette.recording and response.status_code == 200:
+            # Appending to the cassette file is blocking I/O
+            await asyncio.to_thread(self.cassette.record, key, payload.get('model'), response.json(),
+                                    (time.perf_counter() - started) * 1000)
+        return response
+
+    async def aclose(self) -> None:
+        await self.wrapped.aclose()
+
+# Shared cassette for the process
+_cassette_instance = None
+
+def get_cassette() -> Optional[Cassette]:
+    """Get the shared cassette, or None when the cassette is switched off."""
+    global _cassette_instance
+    if CASSETTE_MODE == "off":
+        return None
+    if _cassette_instance is None:
+        _cassette_instance = Cassette()
+    return _cassette_instance
+
+# Shared HTTP clients: one sync client for the process and one async client
+# per event loop (an async client's connections belong to the loop that
+# opened them). Reusing them keeps connections to the API alive between
+# requests instead of opening new ones for every client.
+_http_client: Optional[httpx.Client] = None
+_sync_openai = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, Any]]" = \
+    weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+def _check_before_send(request: httpx.Request) -> None:
+    """Refuse a live chat completion once the run's LLM budget is used up, or on a strict replay miss."""
+    payload = _chat_payload(request)
+    if payload is None:
+        return
+    cassette = get_cassette()
+    if cassette and cassette.replaying:
+        key = request_key(payload)
+        if cassette.has(key):
+            return
+        if cassette.mode == "strict":
+            raise CassetteMiss(f"No recorded response for {key}")
+    _check_budget()
+
+@functools.lru_cache(maxsize=None)
+def _client_classes() -> Tuple[type, type]:
+    """
+    OpenAI clients that raise the run's own errors as they are.
+
+    The SDK retries anything a transport raises and re-raises it as an
+    APIConnectionError, which would hide BudgetExhausted and CassetteMiss
+    from the pipeline's handlers. Both are checked before each request is
+    handed to the transport, and one the transport raised anyway is unwrapped.
+    """
+    from openai import APIConnectionError, AsyncOpenAI, OpenAI
+
+    class MeteredOpenAI(OpenAI):
+        def _prepare_request(self, request: httpx.Request) -> None:
+            super()._prepare_request(request)
+            _check_before_send(request)
+
+        def request(self, *args, **kwargs):
+            try:
+                return super().request(*args, **kwargs)
+            except APIConnectionError as e:
+                if isinstance(e.__cause__, (BudgetExhausted, CassetteMiss)):
+                    raise e.__cause__
+                raise
+
+    class MeteredAsyncOpenAI(AsyncOpenAI):
+        async def _prepare_request(self, request: httpx.Request) -> None:
+            await super()._prepare_request(request)
+            _check_before_send(request)
+
+        async def request(self, *args, **kwargs):
+            try:
+                return await super().request(*args, **kwargs)
+            except APIConnectionError as e:
+                if isinstance(e.__cause__, (BudgetExhausted, CassetteMiss)):
+                    raise e.__cause__
+                raise
+
+    return MeteredOpenAI, MeteredAsyncOpenAI
+
+def _client_kwargs() -> Dict[str, Any]:
+    """Offline replay doesn't need a real key, but the clients refuse to start without one."""
+    cassette = get_cassette()
+    kwargs: Dict[str, Any] = {}
+    if cassette and cassette.replaying and not os.getenv("OPENAI_API_KEY"):
+        kwargs["api_key"] = "cassette-replay"
+    # A strict miss won't turn into a hit by retrying (this also covers the
+    # browser agents' clients, which raise it wrapped)
+    if cassette and cassette.mode == "strict":
+        kwargs["max_retries"] = 0
+    return kwargs
+
+def _sync_http_client() -> httpx.Client:
+    global _http_client
+    with _clients_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(transport=CassetteTransport(get_cassette()))
+        return _http_client
+
+def _async_clients_for_loop() -> Tuple[httpx.AsyncClient, Any]:
+    """The running loop's async HTTP client and the AsyncOpenAI client using it."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            http_client = httpx.AsyncClient(transport=AsyncCassetteTransport(get_cassette()))
+            clients = (http_client, _client_classes()[1](http_client=http_client, **_client_kwargs()))
+            _async_clients[loop] = clients
+        return clients
+
+def openai_client():
+    """The process's sync OpenAI client, going through the cassette when enabled."""
+    global _sync_openai
+    http_client = _sync_http_client()
+    with _clients_lock:
+        if _sync_openai is None:
+            _sync_openai = _client_classes()[0](http_client=http_client, **_client_kwargs())
+        return _sync_openai
+
+def async_openai_client():
+    """The running event loop's AsyncOpenAI client, going through the cassette when enabled."""
+    return _async_clients_for_loop()[1]
+
+def chat_llm(model: str = 'gpt-4o', **kwargs):
+    """Create a ChatOpenAI model for browser agents on the shared clients, going through the cassette when enabled."""
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=model,
+        http_client=_sync_http_client(),
+        http_async_client=_async_clients_for_loop()[0],
+        **_client_kwargs(),
+        **kwargs
+    )
+
+async def close_clients() -> None:
+    """Close the running loop's async clients and the sync client; they are recreated on next use."""
+    global _http_client, _sync_openai
+    with _clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), None)
+        http_client, _http_client, _sync_openai = _http_client, None, None
+    if clients is not None:
+        await clients[0].aclose()
+    if http_client is not None:
+        http_client.close()
+
+def cassette_stats() -> Optional[Dict[str, Any]]:
+    """Hit/miss/record counters for the current process, or None when switched off."""
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    return {"mode": cassette.mode, "path": cassette.path, **cassette.stats}
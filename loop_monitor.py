@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class LoopLagMonitor:
+    """
+    Watchdog for event loop lag.
+
+    A heartbeat task measures how late the loop wakes it up. A watchdog
+    thread notices when the heartbeat stalls and captures the loop thread's
+    stack at that moment, which points at the blocking call. The slowest
+    stalls are kept with their stacks for the progress data.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, keep: int = 10):
+        self.interval = interval
+        self.threshold = threshold
+        self.keep = keep
+        self.samples = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.stalls: List[Dict[str, Any]] = []
+        self._last_beat = time.monotonic()
+        self._pending_stack: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._publisher: Optional[asyncio.Task] = None
+        self._progress_monitor = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> Optional["LoopLagMonitor"]:
+        """Create a monitor configured from LOOP_LAG_* variables, or None if disabled."""
+        if os.getenv("LOOP_LAG_MONITOR", "true").lower() == "false":
+            return None
+        return cls(threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250")) / 1000)
+
+    def start(self, progress_monitor=None) -> None:
+        """Start monitoring the running event loop, publishing to a progress monitor if given."""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = loop.create_task(self._heartbeat())
+        if progress_monitor is not None:
+            self._progress_monitor = progress_monitor
+            self._publisher = loop.create_task(self._publish())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> Dict[str, Any]:
+        """Stop the heartbeat and watchdog and return the final report."""
+        self._stopped.set()
+        for task in (self._task, self._publisher):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        report = self.report()
+        if self._progress_monitor is not None:
+            self._progress_monitor.set_metric("loop_lag", report, write=True)
+        return report
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self._lock:
+                self._last_beat = now
+                self.samples += 1
+                self.total_lag += lag
+                self.max_lag = max(self.max_lag, lag)
+                if lag >= self.threshold:
+                    self._record_stall(lag)
+                self._pending_stack = None
+
+    def _record_stall(self, lag: float) -> None:
+        """Keep the stall if it is among the slowest seen (called with the lock held)."""
+        stall = {
+            "lag_ms": round(lag * 1000, 1),
+            "at": time.time(),
+            "stack": self._pending_stack or ["(stack not captured)"]
+        }
+        self.stalls.append(stall)
+        self.stalls.sort(key=lambda s: s["lag_ms"], reverse=True)
+        del self.stalls[self.keep:]
+        logger.warning(f"Event loop blocked for {stall['lag_ms']}ms at {stall['stack'][-1].strip()}")
+
+    def _watch(self) -> None:
+        """Capture the loop thread's stack while the heartbeat is overdue."""
+        while not self._stopped.wait(self.interval / 2):
+            with self._lock:
+                overdue = time.monotonic() - self._last_beat - self.interval
+                if overdue < self.threshold or self._pending_stack is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = [line.rstrip() for line in traceback.format_stack(frame, limit=12)]
+            with self._lock:
+                self._pending_stack = stack
+
+    def report(self) -> Dict[str, Any]:
+        """Lag statistics and the slowest blocking stalls with their stacks."""
+        with self._lock:
+            return {
+                "samples": self.samples,
+                "avg_lag_ms": round(self.total_lag / self.samples * 1000, 1) if self.samples else 0,
+                "max_lag_ms": round(self.max_lag * 1000, 1),
+                "threshold_ms": round(self.threshold * 1000, 1),
+                "slowest_stalls": [dict(stall) for stall in self.stalls]
+            }
+
+    async def _publish(self, every: float = 5.0) -> None:
+        """Periodically attach the report to the progress monitor's metrics."""
+        while True:
+            self._progress_monitor.set_metric("loop_lag", self.report())
+            await asyncio.sleep(every)
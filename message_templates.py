@@ -0,0 +1,75 @@
+import os
+from typing import Dict, Any, Optional
+
+# Versioned outreach templates. Never edit a published version in place:
+# add a new one and point YOLO_TEMPLATE_VERSION at it, so stored drafts
+# rendered from the old version get regenerated.
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    "template-v1": {
+        "subject": "Ace Trace affiliate partnership for {display_name}",
+        "body": (
+            "Hi {display_name},\n\n"
+            "{opening_line}\n\n"
+            "{offer}\n\n"
+            "Would you be interested? Just reply to this message and I'll send over your promo code.\n\n"
+            "Best regards,\n"
+            "Alexander"
+        ),
+        "offer": (
+            "I'm reaching out from Ace Trace, a golf shot tracking app that records every shot "
+            "and shows golfers where their game is won and lost. We'd love to have you in our "
+            "affiliate program:\n"
+            "- free access to the app\n"
+            "- 15% commission on every sale made with your personal promo code\n"
+            "- 10% discount for your followers with the same code\n"
+            "We wire commissions monthly and share promo code reports."
+        ),
+        "default_opening": "I came across your golf content on Instagram and really enjoyed it.",
+    },
+}
+
+CURRENT_TEMPLATE_VERSION = os.getenv("YOLO_TEMPLATE_VERSION", "template-v1")
+
+# Opening lines longer than this are treated as invalid LLM output
+MAX_OPENING_LINE_LENGTH = 300
+
+def get_template(version: Optional[str] = None) -> Dict[str, str]:
+    """Get a template by version, defaulting to the configured version."""
+    version = version or CURRENT_TEMPLATE_VERSION
+    if version not in TEMPLATES:
+        raise ValueError(f"Unknown message template version: {version}")
+    return TEMPLATES[version]
+
+def clean_opening_line(opening_line: Optional[str]) -> Optional[str]:
+    """Normalize an LLM-written opening line, returning None if it is unusable."""
+    if not opening_line:
+        return None
+    line = ' '.join(opening_line.split())
+    if not line or len(line) > MAX_OPENING_LINE_LENGTH:
+        return None
+    return line
+
+def render_message(influencer: Dict[str, Any], opening_line: Optional[str] = None,
+                   version: Optional[str] = None) -> Dict[str, str]:
+    """
+    Render a message locally from a versioned template.
+
+    Args:
+        influencer: Profile with at least 'username', optionally 'full_name'
+        opening_line: Personalized first line; the template default is used if missing
+        version: Template version, defaults to CURRENT_TEMPLATE_VERSION
+
+    Returns:
+        dict: Message with 'subject' and 'body' fields
+    """
+    template = get_template(version)
+    display_name = (influencer.get('full_name') or '').strip() or influencer.get('username') or 'there'
+    values = {
+        "display_name": display_name,
+        "opening_line": clean_opening_line(opening_line) or template["default_opening"],
+        "offer": template["offer"],
+    }
+    return {
+        "subject": template["subject"].format(**values),
+        "body": template["body"].format(**values),
+    }
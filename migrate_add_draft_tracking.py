@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Migration to add message draft tracking columns to the database.
+"""
+
+import sqlite3
+import sys
+
+def migrate():
+    """Add columns that identify which bio and prompt version a stored draft was generated for."""
+    try:
+        conn = sqlite3.connect('influencers.db')
+        cursor = conn.cursor()
+        
+        # Check if columns already exist
+        cursor.execute("PRAGMA table_info(influencers)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        columns_to_add = []
+        
+        if 'draft_bio_hash' not in columns:
+            columns_to_add.append("ALTER TABLE influencers ADD COLUMN draft_bio_hash TEXT")
+            
+        if 'draft_template_version' not in columns:
+            columns_to_add.append("ALTER TABLE influencers ADD COLUMN draft_template_version TEXT")
+        
+        if columns_to_add:
+            print(f"Adding {len(columns_to_add)} new columns for draft tracking...")
+            for sql in columns_to_add:
+                cursor.execute(sql)
+                print(f"  ✓ {sql}")
+            
+            conn.commit()
+            print("Migration completed successfully!")
+        else:
+            print("All draft tracking columns already exist. No migration needed.")
+        
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"Error during migration: {e}")
+        return False
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -1,6 +1,4 @@
 import sys
-from browser_use import Agent, Browser, BrowserConfig, Controller
-from langchain_openai import ChatOpenAI
 import asyncio
 import os
 import json
@@ -10,25 +8,53 @@ from typing import List, Dict, Any, Optional
 from scraper import HashtagScraper
 from pydantic import BaseModel
 from client import ApifyHelper
-from openai import OpenAI
+from llm_cassette import CassetteMiss, async_openai_client, cassette_stats, close_clients
 from db_helper import DatabaseHelper
+from loop_monitor import LoopLagMonitor
+from verification import VerificationEngine
+from qualification import QUALIFY_MODE, QUALIFY_BATCH_SIZE, qualify_by_post_data
+from candidate_scoring import score_candidates, rank_candidates
+from pipeline import Pipeline, Stage
+from run_ledger import RunLedger
+from budget import Budget, BudgetExhausted, get_budget, start_budget
+from rate_limiter import get_rate_limiter
+from shared_memo import SharedMemo
+from campaign import claim_usernames, get_campaign, release_usernames
+from verification_worker import VERIFY_LEASE_BATCH, VERIFY_POLL_SECONDS, schedule_retry
 import progress_monitor
+from progress_monitor import StopRequested
 
 os.environ["ANONYMIZED_TELEMETRY"] = "false"
 
-# Get the progress monitor
-monitor = progress_monitor.get_monitor("outreach")
+# Usernames per profile scraper run and per bio extraction request in the pipeline
+PIPELINE_PROFILE_BATCH_SIZE = int(os.getenv("PIPELINE_PROFILE_BATCH_SIZE", "10"))
+PIPELINE_EMAIL_BATCH_SIZE = int(os.getenv("PIPELINE_EMAIL_BATCH_SIZE", "10"))
+
+# How many profile scraper runs and extraction requests may be in flight at once
+PIPELINE_PROFILE_CONCURRENCY = int(os.getenv("PIPELINE_PROFILE_CONCURRENCY", "2"))
+PIPELINE_EMAIL_CONCURRENCY = int(os.getenv("PIPELINE_EMAIL_CONCURRENCY", "2"))
+
+# Hand influencer checks to verification_worker.py processes through the DB queue
+VERIFY_WORKERS = os.getenv("VERIFY_WORKERS", "false").lower() == "true"
+
+# Failed checks that are due for a retry added after each run's new candidates
+VERIFY_RETRY_WAVE = int(os.getenv("VERIFY_RETRY_WAVE", "20"))
+
+# Profiles and extracted emails shared by all runs in the process, so
+# campaigns running side by side don't fetch the same user twice. Empty
+# results (failed scrapes, bios without an email) aren't kept.
+profile_memo = SharedMemo(keep=lambda profile: bool(profile.get('full_name') or profile.get('bio')))
+email_memo = SharedMemo(keep=bool)
 
 # Progress reporting function
 def progress_update(stage, message, data=None):
     """Update progress using the monitor instead of print statements."""
+    monitor = progress_monitor.current_monitor("outreach")
     # Update the progress file with structured data
     monitor.update_progress(stage, message, data=data)
     
     # Check if we should stop
-    if monitor.should_stop():
-        monitor.log(f"Received stop command during stage: {stage}", "warning")
-        sys.exit(0)
+    monitor.check_stop(stage)
 
 get_view_count = (    
     "Open the {username} user reels with a URL like this https://www.instagram.com/{username}/reels/ "
@@ -40,11 +66,36 @@ get_view_count = (
     "Return true or false"
 )
 
+def rank_usernames(scraper: HashtagScraper, usernames: List[str]) -> List[str]:
+    """Order usernames by their hashtag post score, dropping low scorers if a prune threshold is set."""
+    scores = score_candidates(usernames, scraper.get_posts_by_user(), scraper.hashtags,
+                              scraper.is_video_post, scraper.extract_hashtags_from_caption)
+    ranked, pruned = rank_candidates(usernames, scores)
+    progress_update("scoring", f"Ranked {len(ranked)} candidates, pruned {len(pruned)} below the score threshold", 
+                   {"scored": len(scores), "ranked": len(ranked), "pruned": len(pruned), 
+                    "top": [{"username": username, "score": scores.get(username)} for username in ranked[:10]]})
+    return ranked
+
+async def add_retry_wave(usernames: List[str]) -> List[str]:
+    """Append candidates whose failed check is due for another attempt."""
+    if VERIFY_WORKERS:
+        # The workers take due retries from the queue themselves
+        return usernames
+    due = await asyncio.to_thread(DatabaseHelper().get_due_verification_retries, VERIFY_RETRY_WAVE)
+    known = set(usernames)
+    retries = [username for username in due if username not in known]
+    if retries:
+        progress_update("retries", f"Retrying {len(retries)} candidates whose check failed in an earlier run", 
+                       {"usernames": retries})
+    return usernames + retries
+
 async def get_usernames() -> List[str]:
-    scraper = HashtagScraper()
+    campaign = get_campaign("yolo")
+    scraper = HashtagScraper(campaign.hashtags, campaign.results_limit)
     progress_update("hashtags", "Fetching usernames from hashtags...")
     usernames = await scraper.get_usernames_from_hashtags()
-    return sorted(list(usernames))
+    # Highest scoring candidates go through the expensive stages first
+    return await add_retry_wave(rank_usernames(scraper, sorted(usernames)))
 
 class Influencer(BaseModel):
     username: str
@@ -62,12 +113,17 @@ class EmailMapping(BaseModel):
 
 async def get_user_profiles(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
     """Fetch profile information including bio and full name for each username."""
+    profiles = await profile_memo.get_many(usernames, _fetch_user_profiles)
+    # Callers add emails and verdicts to the profiles, so each gets its own copies
+    return {username: dict(profile) for username, profile in profiles.items()}
+
+async def _fetch_user_profiles(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
     apify = ApifyHelper()
     db = DatabaseHelper()
     profiles = {}
     
     # Check which usernames we already have complete profile information for
-    loaded_profiles = db.get_profiles_by_usernames(usernames)
+    loaded_profiles = await asyncio.to_thread(db.get_profiles_by_usernames, usernames)
     progress_update("profiles", f"Found {len(loaded_profiles)} existing profiles in database", 
                    {"total": len(usernames), "existing": len(loaded_profiles)})
     
@@ -98,9 +154,8 @@ async def get_user_profiles(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
         }
         
         progress_update("apify", "Starting Apify profile scraping job...")
-        run = apify.client.actor(apify.profile_scraper_id).call(run_input=input_data)
-        progress_update("apify", "Fetching results from Apify dataset...")
-        dataset_items = apify.client.dataset(run["defaultDatasetId"]).list_items().items
+        dataset_items = await apify.run_actor(apify.profile_scraper_id, input_data)
+        progress_update("apify", "Fetched results from Apify dataset")
         
         for profile_data in dataset_items:
             username = profile_data.get('username')
@@ -121,6 +176,8 @@ async def get_user_profiles(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
                 progress_update("profile_detail", f"No profile data found for {username}", 
                               {"username": username, "error": True})
     
+    except BudgetExhausted:
+        raise
     except Exception as e:
         progress_update("error", f"Error fetching profiles for batch: {e}", {"error": str(e)})
         for username in usernames_to_fetch:
@@ -135,7 +192,7 @@ async def get_user_profiles(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
                    if username in usernames_to_fetch}
     
     if new_profiles:
-        db.update_user_profiles(new_profiles)
+        await asyncio.to_thread(db.update_user_profiles, new_profiles)
         progress_update("profiles", f"Saved {len(new_profiles)} new user profiles to database", 
                        {"saved_count": len(new_profiles)})
     
@@ -143,12 +200,22 @@ async def get_user_profiles(usernames: List[str]) -> Dict[str, Dict[str, Any]]:
 
 async def extract_emails_from_bios(profiles: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
     """Use ChatGPT to extract emails from user bios."""
-    client = OpenAI()
+    # Keyed on the bio too, so a changed bio is extracted again
+    async def extract(keys):
+        emails = await _extract_emails_from_bios({username: profiles[username] for username, _ in keys})
+        return {key: emails.get(key[0]) for key in keys}
+    
+    keys = [(username, profile.get('bio')) for username, profile in profiles.items()]
+    emails = await email_memo.get_many(keys, extract)
+    return {username: email for (username, _), email in emails.items() if email}
+
+async def _extract_emails_from_bios(profiles: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    client = async_openai_client()
     db = DatabaseHelper()
     
     # First, check which profiles already have emails in the database
     usernames = list(profiles.keys())
-    existing_profiles = db.get_profiles_by_usernames(usernames)
+    existing_profiles = await asyncio.to_thread(db.get_profiles_by_usernames, usernames)
     
     # Initialize the email mapping with existing emails
     email_mapping = {}
@@ -213,10 +280,13 @@ async def extract_emails_from_bios(profiles: Dict[str, Dict[str, Any]]) -> Dict[
     user_prompt = (f"Extract email addresses from these Instagram bios: {json.dumps(bio_data)}\n"  
                  f"Format your response as a JSON array of objects with 'username' and 'email' fields.")
     
+    # Raises BudgetExhausted instead of sending once the LLM budget is used up
+    get_budget().check("llm_usd", "llm_tokens")
+    
     try:
         progress_update("openai", "Sending bios to ChatGPT for email extraction...", 
                        {"bio_count": len(bio_data)})
-        response = client.beta.chat.completions.parse(
+        response = await client.beta.chat.completions.parse(
             model="gpt-4o-mini",
             response_format=EmailMapping,
             messages=[
@@ -258,25 +328,26 @@ async def extract_emails_from_bios(profiles: Dict[str, Dict[str, Any]]) -> Dict[
         
         # Save results to database and reset flags
         if new_emails:
-            updated = db.update_emails(new_emails)
+            updated = await asyncio.to_thread(db.update_emails, new_emails)
             progress_update("emails", f"Saved {updated} new emails to database, marked {len(new_emails)} profiles as processed", 
                            {"updated_count": updated, "processed_count": len(new_emails)})
         
         return email_mapping
     
+    except (BudgetExhausted, CassetteMiss):
+        raise
     except Exception as e:
         progress_update("error", f"Error extracting emails with ChatGPT: {e}", {"error": str(e)})
         return email_mapping
 
-async def main():
-    progress_update("start", "Starting outreach process...", {"percent": 5})
-    db = DatabaseHelper()
-    
-    # Get usernames from hashtags - 5-20% of progress
+async def discover_usernames() -> List[str]:
+    """Get usernames from hashtags, ranked by score."""
     progress_update("hashtags", "Getting usernames from hashtags...", {"percent": 10})
-    scraper = HashtagScraper()
+    campaign = get_campaign("outreach")
+    scraper = HashtagScraper(campaign.hashtags, campaign.results_limit)
     usernames = await scraper.get_usernames_from_hashtags()
-    usernames = list(usernames)
+    # Highest scoring candidates go through the expensive stages first
+    usernames = rank_usernames(scraper, sorted(usernames))
     
     # For testing - limit the number of usernames
     original_count = len(usernames)
@@ -285,157 +356,261 @@ async def main():
         progress_update("hashtags", f"Testing mode: Limiting to 10 usernames out of {original_count}", 
                        {"original_count": original_count, "limited_count": 10, "test_mode": True, "percent": 15})
         usernames = usernames[:10]
+    return await add_retry_wave(usernames)
+
+async def main(resume: bool = False, engine: Optional[VerificationEngine] = None):
+    """Run the outreach pipeline; a given verification engine is reused and left open."""
+    progress_update("start", "Starting outreach process...", {"percent": 5})
+    db = DatabaseHelper()
+    campaign = get_campaign("outreach")
+    # Time, LLM, Apify and browser check limits of this run (BUDGET_* variables
+    # and the campaign's own limits)
+    budget = start_budget(campaign.new_budget())
+    
+    # Get usernames from hashtags - 5-20% of progress. A resumed run reuses the
+    # usernames of the interrupted run and skips the stages already done for them.
+    ledger = await RunLedger.begin(campaign.progress_id, discover_usernames, resume=resume, db=db)
+    
+    # Candidates another campaign running in this process is already handling are skipped
+    usernames, taken = claim_usernames(ledger.usernames, campaign.progress_id)
+    try:
+        await _run_pipeline(ledger, usernames, taken, budget, engine, db)
+    finally:
+        release_usernames(campaign.progress_id)
+
+async def _run_pipeline(ledger: RunLedger, usernames: List[str], taken: Dict[str, str],
+                        budget: Budget, engine: Optional[VerificationEngine], db: DatabaseHelper):
+    """Stream the run's usernames through profiles, emails, checks and saving."""
+    if taken:
+        progress_update("hashtags", f"Skipping {len(taken)} usernames other campaigns are already handling", 
+                       {"taken": len(taken), "campaigns": sorted(set(taken.values()))})
+    if ledger.resumed:
+        progress_update("resume", f"Resuming run {ledger.run_id}: {ledger.count('persisted')} of {len(usernames)} usernames already done", 
+                       {"run_id": ledger.run_id, "done": ledger.count('persisted'), "total": len(usernames)})
     
     progress_update("hashtags", f"Found {len(usernames)} usernames", 
-                   {"username_count": len(usernames), "usernames": usernames, "percent": 20})
-    
-    # Get user profiles - 20-40% of progress
-    progress_update("profiles", "Fetching user profiles...", {"username_count": len(usernames), "percent": 25})
-    user_profiles = await get_user_profiles(usernames)
-    progress_update("profiles", f"Fetched {len(user_profiles)} user profiles", 
-                   {"profile_count": len(user_profiles), "percent": 40})
-    
-    # Extract emails - 40-60% of progress
-    progress_update("emails", "Extracting emails from user bios...", {"profile_count": len(user_profiles), "percent": 45})
-    emails = await extract_emails_from_bios(user_profiles)
-    # Count valid emails (not None and not "null" string)
-    email_count = len([e for e in emails.values() if e and e != "null"])
-    progress_update("emails", f"Found {email_count} valid emails out of {len(usernames)} usernames", 
-                   {"email_count": email_count, "username_count": len(usernames), "percent": 55})
-    
-    # Process all usernames, including those without emails
-    filtered_usernames = usernames
-    usernames_with_email = [username for username in usernames 
-                           if emails.get(username) and emails.get(username) != "null"]
-    usernames_without_email = [username for username in usernames 
-                             if not emails.get(username) or emails.get(username) == "null"]
-    
-    progress_update("emails", f"Processing all {len(filtered_usernames)} usernames: {len(usernames_with_email)} with email, {len(usernames_without_email)} without email", 
-                   {"filtered_count": len(filtered_usernames), 
-                    "with_email": len(usernames_with_email),
-                    "without_email": len(usernames_without_email),
-                    "percent": 60})
-    
-    # Update the user_profiles dictionary with emails
-    for username, email in emails.items():
-        if username in user_profiles:
-            user_profiles[username]['email'] = email
-    
-    # Browser automation - 60-95% of progress
-    # Set up the controller for the browser automation
-    ctrl = Controller(output_model=Influencer)
-    
-    # We already calculated filtered_usernames above
-    progress_update("browser", f"Processing {len(filtered_usernames)} usernames (all accounts including those without emails)", 
-                   {"username_count": len(filtered_usernames), "usernames": filtered_usernames, "percent": 60})
-    
-    # Calculate progress increments for each username
-    progress_per_username = 0
-    if filtered_usernames:
-        progress_per_username = 35 / len(filtered_usernames)  # 35% of progress (60-95%) divided by number of usernames
-    
-    # Process each username
-    for i, username in enumerate(filtered_usernames):
-        # Calculate current progress based on completed usernames
-        current_progress = 60 + (i * progress_per_username)
-        
-        # Get user profile to check if we've already verified their influencer status
-        profile_data = user_profiles.get(username, {})
-        already_checked = profile_data.get('checked_influencer', False)
-        is_influencer = profile_data.get('is_influencer', False)
+                   {"username_count": len(usernames), "usernames": usernames, "run_id": ledger.run_id, "percent": 20})
+    
+    # Profiles, emails, checks and saving run as a streaming pipeline - 20-95% of progress.
+    # Each username moves on as soon as its batch is done, so the first checks
+    # start while later profiles are still being fetched. Usernames enter in
+    # rank order, so a limited budget is spent on the best candidates first.
+    own_engine = engine is None
+    engine = engine or VerificationEngine(get_view_count, Influencer)
+    total = len(usernames)
+    counts = {"processed": 0, "influencers": 0, "with_email": 0}
+    first_influencer_at = None
+    
+    async def discovered():
+        for username in usernames:
+            if budget.exhausted():
+                progress_update("stopping", f"Budget for {budget.stopped_by} is used up, not starting new candidates", 
+                               {"budget": budget.summary()})
+                return
+            if ledger.done(username, "persisted"):
+                # Finished before the interruption; only count it
+                result = ledger.get(username, "persisted")
+                counts["processed"] += 1
+                counts["influencers"] += 1 if result["is_influencer"] else 0
+                counts["with_email"] += 1 if result["has_email"] else 0
+                continue
+            yield {"username": username}
+    
+    async def fetch_profiles(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        to_fetch = [item['username'] for item in batch if not ledger.done(item['username'], "profile")]
+        profiles = await get_user_profiles(to_fetch) if to_fetch else {}
+        for item in batch:
+            username = item['username']
+            if ledger.done(username, "profile"):
+                item['profile'] = ledger.get(username, "profile")
+            else:
+                item['profile'] = profiles.get(username, {'full_name': None, 'bio': None})
+                await ledger.record(username, "profile", item['profile'])
+        return batch
+    
+    async def extract_emails(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        to_extract = {item['username']: item['profile'] for item in batch 
+                      if not ledger.done(item['username'], "email")}
+        emails = await extract_emails_from_bios(to_extract) if to_extract else {}
+        for item in batch:
+            username = item['username']
+            if ledger.done(username, "email"):
+                item['profile']['email'] = ledger.get(username, "email")
+                continue
+            if username in emails:
+                item['profile']['email'] = emails[username]
+            await ledger.record(username, "email", item['profile'].get('email'))
+        return batch
+    
+    async def qualify(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Decide from scraped reel metrics; undecided users still go through the browser
+        unchecked = [item['username'] for item in batch 
+                     if not item['profile'].get('checked_influencer') and not ledger.done(item['username'], "verified")]
+        verdicts = await qualify_by_post_data(unchecked, progress=progress_update)
+        for item in batch:
+            if item['username'] in verdicts:
+                item['is_influencer'] = verdicts[item['username']]
+                item['source'] = "data"
+        return batch
+    
+    async def settle(item: Dict[str, Any]) -> bool:
+        """Take the verdict from the ledger, the data stage or an earlier check if there is one."""
+        username = item['username']
+        if ledger.done(username, "verified"):
+            item.update(ledger.get(username, "verified"))
+            return True
         
-        progress_update("browser", f"Processing {username} ({i+1}/{len(filtered_usernames)})", 
-                       {"username": username, "current": i+1, "total": len(filtered_usernames), 
-                        "percent": current_progress, "already_checked": already_checked})
+        if 'source' in item:
+            await ledger.record(username, "verified", {"is_influencer": item['is_influencer'], "source": item['source']})
+            return True
         
         # Skip browser check if we've already verified this user before
-        if already_checked:
-            progress_update("browser_detail", 
-                          f"Skipping browser check for {username} - already checked (is_influencer: {is_influencer})", 
-                          {"username": username, "is_influencer": is_influencer, 
-                           "percent": current_progress + progress_per_username, "skipped": True})
-            
-            # Still increment the progress
-            progress_update("browser", f"Processed {username} - used cached result", 
-                           {"username": username, "is_influencer": is_influencer, 
-                            "percent": current_progress + progress_per_username})
-            continue
+        if item['profile'].get('checked_influencer'):
+            item['is_influencer'] = item['profile'].get('is_influencer', False)
+            item['source'] = "cache"
+            return True
+        return False
+    
+    async def verify(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        item = batch[0]
+        username = item['username']
+        profile_data = item['profile']
+        
+        if await settle(item):
+            return batch
         
-        # If not already checked, proceed with browser automation
-        browser = Browser(
-            config=BrowserConfig(
-                browser_binary_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',         
-                chrome_profile_path='/Users/macbook/Library/Application Support/Google/Chrome/Default'
-            )
-        )
         try:
-            async with await browser.new_context() as ctx:
-                progress_update("browser_detail", f"Launching browser for {username}...", 
-                              {"username": username, "percent": current_progress})
-                agent = Agent(
-                    task=get_view_count.format(username=username),
-                    llm=ChatOpenAI(model='gpt-4o'),
-                    browser=browser,
-                    controller=ctrl,
-                )
-                progress_update("browser_detail", f"Running agent to check if {username} is an influencer...", 
-                              {"username": username, "percent": current_progress + (progress_per_username * 0.3)})
-                history = await agent.run()
-                data = Influencer.model_validate_json(history.final_result())
-                
-                # Add bio, full name, and email to the influencer object
-                data.full_name = profile_data.get('full_name')
-                data.bio = profile_data.get('bio')
-                data.email = profile_data.get('email')
-                
-                progress_update("browser_detail", f"{username} - is_influencer: {data.is_influencer}", 
-                              {"username": username, "is_influencer": data.is_influencer, 
-                               "percent": current_progress + (progress_per_username * 0.6)})
-                
+            progress_update("browser_detail", f"Running agent to check if {username} is an influencer...", 
+                          {"username": username})
+            data = await engine.check(username)
+            item['is_influencer'] = data.is_influencer
+            item['source'] = "browser"
+        except BudgetExhausted:
+            raise
+        except Exception as e:
+            # Not marked as checked; the check is retried in a later run
+            retry = await schedule_retry(db, username, e)
+            progress_update("error", f"Error processing {username} ({retry['error_class']}): {e}", 
+                          {"username": username, "error": str(e), **retry})
+            item['is_influencer'] = profile_data.get('is_influencer', False)
+            item['source'] = "error"
+        await ledger.record(username, "verified", {"is_influencer": item['is_influencer'], "source": item['source']})
+        return batch
+    
+    async def verify_by_workers(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Queue the batch for the verification workers and wait for their verdicts
+        waiting = {item['username']: item for item in batch if not await settle(item)}
+        if waiting:
+            await asyncio.to_thread(db.enqueue_verifications, list(waiting))
+            progress_update("browser_detail", f"Queued {len(waiting)} usernames for the verification workers", 
+                          {"usernames": list(waiting)})
+        while waiting:
+            results = await asyncio.to_thread(db.get_verification_results, list(waiting))
+            # Usernames the queue skipped were checked elsewhere in the meantime
+            checked = await asyncio.to_thread(
+                db.get_profiles_by_usernames, [username for username in waiting if username not in results])
+            for username in list(waiting):
+                result = results.get(username)
+                if result and result['state'] == 'done':
+                    verdict = {"is_influencer": result['is_influencer'], "source": "worker"}
+                elif result and (result['state'] == 'failed' or (result['state'] == 'pending' and result['attempts'])):
+                    # Don't hold the pipeline for the backoff; the workers retry it later
+                    progress_update("error", f"Verification of {username} failed ({result['error_class']}): {result['last_error']}", 
+                                  {"username": username, "error": result['last_error'], 
+                                   "error_class": result['error_class'], "attempts": result['attempts'],
+                                   "next_attempt_at": result['next_attempt_at']})
+                    verdict = {"is_influencer": waiting[username]['profile'].get('is_influencer', False), "source": "error"}
+                elif username in checked:
+                    verdict = {"is_influencer": checked[username]['is_influencer'], "source": "worker"}
+                else:
+                    continue
+                waiting.pop(username).update(verdict)
+                await ledger.record(username, "verified", verdict)
+            if waiting:
+                # The workers spend their own budgets; only the run's time limit applies here
+                budget.check()
+                await asyncio.sleep(VERIFY_POLL_SECONDS)
+        return batch
+    
+    async def persist(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        nonlocal first_influencer_at
+        # Candidates from a retry wave that got a verdict leave the retry queue
+        await asyncio.to_thread(db.resolve_verification_retries, 
+                                {item['username']: item['is_influencer'] for item in batch 
+                                 if item['source'] in ("browser", "data")})
+        for item in batch:
+            username = item['username']
+            profile_data = item['profile']
+            
+            if item['source'] != "cache":
                 # Save the influencer data to the database - mark as checked
-                db.save_influencer(
-                    username=data.username,
-                    is_influencer=data.is_influencer,
-                    full_name=data.full_name,
-                    bio=data.bio,
-                    email=data.email,
-                    checked_influencer=True  # Mark this influencer as checked
+                # unless the check failed and is waiting for a retry
+                await asyncio.to_thread(
+                    db.save_influencer,
+                    username=username,
+                    is_influencer=item['is_influencer'],
+                    full_name=profile_data.get('full_name'),
+                    bio=profile_data.get('bio'),
+                    email=profile_data.get('email'),
+                    checked_influencer=item['source'] != "error"
                 )
-                progress_update("browser_detail", f"Saved {username} data to database (marked as checked)", 
-                              {"username": username, "percent": current_progress + (progress_per_username * 0.8)})
-                
-                await ctx.close()
-        except Exception as e:
-            progress_update("error", f"Error processing {username}: {e}", 
-                          {"username": username, "error": str(e), "percent": current_progress + progress_per_username})
             
-            # Still mark as checked even on error, but don't change is_influencer status
-            # Get existing is_influencer value or default to False
-            is_influencer_value = profile_data.get('is_influencer', False)
+            counts["processed"] += 1
+            if item['is_influencer']:
+                counts["influencers"] += 1
+                if first_influencer_at is None:
+                    first_influencer_at = time.monotonic()
+            email = profile_data.get('email')
+            if email and email != "null":
+                counts["with_email"] += 1
+            await ledger.record(username, "persisted", 
+                                {"is_influencer": item['is_influencer'], "has_email": bool(email and email != "null")})
             
-            db.save_influencer(
-                username=username,
-                is_influencer=is_influencer_value,  # Keep existing value
-                full_name=profile_data.get('full_name'),
-                bio=profile_data.get('bio'),
-                email=profile_data.get('email'),
-                checked_influencer=True  # Mark as checked despite the error
-            )
-            progress_update("browser_detail", 
-                          f"Marked {username} as checked despite error (kept is_influencer={is_influencer_value})", 
-                          {"username": username, "percent": current_progress + progress_per_username})
-        finally:
-            await browser.close()
-
-        # delay for 3 seconds before next profile (only if we did browser check)
-        progress_update("browser_detail", f"Waiting 3 seconds before the next profile...", 
-                      {"username": username, "percent": current_progress + progress_per_username})
-        await asyncio.sleep(3)
+            progress_update("browser", f"Processed {username} ({counts['processed']}/{total}) - is_influencer: {item['is_influencer']} ({item['source']})", 
+                           {"username": username, "is_influencer": item['is_influencer'], "source": item['source'],
+                            "current": counts["processed"], "total": total, 
+                            "percent": 20 + 75 * counts["processed"] / total if total else 95})
+        return batch
+    
+    stages = [
+        Stage("profiles", fetch_profiles, concurrency=PIPELINE_PROFILE_CONCURRENCY, 
+              batch_size=PIPELINE_PROFILE_BATCH_SIZE),
+        Stage("emails", extract_emails, concurrency=PIPELINE_EMAIL_CONCURRENCY, 
+              batch_size=PIPELINE_EMAIL_BATCH_SIZE),
+    ]
+    if QUALIFY_MODE == "data":
+        stages.append(Stage("qualify", qualify, batch_size=QUALIFY_BATCH_SIZE, batch_wait=2.0))
+    stages += [
+        Stage("verify", verify_by_workers, concurrency=2, batch_size=VERIFY_LEASE_BATCH, batch_wait=1.0)
+        if VERIFY_WORKERS else Stage("verify", verify, concurrency=engine.concurrency),
+        Stage("persist", persist, batch_size=10, batch_wait=0.1),
+    ]
+    
+    pipeline = Pipeline(stages, progress=progress_update, stop_on=(BudgetExhausted, StopRequested))
+    try:
+        await pipeline.run(discovered())
+    except Exception:
+        await ledger.finish("failed")
+        raise
+    finally:
+        if own_engine:
+            await engine.close()
+    # A run stopped by its budget or on request can be resumed like an interrupted one
+    await ledger.finish("stopped" if budget.stopped_by or pipeline.stopped_by else "completed")
+    
+    pipeline_stats = pipeline.stats()
+    pipeline_stats["first_influencer_seconds"] = (
+        round(first_influencer_at - pipeline.started_at, 1) if first_influencer_at else None
+    )
+    progress_update("browser", f"Checked {counts['processed']} users: {counts['influencers']} influencers, {counts['with_email']} with email", 
+                   {**counts, "pipeline": pipeline_stats, "verification": engine.stats(), 
+                    "budget": budget.summary(), "rate_limits": get_rate_limiter().stats(), "percent": 95})
     
     # Get all influencers from the database
-    influencers = db.get_influencers()
-    progress_update("complete", f"Process completed. Found {len(influencers)} influencers in the database", 
-                   {"influencer_count": len(influencers), "percent": 100})
+    influencers = await asyncio.to_thread(db.get_influencers)
+    stopped = f" Stopped early: the {budget.stopped_by} budget is used up." if budget.stopped_by else ""
+    progress_update("complete", f"Process completed. Found {len(influencers)} influencers in the database.{stopped}", 
+                   {"influencer_count": len(influencers), "budget": budget.summary(), "percent": 100})
 
 # Check if the database needs migration before running
 def check_db_columns():
@@ -464,6 +639,14 @@ def check_db_columns():
             missing_columns.append('checked_influencer')
             migrations_to_run.append('migrate_add_influencer_check.py')
             
+        if 'dm_sent' not in columns:
+            missing_columns.append('dm_sent')
+            migrations_to_run.append('migrate_add_dm_tracking.py')
+            
+        if 'draft_template_version' not in columns:
+            missing_columns.append('draft_template_version')
+            migrations_to_run.append('migrate_add_draft_tracking.py')
+            
         if missing_columns:
             progress_update("warning", f"Your database is missing required columns: {', '.join(missing_columns)}. " +
                            "Running migrations to update the database schema.", 
@@ -490,8 +673,17 @@ def check_db_columns():
         if 'conn' in locals():
             conn.close()
 
-async def run_with_monitoring():
+async def run_with_monitoring(resume: bool = False, engine: Optional[VerificationEngine] = None):
     """Run the main function with proper monitoring and error handling."""
+    # Everything this run reports, also from shared helpers, goes to its monitor
+    monitor = progress_monitor.current_monitor("outreach")
+    progress_monitor.use_monitor(monitor)
+    
+    # Record anything that blocks the event loop in the progress data
+    lag_monitor = LoopLagMonitor.from_env()
+    if lag_monitor:
+        lag_monitor.start(monitor)
+    
     try:
         monitor.log(f"Python version: {sys.version}")
         monitor.log(f"Current directory: {os.getcwd()}")
@@ -501,14 +693,23 @@ async def run_with_monitoring():
         progress_update("start", "Outreach process is initializing...", {"python_version": sys.version})
         
         # Check if the database needs migration
-        check_db_columns()
+        await asyncio.to_thread(check_db_columns)
         
         # Run the main function
         progress_update("start", "Starting main outreach process...")
-        await main()
+        await main(resume=resume, engine=engine)
         
         # Mark as complete
-        monitor.mark_complete("Outreach process completed successfully")
+        monitor.mark_complete("Outreach process completed successfully", 
+                              {"llm_cassette": cassette_stats(), "budget": get_budget().summary()})
+        
+    except BudgetExhausted as e:
+        # Ran out before the pipeline started (e.g. during discovery)
+        monitor.mark_complete(f"Outreach process stopped: {e}", 
+                              {"llm_cassette": cassette_stats(), "budget": get_budget().summary()})
+        
+    except StopRequested:
+        monitor.mark_stopped("Outreach process stopped on request", {"budget": get_budget().summary()})
         
     except KeyboardInterrupt:
         monitor.log("Process was interrupted by user", "warning")
@@ -521,11 +722,21 @@ async def run_with_monitoring():
         import traceback
         monitor.log(traceback.format_exc(), "error")
         raise
+    
+    finally:
+        if lag_monitor:
+            await lag_monitor.stop()
+        # Runs given an engine share the process's clients with other runs
+        if engine is None:
+            await close_clients()
 
 if __name__ == '__main__':
     # Initialize control file to "run"
     with open("outreach_control.json", 'w') as f:
         json.dump({"command": "run", "timestamp": time.time()}, f)
     
+    # --resume picks up the last interrupted run instead of starting a new one
+    resume = '--resume' in sys.argv[1:]
+    
     # Run the main function with monitoring
-    asyncio.run(run_with_monitoring())
\ No newline at end of file
+    asyncio.run(run_with_monitoring(resume=resume))
\ No newline at end of file
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterable, Awaitable, Callable, Dict, Any, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# Items that may wait between two stages before upstream stages block
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "20"))
+
+# A stage handler takes a batch of items and returns the items to pass on
+StageHandler = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+# Marks the end of the stream in a queue
+_DONE = object()
+
+class Stage:
+    """
+    One step of a pipeline.
+
+    `concurrency` workers each take up to `batch_size` items at a time, waiting
+    at most `batch_wait` seconds for a batch to fill so items never sit idle
+    behind a half-empty batch.
+    """
+
+    def __init__(self, name: str, handler: StageHandler, concurrency: int = 1,
+                 batch_size: int = 1, batch_wait: float = 0.5):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.items_in = 0
+        self.items_out = 0
+        self.failed_batches = 0
+        self.stopped_items = 0
+        self.busy_seconds = 0.0
+        self.first_output_at: Optional[float] = None
+
+    def stats(self, started_at: float) -> Dict[str, Any]:
+        return {
+            "in": self.items_in,
+            "out": self.items_out,
+            "failed_batches": self.failed_batches,
+            "stopped_items": self.stopped_items,
+            "busy_seconds": round(self.busy_seconds, 1),
+            "first_output_seconds": round(self.first_output_at - started_at, 1) if self.first_output_at else None
+        }
+
+class Pipeline:
+    """
+    Run items through stages connected by bounded queues.
+
+    Every item moves to the next stage as soon as its batch is done, and a
+    full queue makes the stage in front of it wait (backpressure). A failing
+    batch is reported and dropped; the rest of the stream keeps going.
+
+    A handler raising one of the `stop_on` exceptions (e.g. an exhausted
+    budget) stops the run cleanly: no new items are taken from the source,
+    items already in flight finish or are dropped where they hit the stop.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = PIPELINE_QUEUE_SIZE,
+                 progress: Optional[Callable[..., None]] = None,
+                 stop_on: Tuple[Type[BaseException], ...] = ()):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.progress = progress
+        self.stop_on = stop_on
+        self.stopped_by: Optional[BaseException] = None
+        self.started_at = 0.0
+        self.finished_at: Optional[float] = None
+
+    def _report(self, stage: str, message: str, data: Dict[str, Any]) -> None:
+        """Report through the progress callback; a stop it signals stops the run like one from a handler."""
+        if not self.progress:
+            return
+        try:
+            self.progress(stage, message, data)
+        except self.stop_on as e:
+            if self.stopped_by is None:
+                self.stopped_by = e
+
+    async def _next_batch(self, stage: Stage, queue: asyncio.Queue) -> Optional[List[Dict[str, Any]]]:
+        """Take the next batch for a stage, or None once the stream has ended."""
+        item = await queue.get()
+        if item is _DONE:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + stage.batch_wait
+        while len(batch) < stage.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _DONE:
+                # Leave the end marker for the stage's other workers
+                queue.put_nowait(_DONE)
+                break
+            batch.append(item)
+        return batch
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue],
+                      results: List[Dict[str, Any]]) -> None:
+        while True:
+            batch = await self._next_batch(stage, inbox)
+            if batch is None:
+                inbox.put_nowait(_DONE)
+                return
+
+            stage.items_in += len(batch)
+            started = time.monotonic()
+            try:
+                output = await stage.handler(batch)
+            except self.stop_on as e:
+                stage.stopped_items += len(batch)
+                if self.stopped_by is None:
+                    self.stopped_by = e
+                    self._report("stopping", f"Stopping at stage {stage.name}: {e}",
+                                 {"stage": stage.name, "reason": str(e)})
+                continue
+            except Exception as e:
+                stage.failed_batches += 1
+                logger.exception(f"Stage {stage.name} failed on a batch of {len(batch)}")
+                self._report("error", f"Stage {stage.name} failed for {len(batch)} items: {e}",
+                             {"stage": stage.name, "error": str(e),
+                              "usernames": [item.get('username') for item in batch]})
+                continue
+            finally:
+                stage.busy_seconds += time.monotonic() - started
+
+            if output and stage.first_output_at is None:
+                stage.first_output_at = time.monotonic()
+            stage.items_out += len(output)
+            for item in output:
+                if outbox is None:
+                    results.append(item)
+                else:
+                    await outbox.put(item)
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue],
+                         results: List[Dict[str, Any]]) -> None:
+        await asyncio.gather(*(self._worker(stage, inbox, outbox, results)
+                               for _ in range(stage.concurrency)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def _feed(self, source: AsyncIterable[Dict[str, Any]], queue: asyncio.Queue) -> None:
+        try:
+            async for item in source:
+                if self.stopped_by is not None:
+                    break
+                await queue.put(item)
+        finally:
+            await queue.put(_DONE)
+
+    async def run(self, source: AsyncIterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Stream items from the source through all stages; returns what comes out of the last one."""
+        self.started_at = time.monotonic()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results: List[Dict[str, Any]] = []
+
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        for i, stage in enumerate(self.stages):
+            outbox = queues[i + 1] if i + 1 < len(self.stages) else None
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[i], outbox, results)))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.finished_at = time.monotonic()
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage counts and timings, and total wall time."""
+        end = self.finished_at or time.monotonic()
+        return {
+            "wall_seconds": round(end - self.started_at, 1),
+            "stopped_by": str(self.stopped_by) if self.stopped_by else None,
+            "stages": {stage.name: stage.stats(self.started_at) for stage in self.stages}
+        }
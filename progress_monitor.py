@@ -1,23 +1,35 @@
 import os
 import json
 import time
-from typing import Dict, Any, List, Optional
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, List, Optional
 import signal
 import sys
+import threading
 import atexit
 
+class StopRequested(BaseException):
+    """
+    Raised by a progress update once a stop was requested through the control file.
+
+    Like the SystemExit it replaces, it isn't an Exception, so the handlers
+    that log and skip failed items let it through and the run unwinds to its
+    entry point, which marks it stopped.
+    """
+
 class ProgressMonitor:
     """
     A robust class for monitoring and controlling long-running processes.
     Uses files for progress reporting and process control.
     """
     
-    def __init__(self, process_id: str = "outreach"):
+    def __init__(self, process_id: str = "outreach", handle_signals: bool = True):
         """Initialize with a unique process ID to prevent conflicts."""
         self.process_id = process_id
         self.progress_file = f"{process_id}_progress.json"
         self.control_file = f"{process_id}_control.json"
         self.logs: List[Dict[str, Any]] = []
+        self.metrics: Dict[str, Any] = {}
         self.last_progress: Dict[str, Any] = {
             "stage": "init",
             "message": "Initializing...",
@@ -25,14 +37,19 @@ class ProgressMonitor:
             "timestamp": time.time(),
             "is_running": True
         }
+        # Called with the progress data on every write, e.g. to stream it
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
         
         # Initialize files
         self._init_files()
         
-        # Set up signal handlers for clean shutdown
-        signal.signal(signal.SIGINT, self._handle_exit)
-        signal.signal(signal.SIGTERM, self._handle_exit)
-        atexit.register(self._handle_exit)
+        # Set up signal handlers for clean shutdown (monitors of campaigns are
+        # left to the process running them, see campaign.py). Handlers can only
+        # be installed from the main thread.
+        if handle_signals and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._handle_signal)
+            signal.signal(signal.SIGTERM, self._handle_signal)
+            atexit.register(self._handle_exit)
     
     def _init_files(self) -> None:
         """Initialize the progress and control files."""
@@ -52,6 +69,7 @@ class ProgressMonitor:
         data = {
             "progress": self.last_progress,
             "logs": self.logs[-100:],  # Keep only the last 100 logs
+            "metrics": self.metrics,
             "timestamp": time.time()
         }
         
@@ -62,6 +80,28 @@ class ProgressMonitor:
         
         # Atomic rename
         os.replace(temp_file, self.progress_file)
+        
+        for listener in list(self.listeners):
+            listener(data)
+    
+    def reset(self) -> None:
+        """Start a new run in the same process: clear logs and metrics and set the control file to run."""
+        self.logs = []
+        self.metrics = {}
+        self.last_progress = {
+            "stage": "init",
+            "message": "Initializing...",
+            "percent": 0,
+            "timestamp": time.time(),
+            "is_running": True
+        }
+        self.send_command("run")
+        self._write_progress_file()
+    
+    def send_command(self, command: str) -> None:
+        """Write a command ("run" or "stop") to the control file."""
+        with open(self.control_file, 'w') as f:
+            json.dump({"command": command, "timestamp": time.time()}, f)
     
     def _check_control_file(self) -> str:
         """Check the control file for commands."""
@@ -75,12 +115,18 @@ class ProgressMonitor:
             print(f"Error reading control file: {e}")
             return "run"
     
-    def _handle_exit(self, *args) -> None:
-        """Handle process exit by updating the progress file."""
+    def _handle_exit(self) -> None:
+        """Handle process exit by marking a run that is still going as stopped."""
+        if not self.last_progress.get("is_running"):
+            return
         self.last_progress["is_running"] = False
         self.last_progress["stage"] = "stopped"
         self.last_progress["message"] = "Process was stopped"
         self._write_progress_file()
+    
+    def _handle_signal(self, *args) -> None:
+        """Handle SIGINT/SIGTERM by marking the run stopped and exiting."""
+        self._handle_exit()
         sys.exit(0)
     
     def log(self, message: str, level: str = "info") -> None:
@@ -132,17 +178,35 @@ class ProgressMonitor:
         # Write to file
         self._write_progress_file()
     
+    def set_metric(self, name: str, value: Any, write: bool = False) -> None:
+        """Attach a runtime metric to the progress data (written with the next update unless write is set)."""
+        self.metrics[name] = value
+        if write:
+            self._write_progress_file()
+    
     def should_stop(self) -> bool:
         """Check if the process should stop based on control file."""
         command = self._check_control_file()
         return command == "stop"
     
+    def check_stop(self, stage: str) -> None:
+        """Raise StopRequested if a stop was requested; the run unwinds and marks itself stopped."""
+        if self.should_stop():
+            self.log(f"Received stop command during stage: {stage}", "warning")
+            raise StopRequested(f"Stop requested during stage: {stage}")
+    
     def mark_complete(self, message: str = "Process completed", data: Dict[str, Any] = None) -> None:
         """Mark the process as completed."""
         self.update_progress("complete", message, 100, data)
         self.last_progress["is_running"] = False
         self._write_progress_file()
     
+    def mark_stopped(self, message: str = "Process was stopped", data: Dict[str, Any] = None) -> None:
+        """Mark the process as stopped on request."""
+        self.update_progress("stopped", message, 100, data)
+        self.last_progress["is_running"] = False
+        self._write_progress_file()
+    
     def mark_failed(self, message: str = "Process failed", data: Dict[str, Any] = None) -> None:
         """Mark the process as failed."""
         self.update_progress("error", message, 100, data)
@@ -154,12 +218,22 @@ class ProgressMonitor:
         self.logs = []
         self._write_progress_file()
 
-# Function to get a singleton instance
-_monitor_instance = None
+# One monitor per process id
+_monitors: Dict[str, ProgressMonitor] = {}
+
+# Monitor of the current run, for runs sharing a process (see campaign.py)
+_current_monitor: ContextVar[Optional[ProgressMonitor]] = ContextVar("progress_monitor", default=None)
+
+def get_monitor(process_id: str = "outreach", handle_signals: bool = True) -> ProgressMonitor:
+    """Get the progress monitor of a process id, created on first use."""
+    if process_id not in _monitors:
+        _monitors[process_id] = ProgressMonitor(process_id, handle_signals)
+    return _monitors[process_id]
+
+def use_monitor(monitor: ProgressMonitor) -> None:
+    """Report the current task's progress (and that of the tasks it starts) to this monitor."""
+    _current_monitor.set(monitor)
 
-def get_monitor(process_id: str = "outreach") -> ProgressMonitor:
-    """Get a singleton instance of the progress monitor."""
-    global _monitor_instance
-    if _monitor_instance is None:
-        _monitor_instance = ProgressMonitor(process_id)
-    return _monitor_instance
\ No newline at end of file
+def current_monitor(process_id: str = "outreach") -> ProgressMonitor:
+    """The monitor of the current run, or the process's own monitor outside of one."""
+    return _current_monitor.get() or get_monitor(process_id)
@@ -0,0 +1,80 @@
+import logging
+import os
+from typing import Callable, Dict, Any, List, Optional
+
+from client import ApifyHelper
+from reels_extractor import qualifies
+
+logger = logging.getLogger(__name__)
+
+# "browser" checks every candidate in the browser; "data" decides from
+# scraped post metrics first and only checks candidates without usable data
+QUALIFY_MODE = os.getenv("QUALIFY_MODE", "browser")
+
+# Recent posts fetched per candidate; reels are picked out of these
+QUALIFY_POSTS_PER_USER = int(os.getenv("QUALIFY_POSTS_PER_USER", "30"))
+
+# Candidates scraped together in one post scraper run
+QUALIFY_BATCH_SIZE = int(os.getenv("QUALIFY_BATCH_SIZE", "20"))
+
+def reel_view_counts(posts: List[Dict[str, Any]]) -> List[int]:
+    """View counts of the reels among scraped posts, in reels tab order (pinned first, then newest)."""
+    reels = [post for post in posts
+             if post.get('type') == 'Video' or post.get('productType') == 'clips']
+    reels.sort(key=lambda post: post.get('timestamp') or '', reverse=True)
+    reels.sort(key=lambda post: not post.get('isPinned', False))
+
+    counts = []
+    for reel in reels:
+        views = reel.get('videoPlayCount') or reel.get('videoViewCount')
+        if isinstance(views, int):
+            counts.append(views)
+    return counts
+
+def qualify_from_posts(posts: List[Dict[str, Any]], limit: int = QUALIFY_POSTS_PER_USER) -> Optional[bool]:
+    """
+    Apply the reels view-count rule to a candidate's scraped posts.
+
+    Returns None when the data can't decide: no posts, or a full page of
+    posts with too few reel view counts (the other reels may just be older).
+    """
+    if not posts:
+        return None
+    # Fewer posts than requested means we saw the whole profile
+    complete = len(posts) < limit
+    counts = reel_view_counts(posts)
+    if not counts:
+        return False if complete else None
+    return qualifies(counts, complete=complete)
+
+async def qualify_by_post_data(usernames: List[str], apify: Optional[ApifyHelper] = None,
+                               progress: Optional[Callable[..., None]] = None) -> Dict[str, bool]:
+    """
+    Decide influencer status for many candidates from scraped post metrics.
+
+    Returns a verdict for every candidate the data could decide; the rest
+    still need a browser check.
+    """
+    if not usernames:
+        return {}
+    apify = apify or ApifyHelper()
+    if progress:
+        progress("qualification", f"Fetching recent posts for {len(usernames)} candidates",
+                 {"candidates": len(usernames)})
+
+    posts_by_user = await apify.scrape_posts_for_users(usernames, QUALIFY_POSTS_PER_USER,
+                                                       QUALIFY_BATCH_SIZE)
+    verdicts = {}
+    for username in usernames:
+        verdict = qualify_from_posts(posts_by_user.get(username, []))
+        if verdict is not None:
+            verdicts[username] = verdict
+
+    influencer_count = sum(1 for verdict in verdicts.values() if verdict)
+    if progress:
+        progress("qualification",
+                 f"Qualified {len(verdicts)} of {len(usernames)} candidates from post data "
+                 f"({influencer_count} influencers), {len(usernames) - len(verdicts)} need a browser check",
+                 {"decided": len(verdicts), "influencers": influencer_count,
+                  "browser_checks": len(usernames) - len(verdicts)})
+    return verdicts
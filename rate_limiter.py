@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rate limited resources: environment variable, default limit and the period
+# in seconds it applies to (None for a limit on concurrent use)
+RATE_LIMITS = {
+    "apify_runs": ("APIFY_MAX_CONCURRENT_RUNS", 2, None),
+    "openai_requests": ("OPENAI_REQUESTS_PER_MINUTE", 500, 60),
+    "openai_tokens": ("OPENAI_TOKENS_PER_MINUTE", 200000, 60),
+    "instagram_views": ("INSTAGRAM_VIEWS_PER_HOUR", 300, 3600),
+    "instagram_dms": ("INSTAGRAM_DMS_PER_HOUR", 30, 3600),
+    "smtp_messages": ("SMTP_MAX_PER_DAY", 400, 86400),
+}
+
+class TokenBucket:
+    """
+    `rate` tokens per `period` seconds, holding at most `capacity`.
+
+    Callers reserve tokens up front and are told how long to wait for them,
+    so waiters are served in the order they asked and the balance may go
+    negative while reservations are outstanding. Safe to share between
+    threads and event loops.
+    """
+
+    def __init__(self, rate: float, period: float, capacity: Optional[float] = None):
+        self.per_second = rate / period
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.acquired = 0.0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens and return the seconds until they are actually available."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            self.acquired += amount
+            wait = max(0.0, -self.tokens / self.per_second)
+            self.waited_seconds += wait
+            return wait
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens that weren't used (a negative amount takes more)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+            self.acquired -= amount
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Wait until `amount` tokens are available; returns the seconds waited."""
+        wait = self.reserve(amount)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund(amount)
+                raise
+        return wait
+
+    def acquire_sync(self, amount: float = 1) -> float:
+        """Blocking acquire for code running in worker threads."""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {"acquired": round(self.acquired, 1), "waited_seconds": round(self.waited_seconds, 1)}
+
+class ConcurrencyLimit:
+    """At most `limit` holders at a time; waiters are woken in arrival order, on their own loop."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> float:
+        started = time.monotonic()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                self.acquired += 1
+                return 0.0
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            # release() hands its slot over to us by resolving the future
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+                    raise
+            # The slot was handed over just as we were cancelled; pass it on
+            self.release()
+            raise
+        waited = time.monotonic() - started
+        self.waited_seconds += waited
+        self.acquired += 1
+        return waited
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if not waiter.done() and not loop.is_closed():
+                    loop.call_soon_threadsafe(_hand_over, waiter)
+                    return
+            self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"acquired": self.acquired, "active": self.active,
+                "waited_seconds": round(self.waited_seconds, 1)}
+
+def _hand_over(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+class RateLimiter:
+    """
+    Shared limits on external resources for the whole process.
+
+    Each resource has its own token bucket (or concurrency limit), optionally
+    one per key such as the Instagram account or sender address. Stages
+    acquire capacity right before using a resource, so each runs as fast as
+    its own limit allows without fixed sleeps.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, Optional[float]]]] = None):
+        # resource -> (limit, period in seconds or None for concurrency)
+        self.limits = {resource: limit for resource, limit in (limits or {}).items() if limit[0]}
+        self._buckets: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Create a limiter from the environment (a limit of 0 switches it off)."""
+        return cls({resource: (float(os.getenv(var, str(default)) or 0), period)
+                    for resource, (var, default, period) in RATE_LIMITS.items()})
+
+    def _bucket(self, resource: str, key: Optional[str] = None):
+        if resource not in self.limits:
+            return None
+        with self._lock:
+            bucket = self._buckets.get((resource, key))
+            if bucket is None:
+                limit, period = self.limits[resource]
+                bucket = ConcurrencyLimit(int(limit)) if period is None else TokenBucket(limit, period)
+                self._buckets[(resource, key)] = bucket
+            return bucket
+
+    async def acquire(self, resource: str, amount: float = 1, key: Optional[str] = None) -> float:
+        """Wait for `amount` of a resource; returns the seconds waited (0 for unlimited resources)."""
+        bucket = self._bucket(resource, key)
+        if bucket is None:
+            return 0.0
+        waited = await bucket.acquire(amount)
+        if waited >= 1:
+            logger.info(f"Waited {waited:.1f}s for {resource}" + (f" ({key})" if key else ""))
+        return waited
+
+    def acquire_sync(self, resource: str, amount: float = 1, key: Optional[str] = None) -> float:
+        """Blocking acquire for code running in worker threads."""
+        bucket = self._bucket(resource, key)
+        if bucket is None:
+            return 0.0
+        return bucket.acquire_sync(amount)
+
+    def refund(self, resource: str, amount: float, key: Optional[str] = None) -> None:
+        """Correct an estimate: give back unused tokens, or take more with a negative amount."""
+        bucket = self._bucket(resource, key)
+        if bucket is not None and amount:
+            bucket.refund(amount)
+
+    @asynccontextmanager
+    async def slot(self, resource: str, key: Optional[str] = None):
+        """Hold one of a resource's concurrent slots for the duration of the block."""
+        limit = self._bucket(resource, key)
+        if limit is None:
+            yield
+            return
+        await limit.acquire()
+        try:
+            yield
+        finally:
+            limit.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Acquired amounts and total waits per resource (and key)."""
+        with self._lock:
+            buckets = list(self._buckets.items())
+        return {resource + (f":{key}" if key else ""): bucket.stats()
+                for (resource, key), bucket in buckets}
+
+# Limiter shared by everything in the process
+_rate_limiter_instance: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process's rate limiter, created from the environment on first use."""
+    global _rate_limiter_instance
+    if _rate_limiter_instance is None:
+        _rate_limiter_instance = RateLimiter.from_env()
+    return _rate_limiter_instance
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Scripted reels view-count check.
+
+Reads the view counts of a user's reels straight from the reels page, either
+from the JSON Instagram embeds in the page or from the view overlays of the
+reel cards, and applies the influencer rule in code. Returns None when the
+page can't be parsed, or shows too few reels to apply the rule, so the
+caller can fall back to the browser agent.
+
+Usage: python reels_extractor.py fixtures/reels/<page>.html   (parse a saved page)
+"""
+
+import json
+import logging
+import re
+import sys
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The influencer rule: skip the first reels (usually pinned), then at least
+# MIN_HITS of the next WINDOW reels need more than VIEW_THRESHOLD views
+SKIP_REELS = 3
+WINDOW = 6
+MIN_HITS = 4
+VIEW_THRESHOLD = 3000
+
+# Keys that carry a reel's view count in the embedded page JSON
+VIEW_COUNT_KEYS = ("play_count", "ig_play_count", "video_play_count", "video_view_count", "view_count")
+
+REEL_HREF = re.compile(r"/reels?/([\w-]+)/?")
+COUNT_TEXT = re.compile(r"^\s*(\d[\d,. ]*)\s*([KkMmBb])?\s*$")
+
+def parse_count(text: str) -> Optional[int]:
+    """Parse an overlay count like "3,456", "12.3K" or "1.2M"; None if it isn't a count."""
+    match = COUNT_TEXT.match(text)
+    if not match:
+        return None
+    number, suffix = match.groups()
+    number = number.replace(" ", "")
+    if suffix:
+        # "1,2K" is a decimal comma; "1,234" without a suffix is a thousands separator
+        value = float(number.replace(",", "."))
+        return int(value * {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}[suffix.lower()])
+    return int(number.replace(",", "").replace(".", ""))
+
+def qualifies(view_counts: List[int], complete: bool = False) -> Optional[bool]:
+    """
+    Apply the influencer rule to view counts in page order.
+
+    Returns None if there are fewer counts than the rule looks at (e.g. a grid
+    that hadn't finished loading), unless `complete` says they are all of the
+    user's reels.
+    """
+    if len(view_counts) < SKIP_REELS + WINDOW and not complete:
+        return None
+    window = view_counts[SKIP_REELS:SKIP_REELS + WINDOW]
+    return sum(1 for views in window if views > VIEW_THRESHOLD) >= MIN_HITS
+
+class _ReelsPageParser(HTMLParser):
+    """Collect reel card overlays and JSON script blocks from a reels page."""
+
+    def __init__(self):
+        super().__init__()
+        self.cards: List[Tuple[str, List[str]]] = []
+        self.scripts: List[str] = []
+        self._card: Optional[Tuple[str, List[str]]] = None
+        self._card_depth = 0
+        self._in_json_script = False
+        self._script_parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and self._card is None:
+            match = REEL_HREF.search(attrs.get("href") or "")
+            if match:
+                self._card = (match.group(1), [])
+                self._card_depth = 0
+        elif tag == "a" and self._card is not None:
+            self._card_depth += 1
+        elif tag == "script" and attrs.get("type") == "application/json":
+            self._in_json_script = True
+            self._script_parts = []
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._card is not None:
+            if self._card_depth:
+                self._card_depth -= 1
+            else:
+                self.cards.append(self._card)
+                self._card = None
+        elif tag == "script" and self._in_json_script:
+            self.scripts.append("".join(self._script_parts))
+            self._in_json_script = False
+
+    def handle_data(self, data):
+        if self._in_json_script:
+            self._script_parts.append(data)
+        elif self._card is not None and data.strip():
+            self._card[1].append(data.strip())
+
+def _walk_media(node: Any, found: Dict[str, int]) -> None:
+    """Collect shortcode -> view count from media objects anywhere in the JSON."""
+    if isinstance(node, dict):
+        code = node.get("code") or node.get("shortcode")
+        if isinstance(code, str) and code not in found:
+            for key in VIEW_COUNT_KEYS:
+                if isinstance(node.get(key), int):
+                    found[code] = node[key]
+                    break
+        for value in node.values():
+            _walk_media(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _walk_media(value, found)
+
+def _counts_from_json(scripts: List[str]) -> List[int]:
+    found: Dict[str, int] = {}
+    for script in scripts:
+        try:
+            _walk_media(json.loads(script), found)
+        except ValueError:
+            continue
+    return list(found.values())
+
+def _counts_from_cards(cards: List[Tuple[str, List[str]]]) -> List[int]:
+    found: Dict[str, int] = {}
+    for code, texts in cards:
+        if code in found:
+            continue
+        for text in texts:
+            count = parse_count(text)
+            if count is not None:
+                found[code] = count
+                break
+    return list(found.values())
+
+def extract_view_counts(html: str) -> Optional[List[int]]:
+    """
+    View counts of the reels on a reels page, in page order.
+
+    The embedded JSON is preferred; the card overlays are used when the page
+    carries no usable JSON. Returns None if neither yields any counts.
+    """
+    parser = _ReelsPageParser()
+    parser.feed(html)
+    parser.close()
+
+    counts = _counts_from_json(parser.scripts)
+    if len(counts) < SKIP_REELS + WINDOW:
+        card_counts = _counts_from_cards(parser.cards)
+        if len(card_counts) > len(counts):
+            counts = card_counts
+    return counts or None
+
+def check_reels_html(html: str) -> Optional[bool]:
+    """Decide influencer status from a reels page, or None if it can't be parsed or has too few reels."""
+    counts = extract_view_counts(html)
+    if counts is None:
+        return None
+    return qualifies(counts)
+
+async def check_reels(page, username: str, timeout_ms: int = 10000) -> Optional[bool]:
+    """
+    Open a user's reels page in a Playwright page and apply the influencer rule.
+
+    Returns None when the page doesn't show enough parseable reels (login
+    wall, layout change, no Reels tab, a short grid), so the caller can fall
+    back to the agent.
+    """
+    try:
+        await page.goto(f"https://www.instagram.com/{username}/reels/", wait_until="domcontentloaded")
+        try:
+            await page.wait_for_selector('a[href*="/reel/"]', timeout=timeout_ms)
+        except Exception:
+            # No reel cards rendered; the embedded JSON may still have them
+            pass
+        html = await page.content()
+    except Exception as e:
+        logger.warning(f"Could not load reels page for {username}: {e}")
+        return None
+    return check_reels_html(html)
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python reels_extractor.py <saved_reels_page.html>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        html = f.read()
+    counts = extract_view_counts(html)
+    print(json.dumps({
+        "view_counts": counts,
+        "is_influencer": qualifies(counts) if counts is not None else None
+    }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Resident daemon that runs the outreach and YOLO processes for the dashboard.
+
+One Python process stays up between runs, so a run doesn't pay for
+interpreter startup, the browser_use/langchain/openai imports, database
+setup and a browser launch every time: modules are imported once, the
+verification engine's browser and contexts stay open, and the rate
+limiter keeps its state. Commands are JSON lines on a local Unix socket,
+each answered with one JSON line:
+
+    {"command": "start", "process": "yolo", "resume": false}
+    {"command": "start", "campaign": "golf"}
+    {"command": "stop", "process": "yolo"}
+    {"command": "status"}
+    {"command": "watch", "process": "yolo"}
+    {"command": "ping"}
+    {"command": "shutdown"}
+
+`campaign` names a campaign from CAMPAIGNS_FILE (see campaign.py) instead
+of the process's own hashtags; campaigns and the two processes each have
+one run at a time and run side by side. `watch` keeps the connection open
+and writes every progress update of the current run, ending with
+{"done": true, ...} once it finishes. The progress and control files are
+still written as before.
+
+Usage: python run_daemon.py [--socket /tmp/outreach_run_daemon.sock]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Any, Optional, Set, Tuple
+
+os.environ["ANONYMIZED_TELEMETRY"] = "false"
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.getenv("RUN_DAEMON_SOCKET", "/tmp/outreach_run_daemon.sock")
+
+# How long a stopped run may take to wind down before it is cancelled
+STOP_GRACE_SECONDS = float(os.getenv("RUN_DAEMON_STOP_GRACE_SECONDS", "60"))
+
+# Progress updates a slow watcher may fall behind by before updates are dropped
+WATCH_BUFFER = 100
+
+PROCESSES = ("outreach", "yolo")
+
+class RunDaemon:
+    """
+    Start, stop and report runs of the outreach and YOLO processes and of
+    campaigns in this process.
+
+    Runs are keyed by their progress id: the process name, or the process
+    and campaign name for campaigns (e.g. "yolo_golf").
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self.runs_started = 0
+        self.engine = None
+        self.modules: Dict[str, Any] = {}
+        self.stopping = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def warm_up(self) -> None:
+        """Import both processes and prepare the database once, before serving."""
+        import outreach
+        import yolo_outreach
+        from db_helper import DatabaseHelper
+
+        started = time.perf_counter()
+        # The processes import their heavy dependencies only when a stage needs
+        # them; the daemon loads them up front so no run waits for them
+        import apify_client
+        import browser_use
+        import langchain_openai
+        import openai
+        self.modules = {"outreach": outreach, "yolo": yolo_outreach}
+        DatabaseHelper()
+        outreach.check_db_columns()
+        for process in PROCESSES:
+            self._monitor(process)
+        logger.info(f"Warmed up in {time.perf_counter() - started:.1f}s")
+
+    def _monitor(self, key: str):
+        """Progress monitor of a run key, publishing to the key's watchers."""
+        import progress_monitor
+        if key not in self.watchers:
+            self.watchers[key] = set()
+            # Campaign monitors leave signal handling to the daemon's event loop
+            monitor = progress_monitor.get_monitor(key, handle_signals=key in PROCESSES)
+            monitor.listeners.append(lambda data: self._publish(key, data))
+        return progress_monitor.get_monitor(key)
+
+    def _publish(self, key: str, data: Dict[str, Any]) -> None:
+        """Hand a progress write to the run's watchers (called from any thread)."""
+        if self._loop is None or not self.watchers[key]:
+            return
+        self._loop.call_soon_threadsafe(self._fan_out, key, data.get("progress"))
+
+    def _fan_out(self, key: str, progress: Optional[Dict[str, Any]]) -> None:
+        for queue in self.watchers[key]:
+            try:
+                queue.put_nowait(progress)
+            except asyncio.QueueFull:
+                pass
+
+    async def _engine(self):
+        """Verification engine shared by all runs; its browser stays open between them."""
+        if self.engine is None:
+            from verification import VerificationEngine
+            outreach = self.modules["outreach"]
+            self.engine = VerificationEngine(outreach.get_view_count, outreach.Influencer)
+        return self.engine
+
+    def running(self, key: str) -> bool:
+        task = self.tasks.get(key)
+        return task is not None and not task.done()
+
+    def run_state(self, key: str) -> Optional[Dict[str, Any]]:
+        run = self.runs.get(key)
+        if run is None:
+            return None
+        return {**run, "progress": self._monitor(key).last_progress}
+
+    def resolve(self, request: Dict[str, Any]) -> Tuple[Optional[Any], Optional[str]]:
+        """The campaign a command is about, or an error message."""
+        from campaign import Campaign, load_campaigns
+
+        name = request.get('campaign')
+        process = request.get('process')
+        if name is None:
+            if process not in PROCESSES:
+                return None, f"Unknown process {process!r}, expected one of {', '.join(PROCESSES)}"
+            return Campaign.from_env(process), None
+        try:
+            # Read on every command, so edited campaigns apply to their next run
+            campaigns = load_campaigns()
+        except (OSError, ValueError) as e:
+            return None, f"Can't load campaigns: {e}"
+        campaign = campaigns.get(name)
+        if campaign is None:
+            return None, f"Unknown campaign {name!r}, expected one of {', '.join(campaigns)}"
+        if process and process != campaign.process:
+            return None, f"Campaign {name!r} runs the {campaign.process} process, not {process}"
+        return campaign, None
+
+    async def start(self, campaign, resume: bool = False) -> Dict[str, Any]:
+        key = campaign.progress_id
+        if self.running(key):
+            return {"status": "already_running", "run": self.run_state(key)}
+        self._monitor(key).reset()
+        self.runs[key] = {"process": campaign.process, "campaign": campaign.name, "resume": resume,
+                          "status": "running", "started_at": time.time(), "finished_at": None}
+        self.runs_started += 1
+        self.tasks[key] = asyncio.create_task(self._run(campaign, resume))
+        return {"status": "started", "run": self.run_state(key)}
+
+    async def _run(self, campaign, resume: bool) -> None:
+        from campaign import run_campaign
+
+        key = campaign.progress_id
+        monitor = self._monitor(key)
+        run = self.runs[key]
+        try:
+            await run_campaign(campaign, resume=resume, engine=await self._engine())
+            # The entry points mark the run complete, stopped or failed themselves
+            stage = monitor.last_progress.get("stage")
+            run["status"] = {"complete": "completed", "stopped": "stopped"}.get(stage, "failed")
+        except asyncio.CancelledError:
+            monitor.mark_stopped(f"{key} run cancelled")
+            run["status"] = "stopped"
+        except Exception as e:
+            logger.exception(f"{key} run failed")
+            run["status"] = "failed"
+            run["error"] = str(e)
+        finally:
+            run["finished_at"] = time.time()
+            # Wake watchers waiting for the next update; full ones see the end after draining
+            for queue in self.watchers[key]:
+                if not queue.full():
+                    queue.put_nowait(None)
+            logger.info(f"{key} run {run['status']} after {run['finished_at'] - run['started_at']:.0f}s")
+
+    async def stop(self, key: str) -> Dict[str, Any]:
+        """Ask the run to stop at its next progress update; cancel it if it hasn't after the grace period."""
+        if not self.running(key):
+            return {"status": "not_running", "run": self.run_state(key)}
+        self._monitor(key).send_command("stop")
+        asyncio.create_task(self._cancel_after(key, self.tasks[key], STOP_GRACE_SECONDS))
+        return {"status": "stopping", "run": self.run_state(key)}
+
+    async def _cancel_after(self, key: str, task: asyncio.Task, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(asyncio.shield(task), seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"{key} run didn't stop within {seconds:.0f}s, cancelling it")
+            task.cancel()
+        except Exception:
+            pass
+
+    def status(self) -> Dict[str, Any]:
+        keys = list(PROCESSES) + [key for key in self.runs if key not in PROCESSES]
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "runs_started": self.runs_started,
+            "runs": {key: self.run_state(key) for key in keys},
+        }
+
+    async def watch(self, key: str, writer: asyncio.StreamWriter) -> None:
+        """Stream the progress of the current run until it finishes."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WATCH_BUFFER)
+        monitor = self._monitor(key)
+        self.watchers[key].add(queue)
+        try:
+            progress = monitor.last_progress
+            while True:
+                writer.write((json.dumps({"run": key, "progress": progress}) + '\n').encode())
+                await writer.drain()
+                if not self.running(key):
+                    break
+                progress = await queue.get()
+                if progress is None:
+                    break
+            writer.write((json.dumps({"done": True, "run": self.run_state(key)}) + '\n').encode())
+            await writer.drain()
+        finally:
+            self.watchers[key].discard(queue)
+
+    async def handle(self, request: Dict[str, Any], writer: asyncio.StreamWriter) -> Optional[Dict[str, Any]]:
+        """Run one command; returns its response line (None if the command wrote its own)."""
+        command = request.get('command')
+        campaign = None
+        if command in ('start', 'stop', 'watch'):
+            campaign, error = self.resolve(request)
+            if error:
+                return {'error': error}
+
+        if command == 'start':
+            return await self.start(campaign, bool(request.get('resume')))
+        if command == 'stop':
+            return await self.stop(campaign.progress_id)
+        if command == 'status':
+            return self.status()
+        if command == 'watch':
+            await self.watch(campaign.progress_id, writer)
+            return None
+        if command == 'ping':
+            return {'pong': True, 'pid': os.getpid()}
+        if command == 'shutdown':
+            self.stopping.set()
+            return {'status': 'shutting_down'}
+        return {'error': f'Unknown command {command!r}'}
+
+    async def close(self) -> None:
+        """Stop running runs and close the shared browser and API clients."""
+        for key, task in self.tasks.items():
+            if not task.done():
+                self._monitor(key).send_command("stop")
+                task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        if self.engine is not None:
+            await self.engine.close()
+        from llm_cassette import close_clients
+        await close_clients()
+
+async def serve(daemon: RunDaemon, socket_path: str) -> None:
+    """Serve commands on a Unix socket until shut down."""
+    if os.path.exists(socket_path):
+        # Another live daemon owns the socket; otherwise it's left over from a crash
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            logger.info(f"Run daemon already running on {socket_path}")
+            return
+        except OSError:
+            os.unlink(socket_path)
+        finally:
+            probe.close()
+
+    daemon._loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        daemon._loop.add_signal_handler(signum, daemon.stopping.set)
+
+    clients: Set[asyncio.StreamWriter] = set()
+
+    async def on_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    response = {'error': 'Invalid JSON command'}
+                else:
+                    response = await daemon.handle(request, writer)
+                if response is not None:
+                    writer.write((json.dumps(response) + '\n').encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_unix_server(on_client, path=socket_path)
+    logger.info(f"Run daemon listening on {socket_path}")
+    try:
+        async with server:
+            await daemon.stopping.wait()
+            logger.info("Run daemon shutting down")
+            # Idle and watching connections end with the daemon
+            for writer in list(clients):
+                writer.close()
+    finally:
+        await daemon.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Resident daemon for outreach and YOLO runs.')
+    parser.add_argument('--socket', dest='socket_path', default=DEFAULT_SOCKET_PATH,
+                        help=f'Unix socket to listen on (default: {DEFAULT_SOCKET_PATH})')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    daemon = RunDaemon()
+    # Imports install the progress monitors' signal handlers, which only works
+    # on the main thread, so warm up before the event loop starts
+    daemon.warm_up()
+    asyncio.run(serve(daemon, args.socket_path))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+from db_helper import DatabaseHelper
+
+logger = logging.getLogger(__name__)
+
+class RunLedger:
+    """
+    Per-username record of the stages completed in one run.
+
+    Every completed stage is written to the database right away together
+    with its result, so a run that crashed or was stopped can be resumed:
+    the usernames come from the ledger instead of a new discovery, and stages
+    that already ran for a username are skipped using their stored results.
+    """
+
+    def __init__(self, run_id: str, process: str, usernames: List[str],
+                 stages: Optional[Dict[str, Dict[str, Any]]] = None,
+                 db: Optional[DatabaseHelper] = None, resumed: bool = False):
+        self.run_id = run_id
+        self.process = process
+        self.usernames = usernames
+        self.stages = stages or {}
+        self.db = db or DatabaseHelper()
+        self.resumed = resumed
+
+    @classmethod
+    async def begin(cls, process: str, discover: Callable[[], Awaitable[List[str]]],
+                    resume: bool = False, db: Optional[DatabaseHelper] = None) -> "RunLedger":
+        """
+        Resume the process's last unfinished run if asked to and one exists,
+        otherwise discover usernames and start a new run.
+        """
+        db = db or DatabaseHelper()
+        if resume:
+            run = await asyncio.to_thread(db.get_unfinished_run, process)
+            if run:
+                stages = await asyncio.to_thread(db.get_run_ledger, run['run_id'])
+                return cls(run['run_id'], process, run['usernames'], stages, db, resumed=True)
+            logger.info(f"No unfinished {process} run to resume, starting a new one")
+
+        usernames = await discover()
+        run_id = f"{process}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        await asyncio.to_thread(db.start_run, run_id, process, usernames)
+        return cls(run_id, process, usernames, {}, db)
+
+    def done(self, username: str, stage: str) -> bool:
+        return stage in self.stages.get(username, {})
+
+    def get(self, username: str, stage: str, default: Any = None) -> Any:
+        """Stored result of a completed stage."""
+        return self.stages.get(username, {}).get(stage, default)
+
+    def count(self, stage: str) -> int:
+        return sum(1 for stages in self.stages.values() if stage in stages)
+
+    async def record(self, username: str, stage: str, data: Any = None) -> None:
+        """Mark a stage as completed for a username and persist its result."""
+        self.stages.setdefault(username, {})[stage] = data
+        await asyncio.to_thread(self.db.record_run_stage, self.run_id, username, stage, data)
+
+    async def finish(self, status: str = "completed") -> None:
+        await asyncio.to_thread(self.db.finish_run, self.run_id, status)
@@ -18,7 +18,9 @@ CREATE TABLE IF NOT EXISTS influencers (
     email_extracted_at TIMESTAMP,
     dm_sent BOOLEAN DEFAULT FALSE,
     dm_sent_at TIMESTAMP,
-    dm_message TEXT
+    dm_message TEXT,
+    draft_bio_hash TEXT,
+    draft_template_version TEXT
 ); 
 
 CREATE TABLE IF NOT EXISTS hashtag_cache (
@@ -28,4 +30,64 @@ CREATE TABLE IF NOT EXISTS hashtag_cache (
     username TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(hashtags, results_limit, username)
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    worker_id TEXT,
+    lease_expires_at TIMESTAMP,
+    UNIQUE(username, channel)
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (channel, state, next_attempt_at);
+
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    process TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    usernames TEXT,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS run_ledger (
+    run_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    data TEXT,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, username, stage)
+);
+
+CREATE TABLE IF NOT EXISTS verification_queue (
+    username TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker_id TEXT,
+    lease_expires_at TIMESTAMP,
+    attempts INTEGER DEFAULT 0,
+    is_influencer BOOLEAN,
+    error_class TEXT,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    checked_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_verification_queue_state ON verification_queue (state, lease_expires_at);
+
+CREATE TABLE IF NOT EXISTS verification_workers (
+    worker_id TEXT PRIMARY KEY,
+    profile TEXT,
+    stats TEXT,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    heartbeat_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 from typing import List, Dict, Any, Set, Optional
 from dotenv import load_dotenv
@@ -12,11 +13,14 @@ logger = logging.getLogger(__name__)
 class HashtagScraper:
     """Scrape Instagram hashtags to find potential influencers."""
     
-    def __init__(self):
+    def __init__(self, hashtags: Optional[List[str]] = None, results_limit: Optional[int] = None):
+        """Scrape the given hashtags, or those set by HASHTAGS and RESULTS_LIMIT."""
         self.apify = ApifyHelper()
         self.db = DatabaseHelper()
-        self.hashtags = os.getenv("HASHTAGS", "golf,golfswing").split(",")
-        self.results_limit = int(os.getenv("RESULTS_LIMIT", "100"))
+        self.hashtags = hashtags or os.getenv("HASHTAGS", "golf,golfswing").split(",")
+        self.results_limit = results_limit or int(os.getenv("RESULTS_LIMIT", "100"))
+        # Posts from the last hashtag scrape, kept for candidate scoring
+        self.posts: List[Dict[str, Any]] = []
     
     async def get_usernames_from_hashtags(self) -> Set[str]:
         """
@@ -24,17 +28,18 @@ class HashtagScraper:
         """
         # Clean expired cache entries periodically (only on first call)
         if not hasattr(self, '_cache_cleaned'):
-            self.db.clean_expired_cache()
+            await asyncio.to_thread(self.db.clean_expired_cache)
             self._cache_cleaned = True
             
         # Check if we have cached usernames in the database
-        cached_usernames = self.db.get_usernames_from_cache(self.hashtags, self.results_limit)
+        cached_usernames = await asyncio.to_thread(self.db.get_usernames_from_cache, self.hashtags, self.results_limit)
         if cached_usernames:
             logger.info(f"Using {len(cached_usernames)} cached usernames from database (limit: {self.results_limit})")
             return cached_usernames
         
         logger.info(f"Fetching usernames with limit: {self.results_limit}")
         posts = await self.apify.scrape_hashtags(self.hashtags, self.results_limit)
+        self.posts = posts
         
         # Extract unique usernames from posts
         usernames = set()
@@ -46,10 +51,19 @@ class HashtagScraper:
         logger.info(f"Found {len(usernames)} unique users from {len(posts)} posts")
         
         # Save usernames to database cache
-        self.db.save_usernames_to_cache(self.hashtags, self.results_limit, usernames)
+        await asyncio.to_thread(self.db.save_usernames_to_cache, self.hashtags, self.results_limit, usernames)
         
         return usernames
     
+    def get_posts_by_user(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Group the last scraped hashtag posts by owner (empty when usernames came from the cache)."""
+        posts_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for post in self.posts:
+            username = post.get("ownerUsername")
+            if username:
+                posts_by_user.setdefault(username, []).append(post)
+        return posts_by_user
+    
     def extract_hashtags_from_caption(self, caption: str) -> List[str]:
         """Extract hashtags from a post caption."""
         if not caption:
@@ -1,87 +1,82 @@
 #!/usr/bin/env python3
 """
 Send Instagram Direct Messages using browser automation.
-This script uses browser_use to navigate Instagram and send DMs.
+This script is a thin client of the long-lived DM worker (dm_worker.py),
+which keeps a browser warm between messages. The worker is started
+automatically if it isn't running yet.
 """
 
 import sys
 import json
 import asyncio
-from browser_use import Agent, Browser, BrowserConfig, Controller
-from langchain_openai import ChatOpenAI
 import os
 import signal
+import subprocess
+import time
+import uuid
+from typing import Dict, Any
 
-async def send_instagram_dm(username: str, message: str) -> dict:
+SOCKET_PATH = os.getenv("DM_WORKER_SOCKET", "/tmp/instagram_dm_worker.sock")
+
+# How long to wait for an auto-started worker to accept connections
+WORKER_START_TIMEOUT = 30
+
+async def _open_worker_connection():
+    """Connect to the DM worker, starting it first if nothing is listening."""
+    try:
+        return await asyncio.open_unix_connection(SOCKET_PATH)
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+
+    worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dm_worker.py')
+    log_file = open(os.path.join(os.path.dirname(worker_path), 'dm_worker.log'), 'a')
+    subprocess.Popen(
+        [sys.executable, worker_path, '--socket', SOCKET_PATH],
+        stdout=subprocess.DEVNULL,
+        stderr=log_file,
+        start_new_session=True  # Keep the worker alive after this client exits
+    )
+    log_file.close()
+
+    deadline = time.monotonic() + WORKER_START_TIMEOUT
+    while True:
+        try:
+            return await asyncio.open_unix_connection(SOCKET_PATH)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"DM worker did not start listening on {SOCKET_PATH}")
+            await asyncio.sleep(0.5)
+
+async def send_instagram_dm(username: str, message: str, timeout: float = 120) -> Dict[str, Any]:
     """
-    Send a direct message to an Instagram user.
-    
+    Send a direct message to an Instagram user through the DM worker.
+
     Args:
         username: Instagram username (without @)
         message: Message to send
-        
+        timeout: Seconds to wait for the worker's result
+
     Returns:
         dict: Result with success status and any error message
+
+    Raises:
+        asyncio.TimeoutError: If the worker doesn't answer within the timeout
     """
-    # Task to send DM
-    send_dm_task = f"""
-    Go to https://www.instagram.com/{username}/
-    Click on the "Message" button on their profile page. If there is "Message" button, open a menu via triple dot on the right side of profile name at the top of the page.
-    Wait for the DM conversation to open. Make sure there is no previous conversation. If there is a conversation, finish the task here.
-    Type the following message in the message input field and send it:
-    <message>
-    {message}
-    </message>
-    Do not send each line of the message separately. Send the entire message at once - type the whole message, do not use enter key, for new line use Shift+Enter.
-    Once the message is typed and sent (Enter key pressed or send button clicked), return true.
-    Do not wait for confirmation - just ensure the message was typed and sent.
-    """
-    
-    # Set up browser
-    browser = Browser(
-        config=BrowserConfig(
-            browser_binary_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',         
-            chrome_profile_path='/Users/macbook/Library/Application Support/Google/Chrome/Default'
-        )
-    )
-    
+    reader, writer = await _open_worker_connection()
     try:
-        async with await browser.new_context() as ctx:
-            agent = Agent(
-                task=send_dm_task,
-                llm=ChatOpenAI(model='gpt-4o'),
-                browser=browser,
-            )
-            
-            # Run the agent
-            history = await agent.run()
-            
-            # Try to parse the result
-            try:
-                result = history.final_result()
-                if result and 'true' in result.lower():
-                    return {
-                        'success': True,
-                        'message': f'Successfully sent DM to @{username}'
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'error': 'Failed to send DM - could not confirm message was sent'
-                    }
-            except Exception as e:
-                return {
-                    'success': False,
-                    'error': f'Failed to parse result: {str(e)}'
-                }
-                
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Browser automation error: {str(e)}'
-        }
+        job = {'id': uuid.uuid4().hex, 'username': username, 'message': message}
+        writer.write((json.dumps(job) + '\n').encode())
+        await writer.drain()
+
+        line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        if not line:
+            return {
+                'success': False,
+                'error': 'DM worker closed the connection without a result'
+            }
+        return json.loads(line)
     finally:
-        await browser.close()
+        writer.close()
 
 async def main():
     """Main function to handle command line arguments and send DM."""
@@ -91,22 +86,22 @@ async def main():
             'error': 'Usage: python send_instagram_dm.py <username> <message_file>'
         }))
         sys.exit(1)
-    
+
     username = sys.argv[1]
     message_file = sys.argv[2]
-    
+
     try:
         # Read message from file
         with open(message_file, 'r') as f:
             data = json.load(f)
             message = data['message']
-        
+
         # Send the DM
         result = await send_instagram_dm(username, message)
-        
+
         # Output result as JSON
         print(json.dumps(result))
-        
+
     except FileNotFoundError:
         print(json.dumps({
             'success': False,
@@ -135,12 +130,9 @@ def signal_handler(signum, frame):
     sys.exit(0)
 
 if __name__ == '__main__':
-    # Disable telemetry
-    os.environ["ANONYMIZED_TELEMETRY"] = "false"
-    
     # Set up signal handlers for graceful shutdown
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
-    
+
     # Run the async main function
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# How long a memoized result is reused before it is fetched again
+SHARED_MEMO_TTL_SECONDS = float(os.getenv("SHARED_MEMO_TTL_SECONDS", "3600"))
+
+# Result of an in-flight fetch that failed; its waiters fetch the keys themselves
+_FAILED = object()
+
+class SharedMemo(Generic[K, V]):
+    """
+    Per-key results shared by all runs in the process.
+
+    Keys already fetched are answered from memory, keys another caller is
+    fetching right now are waited for instead of being fetched twice, and
+    only the rest are passed to `fetch`. Values rejected by `keep` (e.g. an
+    empty profile after a failed scrape) are handed to the callers waiting
+    for them but not kept. If a fetch fails, its waiters fetch the keys
+    themselves, so one run's exhausted budget or stop never fails another.
+    """
+
+    def __init__(self, ttl: float = SHARED_MEMO_TTL_SECONDS, keep: Callable[[V], bool] = lambda value: True):
+        self.ttl = ttl
+        self.keep = keep
+        self.hits = 0
+        self.shared = 0
+        self.fetched = 0
+        self._values: Dict[K, Tuple[V, float]] = {}
+        self._inflight: Dict[K, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._purged_at = time.monotonic()
+
+    def _get(self, key: K, now: float) -> Tuple[bool, Optional[V]]:
+        entry = self._values.get(key)
+        if entry is None or now - entry[1] > self.ttl:
+            return False, None
+        return True, entry[0]
+
+    def _purge(self, now: float) -> None:
+        if now - self._purged_at < self.ttl:
+            return
+        self._values = {key: entry for key, entry in self._values.items() if now - entry[1] <= self.ttl}
+        self._purged_at = now
+
+    async def get_many(self, keys: List[K], fetch: Callable[[List[K]], Awaitable[Dict[K, V]]]) -> Dict[K, V]:
+        """Values for the keys; keys `fetch` returned nothing for are left out."""
+        results: Dict[K, V] = {}
+        pending = list(dict.fromkeys(keys))
+        while pending:
+            loop = asyncio.get_running_loop()
+            own: List[K] = []
+            waiting: Dict[K, asyncio.Future] = {}
+            with self._lock:
+                now = time.monotonic()
+                for key in pending:
+                    found, value = self._get(key, now)
+                    if found:
+                        results[key] = value
+                        self.hits += 1
+                    elif key in self._inflight:
+                        waiting[key] = self._inflight[key]
+                    else:
+                        self._inflight[key] = loop.create_future()
+                        own.append(key)
+            pending = []
+
+            if own:
+                try:
+                    fetched = await fetch(own)
+                except BaseException:
+                    self._settle(own, {}, failed=True)
+                    raise
+                self._settle(own, fetched)
+                self.fetched += len(own)
+                results.update({key: fetched[key] for key in own if key in fetched})
+
+            for key, future in waiting.items():
+                value = await asyncio.shield(future)
+                if value is _FAILED:
+                    pending.append(key)
+                elif key in value:
+                    results[key] = value[key]
+                    self.shared += 1
+        return results
+
+    def _settle(self, keys: List[K], fetched: Dict[K, V], failed: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                future = self._inflight.pop(key)
+                if key in fetched and self.keep(fetched[key]):
+                    self._values[key] = (fetched[key], now)
+                if not future.done():
+                    future.set_result(_FAILED if failed else fetched)
+            self._purge(now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self._values), "hits": self.hits, "shared": self.shared, "fetched": self.fetched}
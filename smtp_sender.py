@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, Any, List, Optional
+
+from rate_limiter import TokenBucket, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+class SmtpSender:
+    """
+    Send emails over persistent, authenticated SMTP sessions.
+
+    Each worker thread keeps its own connection open between messages and
+    reconnects transparently when the server drops it. Sends run in the
+    worker threads so the event loop is never blocked by SMTP I/O. Sends are
+    capped per minute by the sender and per day per sender address by the
+    process's rate limiter.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str],
+                 use_tls: bool = True, max_per_minute: int = 20, pool_size: int = 1,
+                 timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_per_minute = max_per_minute
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="smtp")
+        self._local = threading.local()
+        self._connections: List[smtplib.SMTP] = []
+        self._connections_lock = threading.Lock()
+        self._minute_bucket = TokenBucket(max_per_minute, 60)
+        self.latencies_ms: List[float] = []
+        self.counters = {"sent": 0, "failed": 0, "connects": 0, "reconnects": 0}
+
+    @classmethod
+    def from_env(cls) -> "SmtpSender":
+        """Create a sender configured from the SMTP_* and SENDER_* environment variables."""
+        return cls(
+            host=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=os.getenv("SENDER_EMAIL"),
+            password=os.getenv("SENDER_PASSWORD"),
+            use_tls=os.getenv("SMTP_USE_TLS", "true").lower() != "false",
+            max_per_minute=int(os.getenv("SMTP_MAX_PER_MINUTE", "20")),
+            pool_size=int(os.getenv("SMTP_POOL_SIZE", "1"))
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP session for the current thread."""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self._local.server = server
+        with self._connections_lock:
+            self._connections.append(server)
+            self.counters["connects"] += 1
+        return server
+
+    def _drop_connection(self) -> None:
+        """Forget the current thread's connection after a failure."""
+        server = getattr(self._local, 'server', None)
+        self._local.server = None
+        if server is None:
+            return
+        with self._connections_lock:
+            if server in self._connections:
+                self._connections.remove(server)
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def _send_sync(self, msg: MIMEMultipart) -> float:
+        """
+        Send a message on the thread's session, reconnecting once if it was
+        dropped; returns the send latency in milliseconds.
+        """
+        started = time.perf_counter()
+        server = getattr(self._local, 'server', None) or self._connect()
+        try:
+            server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            logger.info(f"SMTP connection lost ({e}), reconnecting")
+            self._drop_connection()
+            self.counters["reconnects"] += 1
+            self._connect().send_message(msg)
+        except smtplib.SMTPException:
+            # Rejected by the server; the session itself is still usable
+            raise
+        except OSError:
+            # E.g. a timeout mid-command leaves the session in an unknown state
+            self._drop_connection()
+            raise
+        return (time.perf_counter() - started) * 1000
+
+    async def _wait_for_rate_limit(self) -> None:
+        """Block until sending another message stays within the daily and per-minute caps."""
+        await get_rate_limiter().acquire("smtp_messages", key=self.username)
+        await self._minute_bucket.acquire()
+
+    async def send(self, to_email: str, subject: str, body: str) -> None:
+        """Send a plain-text email. Raises on failure."""
+        msg = MIMEMultipart()
+        msg['From'] = self.username or ''
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+
+        await self._wait_for_rate_limit()
+        try:
+            # Timed in the worker thread, so waiting for a free thread doesn't count
+            latency_ms = await asyncio.get_running_loop().run_in_executor(self.executor, self._send_sync, msg)
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        self.latencies_ms.append(latency_ms)
+        self.counters["sent"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Send latency statistics in milliseconds plus connection counters."""
+        latencies = sorted(self.latencies_ms)
+        stats: Dict[str, Any] = dict(self.counters)
+        if latencies:
+            stats.update({
+                "avg_ms": round(sum(latencies) / len(latencies), 1),
+                "p50_ms": round(latencies[len(latencies) // 2], 1),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "max_ms": round(latencies[-1], 1)
+            })
+        return stats
+
+    def _close_sync(self) -> None:
+        with self._connections_lock:
+            connections = self._connections[:]
+            self._connections.clear()
+        for server in connections:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        """Quit all open sessions and stop the worker threads."""
+        await asyncio.get_running_loop().run_in_executor(None, self._close_sync)
+        self.executor.shutdown(wait=False)
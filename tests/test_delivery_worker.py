@@ -0,0 +1,87 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+import progress_monitor
+from budget import Budget, start_budget
+from db_helper import DatabaseHelper
+from delivery_worker import DeliveryWorker
+from progress_monitor import StopRequested
+
+SCHEMA = os.path.join(os.path.dirname(__file__), "..", "schema.sql")
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """An outbox database in a scratch directory, which also holds the progress files."""
+    shutil.copy(SCHEMA, tmp_path / "schema.sql")
+    monkeypatch.chdir(tmp_path)
+    return DatabaseHelper(str(tmp_path / "influencers.db"))
+
+class StoppingSmtpSender:
+    """Records sends and requests a stop right after each one."""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.sent = []
+
+    async def send(self, to_email, subject, body):
+        self.sent.append(to_email)
+        self.monitor.send_command("stop")
+
+def test_stop_after_send_does_not_send_again(db, monkeypatch):
+    import yolo_outreach
+
+    monkeypatch.setenv("SENDER_EMAIL", "me@example.com")
+    monkeypatch.setenv("SENDER_PASSWORD", "secret")
+    monitor = progress_monitor.get_monitor("test_delivery_worker", handle_signals=False)
+    smtp = StoppingSmtpSender(monitor)
+    monkeypatch.setattr(yolo_outreach, "get_smtp_sender", lambda: smtp)
+    db.enqueue_outbox("golfer_one", "email", {"to": "one@example.com", "subject": "Hi", "body": "Hello"})
+
+    async def deliver():
+        progress_monitor.use_monitor(monitor)
+        start_budget(Budget({}))
+        worker = DeliveryWorker(yolo_outreach.outbox_senders(), db, per_minute={},
+                                progress=yolo_outreach.progress_update_yolo)
+        await worker.run()
+
+    monitor.send_command("run")
+    with pytest.raises(StopRequested):
+        asyncio.run(deliver())
+    # Recorded as sent before the stop took effect, so nothing is left leased to send again
+    assert db.get_outbox_counts() == {"email": {"sent": 1}}
+
+    monitor.send_command("run")
+    asyncio.run(deliver())
+    assert smtp.sent == ["one@example.com"]
+
+class _UnlimitedRateLimiter:
+    async def acquire(self, name, key=None):
+        pass
+
+def test_existing_thread_is_failed_without_retry(db, monkeypatch):
+    import yolo_outreach
+
+    calls = []
+
+    async def send_dm_via_worker(username, message, timeout):
+        calls.append(username)
+        return {'success': False, 'existing_thread': True, 'path': 'scripted:message_button',
+                'error': f'Conversation with @{username} already exists, not sending'}
+
+    monkeypatch.setattr(yolo_outreach, "send_dm_via_worker", send_dm_via_worker)
+    monkeypatch.setattr(yolo_outreach, "get_rate_limiter", lambda: _UnlimitedRateLimiter())
+    db.enqueue_outbox("golfer_one", "dm", {"body": "Hello"})
+
+    async def deliver():
+        progress_monitor.use_monitor(progress_monitor.get_monitor("test_delivery_worker", handle_signals=False))
+        start_budget(Budget({}))
+        worker = DeliveryWorker(yolo_outreach.outbox_senders(), db, per_minute={})
+        return await worker.run()
+
+    stats = asyncio.run(deliver())
+    assert stats["dm"] == {"sent": 0, "retried": 0, "failed": 1}
+    assert db.get_outbox_counts() == {"dm": {"failed": 1}}
+    assert calls == ["golfer_one"]
@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+import pytest
+
+from dm_composer import _type_message, send_dm_scripted
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures", "dm")
+
+MESSAGE = "Hi there!\nLoved your last reel.\n\nWould you like to try Ace Trace?"
+
+async def _send_to_mock(fixture: str):
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except Exception:
+            pytest.skip("Chromium for Playwright is not installed (playwright install chromium)")
+        try:
+            page = await browser.new_page()
+            result = await send_dm_scripted(page, "mock_user", MESSAGE,
+                                            url="file://" + os.path.abspath(os.path.join(FIXTURES, fixture)))
+            return result, await page.evaluate("window.sentMessages || []")
+        finally:
+            await browser.close()
+
+def send_to_mock(fixture: str):
+    pytest.importorskip("playwright")
+    return asyncio.run(_send_to_mock(fixture))
+
+@pytest.mark.parametrize("fixture, path", [
+    ("message_button.html", "scripted:message_button"),
+    ("options_menu.html", "scripted:options_menu"),
+])
+def test_sends_through_known_routes(fixture, path):
+    result, sent = send_to_mock(fixture)
+    assert result["success"] is True
+    assert result["path"] == path
+    # Sent as one message with its line breaks intact
+    assert sent == [MESSAGE]
+
+def test_existing_thread_is_not_messaged():
+    result, sent = send_to_mock("existing_thread.html")
+    assert result["success"] is False
+    assert result["existing_thread"] is True
+    assert sent == []
+
+def test_unknown_layout_falls_back_to_agent():
+    result, sent = send_to_mock("unknown_layout.html")
+    assert result is None
+    assert sent == []
+
+class _RecordingKeyboard:
+    def __init__(self):
+        self.calls = []
+
+    async def insert_text(self, text):
+        self.calls.append(("insert_text", text))
+
+    async def press(self, key):
+        self.calls.append(("press", key))
+
+class _RecordingPage:
+    def __init__(self):
+        self.keyboard = _RecordingKeyboard()
+
+class _Composer:
+    async def click(self):
+        pass
+
+def test_line_breaks_are_typed_with_shift_enter():
+    page = _RecordingPage()
+    asyncio.run(_type_message(page, _Composer(), MESSAGE))
+    assert page.keyboard.calls == [
+        ("insert_text", "Hi there!"),
+        ("press", "Shift+Enter"),
+        ("insert_text", "Loved your last reel."),
+        ("press", "Shift+Enter"),
+        ("press", "Shift+Enter"),
+        ("insert_text", "Would you like to try Ace Trace?"),
+    ]
+    # Enter alone would send the message early
+    assert ("press", "Enter") not in page.keyboard.calls
@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+import llm_cassette
+import progress_monitor
+from budget import Budget, BudgetExhausted, start_budget
+
+COMPLETION = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": '{"subject": "Hi", "body": "Hello"}'}}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}
+
+INFLUENCERS = [{"username": "golfer_one", "full_name": "One", "bio": "Golf coach"},
+               {"username": "golfer_two", "full_name": "Two", "bio": "Golf trips"}]
+
+@pytest.fixture
+def run_with_spent_llm_budget(tmp_path, monkeypatch):
+    """Run a coroutine in a fresh run whose LLM budget is already used up; returns it and the requests sent."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(200, json=COMPLETION)
+
+    async def run(make_coroutine):
+        progress_monitor.use_monitor(progress_monitor.get_monitor("test_llm_budget", handle_signals=False))
+        budget = start_budget(Budget({"llm_usd": 0.01}))
+        budget.spent["llm_usd"] = 0.02
+        http_client, _ = llm_cassette._async_clients_for_loop()
+        http_client._transport.wrapped = httpx.MockTransport(handler)
+        try:
+            return await make_coroutine()
+        finally:
+            await llm_cassette.close_clients()
+
+    return lambda make_coroutine: asyncio.run(run(make_coroutine)), sent
+
+def test_exhausted_budget_stops_single_generation(run_with_spent_llm_budget):
+    import yolo_outreach
+
+    run, sent = run_with_spent_llm_budget
+    with pytest.raises(BudgetExhausted):
+        run(lambda: yolo_outreach._generate_message(INFLUENCERS[0]))
+    assert sent == []
+
+def test_exhausted_budget_stops_batch_generation(run_with_spent_llm_budget):
+    import yolo_outreach
+
+    run, sent = run_with_spent_llm_budget
+    with pytest.raises(BudgetExhausted):
+        run(lambda: yolo_outreach.generate_emails_for_influencers(INFLUENCERS))
+    assert sent == []
+
+def test_exhausted_budget_stops_opening_lines(run_with_spent_llm_budget):
+    import yolo_outreach
+
+    run, sent = run_with_spent_llm_budget
+    with pytest.raises(BudgetExhausted):
+        run(lambda: yolo_outreach.generate_opening_lines(INFLUENCERS))
+    assert sent == []
+
+def test_budget_exhausted_in_transport_is_not_wrapped(run_with_spent_llm_budget, monkeypatch):
+    # The budget runs out between the client's check and the transport's
+    monkeypatch.setattr(llm_cassette, "_check_before_send", lambda request: None)
+
+    async def create():
+        client = llm_cassette.async_openai_client()
+        return await client.with_options(max_retries=0).chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}])
+
+    run, sent = run_with_spent_llm_budget
+    with pytest.raises(BudgetExhausted):
+        run(create)
+    assert sent == []
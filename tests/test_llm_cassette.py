@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+import pytest
+
+import llm_cassette
+import progress_monitor
+from budget import Budget, start_budget
+from llm_cassette import Cassette, CassetteMiss
+
+INFLUENCER = {"username": "golfer_one", "full_name": "One", "bio": "Golf coach"}
+
+@pytest.fixture
+def strict_cassette(tmp_path, monkeypatch):
+    """Switch the shared clients to strict replay of an empty cassette; returns the requests sent."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(llm_cassette, "CASSETTE_MODE", "strict")
+    monkeypatch.setattr(llm_cassette, "_cassette_instance",
+                        Cassette(path=str(tmp_path / "cassette.jsonl"), mode="strict"))
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(500)
+
+    async def run(make_coroutine):
+        progress_monitor.use_monitor(progress_monitor.get_monitor("test_llm_cassette", handle_signals=False))
+        start_budget(Budget({}))
+        http_client, _ = llm_cassette._async_clients_for_loop()
+        http_client._transport.wrapped = httpx.MockTransport(handler)
+        try:
+            return await make_coroutine()
+        finally:
+            await llm_cassette.close_clients()
+
+    return lambda make_coroutine: asyncio.run(run(make_coroutine)), sent
+
+def test_strict_miss_fails_generation_instead_of_falling_back(strict_cassette):
+    import yolo_outreach
+
+    run, sent = strict_cassette
+    with pytest.raises(CassetteMiss):
+        run(lambda: yolo_outreach._generate_message(INFLUENCER))
+    with pytest.raises(CassetteMiss):
+        run(lambda: yolo_outreach.generate_opening_lines([INFLUENCER]))
+    assert sent == []
+
+def test_strict_miss_in_transport_is_not_wrapped(strict_cassette, monkeypatch):
+    monkeypatch.setattr(llm_cassette, "_check_before_send", lambda request: None)
+
+    async def create():
+        return await llm_cassette.async_openai_client().chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "Hi"}])
+
+    run, sent = strict_cassette
+    with pytest.raises(CassetteMiss):
+        run(create)
+    assert sent == []
@@ -0,0 +1,32 @@
+import asyncio
+
+import yolo_outreach
+from message_templates import MAX_OPENING_LINE_LENGTH
+
+class RecordingDrafts:
+    def __init__(self):
+        self.saved = {}
+
+    def get(self, influencer):
+        return None
+
+    def save(self, influencer, message_data):
+        self.saved[influencer['username']] = message_data
+
+def test_drafts_with_a_rejected_opening_line_are_not_saved(monkeypatch):
+    async def generate_opening_lines(influencers):
+        return {
+            "too_long": "x" * (MAX_OPENING_LINE_LENGTH + 1),
+            "blank": "   ",
+            "good": "Loved   your swing videos!",
+        }
+
+    monkeypatch.setattr(yolo_outreach, "generate_opening_lines", generate_opening_lines)
+    drafts = RecordingDrafts()
+    influencers = [{"username": username} for username in ("too_long", "blank", "good")]
+
+    messages = asyncio.run(yolo_outreach.generate_templated_messages(influencers, drafts))
+
+    assert set(messages) == {"too_long", "blank", "good"}
+    assert list(drafts.saved) == ["good"]
+    assert "Loved your swing videos!" in drafts.saved["good"]["body"]
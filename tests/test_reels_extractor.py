@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from qualification import qualify_from_posts
+from reels_extractor import check_reels_html, extract_view_counts, parse_count, qualifies
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures", "reels")
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+@pytest.mark.parametrize("fixture, verdict", [
+    ("json_influencer.html", True),
+    ("dom_not_influencer.html", False),
+    # No reels behind a login wall: left to the agent
+    ("login_wall.html", None),
+    # Only 8 reels rendered, fewer than the rule looks at
+    ("short_grid.html", None),
+])
+def test_fixture_verdicts(fixture, verdict):
+    assert check_reels_html(read_fixture(fixture)) is verdict
+
+def test_short_grid_counts_are_parsed():
+    assert len(extract_view_counts(read_fixture("short_grid.html"))) == 8
+
+@pytest.mark.parametrize("text, count", [
+    ("3,456", 3456), ("12.3K", 12300), ("1,2K", 1200), ("1.2M", 1_200_000), ("912", 912), ("Reels", None),
+])
+def test_parse_count(text, count):
+    assert parse_count(text) == count
+
+def test_qualifies_needs_a_full_window():
+    views = [0, 0, 0] + [5000] * 5
+    assert qualifies(views) is None
+    assert qualifies(views, complete=True) is True
+    assert qualifies(views + [0]) is True
+
+def test_post_data_with_few_reels():
+    reels = [{"type": "Video", "videoPlayCount": 5000, "timestamp": f"2024-01-{day:02d}"} for day in range(1, 9)]
+    # The whole profile was scraped: its 8 reels are judged as they are
+    assert qualify_from_posts(reels, limit=30) is True
+    # A full page of posts may hide older reels
+    assert qualify_from_posts(reels, limit=8) is None
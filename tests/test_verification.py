@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+import verification
+from budget import Budget, BudgetExhausted, start_budget
+from verification import VerificationEngine
+
+class Result(BaseModel):
+    username: str
+    is_influencer: bool
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def get_current_page(self):
+        return object()
+
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    def __init__(self):
+        self.opened = []
+        self.fail_new_context = False
+
+    async def get_playwright_browser(self):
+        pass
+
+    async def new_context(self):
+        if self.fail_new_context:
+            raise RuntimeError("browser is gone")
+        ctx = FakeContext()
+        self.opened.append(ctx)
+        return ctx
+
+    async def close(self):
+        pass
+
+class FakeProfile:
+    account = "test"
+
+    def __init__(self):
+        self.browser = FakeBrowser()
+
+    def create_browser(self):
+        return self.browser
+
+    async def prepare_context(self, ctx):
+        pass
+
+    async def record_page_load(self, page):
+        pass
+
+class _UnlimitedRateLimiter:
+    async def acquire(self, name, key=None):
+        pass
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(verification, "get_rate_limiter", lambda: _UnlimitedRateLimiter())
+    return VerificationEngine("Check {username}", Result, concurrency=1, interval=0, scripted=True,
+                              profile=FakeProfile())
+
+def test_llm_budget_exhausted_keeps_the_context(engine, monkeypatch):
+    async def check_reels(page, username):
+        return None
+
+    monkeypatch.setattr(verification, "check_reels", check_reels)
+
+    async def run():
+        budget = start_budget(Budget({"llm_usd": 0.01}))
+        budget.spent["llm_usd"] = 0.02
+        with pytest.raises(BudgetExhausted):
+            await engine.check("golfer_one")
+        return await engine._contexts.get()
+
+    ctx = asyncio.run(run())
+    assert ctx is engine.profile.browser.opened[0]
+    assert not ctx.closed
+    assert engine.failures == 0
+
+def test_unreplaceable_context_is_not_returned_to_the_pool(engine, monkeypatch):
+    outcomes = iter([RuntimeError("page crashed"), True])
+
+    async def check_reels(page, username):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(verification, "check_reels", check_reels)
+    browser = engine.profile.browser
+
+    async def run():
+        start_budget(Budget({}))
+        await engine.start()
+        browser.fail_new_context = True
+        with pytest.raises(RuntimeError):
+            await engine.check("golfer_one")
+        assert browser.opened[0].closed
+        # The slot stays empty until the next check can open a context
+        browser.fail_new_context = False
+        return await engine.check("golfer_two")
+
+    result = asyncio.run(run())
+    assert result.is_influencer is True
+    assert len(browser.opened) == 2 and not browser.opened[1].closed
+    assert engine.failures == 1
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Type
+
+from reels_extractor import check_reels
+from browser_profile import BrowserProfile
+from budget import BudgetExhausted, get_budget
+from rate_limiter import get_rate_limiter
+
+# browser_use is imported when an engine is created and the LLM client when the
+# agent first runs, so importing this module (e.g. for the queue commands) stays cheap
+if TYPE_CHECKING:
+    from browser_use import Browser
+    from browser_use.browser.context import BrowserContext
+    from pydantic import BaseModel
+
+os.environ["ANONYMIZED_TELEMETRY"] = "false"
+
+logger = logging.getLogger(__name__)
+
+# How many influencer checks run at once, each in its own browser context
+VERIFY_CONCURRENCY = int(os.getenv("VERIFY_CONCURRENCY", "3"))
+
+# Average gap between two checks starting on the same Instagram account
+VERIFY_INTERVAL_SECONDS = float(os.getenv("VERIFY_INTERVAL_SECONDS", "3"))
+
+# Random spread applied to the gap, as a fraction of it
+VERIFY_JITTER = float(os.getenv("VERIFY_JITTER", "0.5"))
+
+# Read view counts from the reels page directly and only run the agent when that fails
+VERIFY_SCRIPTED = os.getenv("VERIFY_SCRIPTED", "true").lower() != "false"
+
+# Failed checks of a username before it is given up on
+VERIFY_MAX_ATTEMPTS = int(os.getenv("VERIFY_MAX_ATTEMPTS", "3"))
+
+# Delay before a failed check is retried; doubles with every further attempt
+VERIFY_RETRY_BACKOFF_SECONDS = float(os.getenv("VERIFY_RETRY_BACKOFF_SECONDS", "900"))
+
+def classify_error(error: BaseException) -> str:
+    """Coarse class of a failed check, recorded with the retry."""
+    name = type(error).__name__
+    message = str(error).lower()
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "timeout" in name.lower():
+        return "timeout"
+    if "429" in message or "rate limit" in message or "try again later" in message:
+        return "rate_limited"
+    if "login" in message:
+        return "login_required"
+    if name in ("ValidationError", "JSONDecodeError") or isinstance(error, (ValueError, TypeError)):
+        return "bad_result"
+    if name in ("Error", "TargetClosedError") or "browser" in message or "target" in message:
+        return "browser"
+    return "other"
+
+def retry_delay(attempts: int, max_attempts: int = VERIFY_MAX_ATTEMPTS,
+                base: float = VERIFY_RETRY_BACKOFF_SECONDS) -> Optional[float]:
+    """
+    Seconds to wait before retrying a check that has failed `attempts` times,
+    with exponential backoff and jitter, or None once it should be given up.
+    """
+    if attempts >= max_attempts:
+        return None
+    return base * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+class VerificationEngine:
+    """
+    Run influencer checks concurrently on one browser.
+
+    The browser is launched once and a pool of contexts is reused across
+    checks, so a check only pays for its agent run. Checks share the logged-in
+    Instagram account, so their starts are spaced out with jittered pacing
+    rather than a fixed sleep after every profile, within the account's
+    hourly profile view limit.
+
+    With `scripted` set, each check first reads the reels page without the
+    LLM (see reels_extractor) and only runs the agent if the page can't be
+    parsed.
+    """
+
+    def __init__(self, task: str, output_model: Type["BaseModel"],
+                 concurrency: int = VERIFY_CONCURRENCY,
+                 interval: float = VERIFY_INTERVAL_SECONDS,
+                 jitter: float = VERIFY_JITTER,
+                 scripted: bool = VERIFY_SCRIPTED,
+                 profile: Optional[BrowserProfile] = None):
+        from browser_use import Controller
+
+        self.task = task
+        self.output_model = output_model
+        self.concurrency = max(1, concurrency)
+        self.interval = interval
+        self.jitter = jitter
+        self.scripted = scripted
+        self.profile = profile or BrowserProfile.from_env()
+        self.browser: Optional["Browser"] = None
+        self.controller = Controller(output_model=output_model)
+        self.checks = 0
+        self.failures = 0
+        self.scripted_checks = 0
+        self.agent_checks = 0
+        self._contexts: Optional[asyncio.Queue] = None
+        self._all_contexts: List["BrowserContext"] = []
+        self._next_start = 0.0
+        self._pace_lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        self._started_at: Optional[float] = None
+
+    async def start(self) -> None:
+        """Launch the browser and open the context pool."""
+        if self.browser is not None:
+            return
+        # Checks starting together wait for one launch; the browser is only
+        # published once its contexts are ready
+        async with self._start_lock:
+            if self.browser is not None:
+                return
+            browser = self.profile.create_browser()
+            contexts: asyncio.Queue = asyncio.Queue()
+            try:
+                # Launch Chrome once up front so contexts don't race to start it
+                await browser.get_playwright_browser()
+                for _ in range(self.concurrency):
+                    contexts.put_nowait(await self._open_context(browser))
+            except BaseException:
+                for ctx in list(self._all_contexts):
+                    await self._close_context(ctx)
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.warning(f"Error closing browser: {e}")
+                raise
+            self._contexts = contexts
+            self.browser = browser
+
+    async def _open_context(self, browser: Optional["Browser"] = None) -> "BrowserContext":
+        ctx = await (browser or self.browser).new_context()
+        self._all_contexts.append(ctx)
+        try:
+            await self.profile.prepare_context(ctx)
+        except BaseException:
+            await self._close_context(ctx)
+            raise
+        return ctx
+
+    async def _close_context(self, ctx: "BrowserContext") -> None:
+        if ctx in self._all_contexts:
+            self._all_contexts.remove(ctx)
+        try:
+            await ctx.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser context: {e}")
+
+    async def _pace(self) -> None:
+        """Wait for the account's hourly view capacity, then for this check's start slot."""
+        await get_rate_limiter().acquire("instagram_views", key=self.profile.account)
+        async with self._pace_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            gap = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._next_start = start_at + gap
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def check(self, username: str) -> "BaseModel":
+        """
+        Check one username and return the result as the output model.
+
+        Raises whatever the agent run or result parsing raised; the context
+        used by a failed check is replaced so the next check starts clean.
+        Raises BudgetExhausted without checking once the run's browser check
+        budget is used up.
+        """
+        get_budget().acquire("browser_checks")
+        await self.start()
+        # None is a slot whose context was closed and couldn't be replaced
+        ctx = await self._contexts.get()
+        try:
+            if ctx is None:
+                ctx = await self._open_context()
+            await self._pace()
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            
+            if self.scripted:
+                page = await ctx.get_current_page()
+                is_influencer = await check_reels(page, username)
+                await self.profile.record_page_load(page)
+                if is_influencer is not None:
+                    self.checks += 1
+                    self.scripted_checks += 1
+                    return self.output_model(username=username, is_influencer=is_influencer)
+            
+            get_budget().check("llm_usd", "llm_tokens")
+            self.agent_checks += 1
+            from browser_use import Agent
+            from llm_cassette import chat_llm
+            agent = Agent(
+                task=self.task.format(username=username),
+                llm=chat_llm('gpt-4o'),
+                browser=self.browser,
+                browser_context=ctx,
+                controller=self.controller,
+            )
+            history = await agent.run()
+            result = self.output_model.model_validate_json(history.final_result())
+            self.checks += 1
+            return result
+        except BudgetExhausted:
+            # Not the context's fault; it goes back to the pool as it is
+            raise
+        except Exception:
+            self.checks += 1
+            self.failures += 1
+            if ctx is not None:
+                await self._close_context(ctx)
+                ctx = None
+                try:
+                    ctx = await self._open_context()
+                except Exception as e:
+                    logger.warning(f"Could not replace browser context, retrying on next check: {e}")
+            raise
+        finally:
+            self._contexts.put_nowait(ctx)
+
+    def stats(self) -> Dict[str, Any]:
+        """Check counts and throughput since the first check started."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0
+        return {
+            "checks": self.checks,
+            "failures": self.failures,
+            "scripted_checks": self.scripted_checks,
+            "agent_checks": self.agent_checks,
+            "concurrency": self.concurrency,
+            "elapsed_seconds": round(elapsed, 1),
+            "checks_per_minute": round(self.checks / elapsed * 60, 2) if elapsed else 0,
+            "browser": self.profile.stats()
+        }
+
+    async def close(self) -> None:
+        """Close all contexts and the browser."""
+        for ctx in list(self._all_contexts):
+            await self._close_context(ctx)
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+        self.browser = None
+        self._contexts = None
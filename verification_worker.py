@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Sharded influencer verification across processes.
+
+Usernames to check are queued in the verification_queue table. Any number
+of worker processes, each with its own browser (and optionally its own
+browser profile and Instagram account), lease batches from the queue, keep
+their leases alive while checking and give usernames back when a check
+fails, with the retry scheduled after an exponential backoff. A username
+leased by a worker that died becomes claimable again once its lease
+expires, so no username is checked by two live workers.
+
+Usage:
+    python verification_worker.py enqueue <username> [<username> ...]
+    python verification_worker.py worker [--worker-id ID] [--cookies-file FILE] [--exit-when-empty]
+    python verification_worker.py coordinator [--interval 10]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from typing import Callable, Dict, Any, Optional, Set
+
+from db_helper import DatabaseHelper
+from browser_profile import BrowserProfile
+from budget import BudgetExhausted
+from verification import VerificationEngine, VERIFY_MAX_ATTEMPTS, classify_error, retry_delay
+
+logger = logging.getLogger(__name__)
+
+# Usernames a worker leases at a time
+VERIFY_LEASE_BATCH = int(os.getenv("VERIFY_LEASE_BATCH", "6"))
+
+# How long a lease lasts without renewal; workers renew at a third of this
+VERIFY_LEASE_SECONDS = float(os.getenv("VERIFY_LEASE_SECONDS", "180"))
+
+# How often an idle worker looks for new usernames
+VERIFY_POLL_SECONDS = float(os.getenv("VERIFY_POLL_SECONDS", "5"))
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+async def schedule_retry(db: DatabaseHelper, username: str, error: BaseException,
+                         worker_id: Optional[str] = None,
+                         max_attempts: int = VERIFY_MAX_ATTEMPTS) -> Dict[str, Any]:
+    """
+    Record a failed check with its error class and schedule the next attempt.
+
+    Returns the error class, the attempt count and the retry delay (None once
+    the username is given up on).
+    """
+    previous = await asyncio.to_thread(db.get_verification_results, [username])
+    attempts = previous.get(username, {}).get('attempts', 0) + 1
+    error_class = classify_error(error)
+    delay = retry_delay(attempts, max_attempts)
+    await asyncio.to_thread(db.fail_verification, username, error_class,
+                            f"{type(error).__name__}: {error}", delay, worker_id)
+    return {"error_class": error_class, "attempts": attempts, "retry_in_seconds": delay}
+
+class VerificationWorker:
+    """Lease usernames from the queue and check them on one verification engine."""
+
+    def __init__(self, engine: VerificationEngine, worker_id: Optional[str] = None,
+                 db: Optional[DatabaseHelper] = None, batch_size: int = VERIFY_LEASE_BATCH,
+                 lease_seconds: float = VERIFY_LEASE_SECONDS, max_attempts: int = VERIFY_MAX_ATTEMPTS,
+                 poll_interval: float = VERIFY_POLL_SECONDS,
+                 progress: Optional[Callable[..., None]] = None):
+        self.engine = engine
+        self.worker_id = worker_id or default_worker_id()
+        self.db = db or DatabaseHelper()
+        self.batch_size = max(1, batch_size)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.progress = progress
+        self.stats = {"completed": 0, "failed": 0, "lost_leases": 0}
+        # Usernames this worker currently holds leases on
+        self._held: Set[str] = set()
+
+    def _report(self, stage: str, message: str, data: Optional[Dict[str, Any]] = None) -> None:
+        if self.progress:
+            self.progress(stage, message, data)
+        else:
+            logger.info(message)
+
+    def _profile_name(self) -> str:
+        profile = self.engine.profile
+        return profile.cookies_file or profile.binary_path or "default"
+
+    async def _heartbeat(self) -> None:
+        await asyncio.to_thread(self.db.heartbeat_verification_worker, self.worker_id,
+                                self._profile_name(), {**self.stats, **self.engine.stats()})
+
+    async def _keep_leases(self) -> None:
+        """Renew the held leases and heartbeat until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            held = await asyncio.to_thread(self.db.renew_verification_leases, self.worker_id,
+                                           sorted(self._held), self.lease_seconds)
+            lost = self._held - set(held)
+            if lost:
+                # Another worker took these over after our lease ran out
+                self.stats["lost_leases"] += len(lost)
+                self._held -= lost
+                self._report("verify_worker", f"Lost leases on {len(lost)} usernames",
+                             {"worker_id": self.worker_id, "usernames": sorted(lost)})
+            await self._heartbeat()
+
+    async def _check(self, username: str) -> None:
+        try:
+            result = await self.engine.check(username)
+        except BudgetExhausted:
+            # Leave the username held; run() gives it back on the way out
+            raise
+        except Exception as e:
+            retry = await schedule_retry(self.db, username, e, self.worker_id, self.max_attempts)
+            self.stats["failed"] += 1
+            self._report("error", f"Check of {username} failed ({retry['error_class']}): {e}",
+                         {"worker_id": self.worker_id, "username": username, "error": str(e), **retry})
+        else:
+            if await asyncio.to_thread(self.db.complete_verification, self.worker_id,
+                                       username, result.is_influencer):
+                self.stats["completed"] += 1
+                self._report("verify_worker", f"Checked {username}: is_influencer={result.is_influencer}",
+                             {"worker_id": self.worker_id, "username": username,
+                              "is_influencer": result.is_influencer})
+            else:
+                self.stats["lost_leases"] += 1
+        # On cancellation the username stays held so run() gives it back
+        self._held.discard(username)
+
+    async def run(self, exit_when_empty: bool = False) -> Dict[str, Any]:
+        """
+        Check leased batches until cancelled, until the run's budget is used
+        up, or until the queue is empty with `exit_when_empty`. Leases still
+        held on exit are given back.
+        """
+        await self._heartbeat()
+        keeper = asyncio.create_task(self._keep_leases())
+        try:
+            while True:
+                batch = await asyncio.to_thread(self.db.claim_verification_batch, self.worker_id,
+                                                self.batch_size, self.lease_seconds)
+                if not batch:
+                    if exit_when_empty:
+                        break
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                self._held.update(batch)
+                self._report("verify_worker", f"Leased {len(batch)} usernames",
+                             {"worker_id": self.worker_id, "usernames": batch})
+                outcomes = await asyncio.gather(*(self._check(username) for username in batch),
+                                                return_exceptions=True)
+                stopped = next((e for e in outcomes if isinstance(e, BaseException)), None)
+                if stopped:
+                    self._report("verify_worker", f"Worker {self.worker_id} stopping: {stopped}",
+                                 {"worker_id": self.worker_id, "reason": str(stopped)})
+                    break
+        finally:
+            keeper.cancel()
+            for username in list(self._held):
+                await asyncio.to_thread(self.db.release_verification, self.worker_id, username)
+            self._held.clear()
+            await self._heartbeat()
+        return self.stats
+
+class VerificationCoordinator:
+    """Report queue progress and aggregate throughput of all workers."""
+
+    def __init__(self, db: Optional[DatabaseHelper] = None, interval: float = 10.0,
+                 window_seconds: float = 300.0, progress: Optional[Callable[..., None]] = None):
+        self.db = db or DatabaseHelper()
+        self.interval = interval
+        self.window_seconds = window_seconds
+        self.progress = progress
+
+    async def snapshot(self) -> Dict[str, Any]:
+        # Workers heartbeat at least every third of a lease
+        return await asyncio.to_thread(self.db.get_verification_stats, self.window_seconds,
+                                       VERIFY_LEASE_SECONDS)
+
+    async def run(self, exit_when_done: bool = False) -> Dict[str, Any]:
+        """Report a snapshot every interval; with `exit_when_done`, return once nothing is left to check."""
+        while True:
+            stats = await self.snapshot()
+            queue = stats.get("queue", {})
+            remaining = queue.get("pending", 0) + queue.get("leased", 0)
+            retrying = sum(counts.get("retrying", 0) for counts in stats.get("errors", {}).values())
+            message = (f"{stats.get('alive_workers', 0)} workers, {stats.get('checks_per_minute', 0)} checks/min, "
+                       f"{queue.get('done', 0)} done, {remaining} remaining ({retrying} waiting to retry), "
+                       f"{queue.get('failed', 0)} failed")
+            if self.progress:
+                self.progress("verify_coordinator", message, stats)
+            else:
+                logger.info(message)
+            if exit_when_done and remaining == 0:
+                return stats
+            await asyncio.sleep(self.interval)
+
+async def run_worker(args) -> None:
+    from outreach import get_view_count, Influencer
+
+    profile = BrowserProfile.from_env()
+    if args.cookies_file:
+        profile.cookies_file = args.cookies_file
+    if args.binary_path:
+        profile.binary_path = args.binary_path
+    engine = VerificationEngine(get_view_count, Influencer, profile=profile)
+    worker = VerificationWorker(engine, worker_id=args.worker_id)
+    logger.info(f"Verification worker {worker.worker_id} starting")
+    try:
+        stats = await worker.run(exit_when_empty=args.exit_when_empty)
+        logger.info(f"Verification worker {worker.worker_id} finished: {stats}")
+    finally:
+        await engine.close()
+        from llm_cassette import close_clients
+        await close_clients()
+
+async def main():
+    parser = argparse.ArgumentParser(description='Sharded influencer verification workers.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Queue usernames for verification')
+    enqueue.add_argument('usernames', nargs='+')
+
+    worker = commands.add_parser('worker', help='Lease and check usernames from the queue')
+    worker.add_argument('--worker-id', help='Name of this worker (default: host-pid)')
+    worker.add_argument('--cookies-file', help='Instagram session for this worker (overrides BROWSER_COOKIES_FILE)')
+    worker.add_argument('--binary-path', help='Chrome binary for this worker (overrides BROWSER_BINARY_PATH)')
+    worker.add_argument('--exit-when-empty', action='store_true', help='Exit once the queue is empty')
+
+    coordinator = commands.add_parser('coordinator', help='Report aggregate progress of all workers')
+    coordinator.add_argument('--interval', type=float, default=10.0, help='Seconds between reports')
+    coordinator.add_argument('--exit-when-done', action='store_true', help='Exit once nothing is left to check')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'enqueue':
+        queued = DatabaseHelper().enqueue_verifications(args.usernames)
+        logger.info(f"Queued {queued} of {len(args.usernames)} usernames")
+    elif args.command == 'worker':
+        await run_worker(args)
+    else:
+        await VerificationCoordinator(interval=args.interval).run(exit_when_done=args.exit_when_done)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -9,12 +9,11 @@ import sys
 import os
 import json
 import time
-from typing import List, Dict, Any
-import subprocess
-from datetime import datetime
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable, Awaitable
 
 # Import modules from existing scripts
 from outreach import (
+    check_db_columns,
     get_usernames,
     get_user_profiles,
     extract_emails_from_bios,
@@ -23,34 +22,53 @@ from outreach import (
     progress_update
 )
 from db_helper import DatabaseHelper
-from openai import OpenAI
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from browser_use import Agent, Browser, BrowserConfig, Controller
-from langchain_openai import ChatOpenAI
+from loop_monitor import LoopLagMonitor
+from draft_store import DraftStore
+from message_templates import CURRENT_TEMPLATE_VERSION, clean_opening_line, render_message
+from llm_cassette import CassetteMiss, async_openai_client, cassette_stats, close_clients
+from pydantic import BaseModel
+from smtp_sender import SmtpSender
+from delivery_worker import DeliveryWorker, SendRefused
+from send_instagram_dm import send_instagram_dm as send_dm_via_worker
+from verification import VerificationEngine
+from qualification import QUALIFY_MODE, qualify_by_post_data
+from run_ledger import RunLedger
+from contact_index import ContactIndex
+from budget import BudgetExhausted, get_budget, start_budget
+from rate_limiter import get_rate_limiter
+from browser_profile import BrowserProfile
+from verification_worker import schedule_retry
+from campaign import claim_usernames, get_campaign, release_usernames
 import progress_monitor
+from progress_monitor import StopRequested
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 os.environ["ANONYMIZED_TELEMETRY"] = "false"
 
-# Get the progress monitor
-monitor = progress_monitor.get_monitor("yolo")
+# Bump whenever the generation prompt changes so stored drafts are regenerated
+MESSAGE_PROMPT_VERSION = "prompt-v1"
+
+# "llm" writes whole messages, "template" renders them locally and only asks
+# the LLM for a personalized opening line
+MESSAGE_MODE = os.getenv("YOLO_MESSAGE_MODE", "llm")
+
+# How many message drafts may be generated concurrently ahead of the sender
+GENERATION_CONCURRENCY = int(os.getenv("YOLO_GENERATION_CONCURRENCY", "3"))
+
+# How many influencers are drafted together in one generation request
+GENERATION_BATCH_SIZE = int(os.getenv("YOLO_GENERATION_BATCH_SIZE", "5"))
 
-def progress_update_yolo(stage, message, data=None):
-    """Update progress using the monitor."""
+def progress_update_yolo(stage, message, data=None, check_stop=True):
+    """Update progress using the monitor; check_stop=False reports without honouring a stop request."""
+    monitor = progress_monitor.current_monitor("yolo")
     monitor.update_progress(stage, message, data=data)
-    
-    if monitor.should_stop():
-        monitor.log(f"Received stop command during stage: {stage}", "warning")
-        sys.exit(0)
+    if check_stop:
+        monitor.check_stop(stage)
 
-async def generate_email_for_influencer(influencer: Dict[str, Any]) -> Dict[str, str]:
-    """Generate personalized email/DM content for an influencer."""
-    client = OpenAI()
-    
-    try:
-        # System prompt for email generation
-        system_prompt = """You are a marketing specialist creating personalized outreach messages for golf influencers. 
+# System prompt shared by single and batched message generation
+MESSAGE_SYSTEM_PROMPT = """You are a marketing specialist creating personalized outreach messages for golf influencers. 
         Create a compelling, personalized email that:
         1. References something specific about their content or profile
         2. Introduces the Ace Trace app for golfers
@@ -58,7 +76,44 @@ async def generate_email_for_influencer(influencer: Dict[str, Any]) -> Dict[str,
         4. Keeps it concise and engaging
         
         The message should work for both email and Instagram DM."""
-        
+
+class InfluencerMessage(BaseModel):
+    username: str
+    subject: str
+    body: str
+
+class MessageBatch(BaseModel):
+    messages: List[InfluencerMessage]
+
+class OpeningLine(BaseModel):
+    username: str
+    opening_line: str
+
+class OpeningLines(BaseModel):
+    lines: List[OpeningLine]
+
+def message_mode() -> str:
+    """Message mode of the running campaign, YOLO_MESSAGE_MODE unless it sets its own."""
+    return get_campaign("yolo").message_mode or MESSAGE_MODE
+
+def template_version() -> str:
+    """Template version of the running campaign, YOLO_TEMPLATE_VERSION unless it sets its own."""
+    return get_campaign("yolo").template_version or CURRENT_TEMPLATE_VERSION
+
+def message_version() -> str:
+    """Version that stored drafts are keyed on for the active message mode."""
+    return template_version() if message_mode() == "template" else MESSAGE_PROMPT_VERSION
+
+def fallback_message(influencer: Dict[str, Any]) -> Dict[str, str]:
+    """Default template used when generation fails."""
+    return render_message(influencer, version=template_version())
+
+async def _generate_message(influencer: Dict[str, Any], drafts: Optional[DraftStore] = None, 
+                            client: Optional["AsyncOpenAI"] = None) -> Dict[str, str]:
+    """Generate one message with the LLM, storing it in the draft store on success."""
+    client = client or async_openai_client()
+    
+    try:
         # User prompt with influencer details
         user_prompt = f"""Create an outreach message for this golf influencer:
         Username: {influencer.get('username', '')}
@@ -70,142 +125,361 @@ async def generate_email_for_influencer(influencer: Dict[str, Any]) -> Dict[str,
         
         Return a JSON object with 'subject' and 'body' fields."""
         
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": MESSAGE_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             response_format={"type": "json_object"}
         )
         
         content = response.choices[0].message.content
-        return json.loads(content)
+        message_data = json.loads(content)
+        if not message_data.get('subject') or not message_data.get('body'):
+            raise ValueError("Response is missing 'subject' or 'body'")
         
+        # Only real generations are stored; the fallback below is free to rebuild
+        if drafts is not None:
+            await asyncio.to_thread(drafts.save, influencer, message_data)
+        return message_data
+        
+    except (BudgetExhausted, CassetteMiss):
+        raise
     except Exception as e:
         progress_update_yolo("error", f"Failed to generate message for {influencer.get('username')}: {e}")
         # Return a default template
-        return {
-            "subject": "Partnership Opportunity with Ace Trace",
-            "body": f"Hi {influencer.get('full_name', influencer.get('username'))},\n\nI noticed your amazing golf content and would love to discuss a partnership opportunity with Ace Trace, our golf shot tracking app.\n\nWe offer 15% commission, free app access, and 10% discount for your followers.\n\nInterested in learning more?\n\nBest regards,\nAce Trace Team"
-        }
+        return fallback_message(influencer)
+
+async def generate_email_for_influencer(influencer: Dict[str, Any], 
+                                       drafts: Optional[DraftStore] = None) -> Dict[str, str]:
+    """Generate personalized email/DM content for an influencer, reusing a stored draft if valid."""
+    if drafts is not None:
+        stored = drafts.get(influencer)
+        if stored:
+            progress_update_yolo("generating", f"Reusing stored draft for {influencer.get('username')}", 
+                               {"username": influencer.get('username'), "from_cache": True})
+            return stored
+    
+    return await _generate_message(influencer, drafts)
+
+async def generate_emails_for_influencers(influencers: List[Dict[str, Any]], 
+                                         drafts: Optional[DraftStore] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Generate messages for several influencers with one structured-output request.
+    
+    Every returned item is validated on its own; influencers whose item is
+    missing or invalid are re-generated individually.
+    
+    Returns:
+        dict: Mapping of username to a message with 'subject' and 'body'
+    """
+    messages: Dict[str, Dict[str, str]] = {}
+    pending: Dict[str, Dict[str, Any]] = {}
+    
+    for influencer in influencers:
+        username = influencer.get('username')
+        stored = drafts.get(influencer) if drafts is not None else None
+        if stored:
+            messages[username] = stored
+        else:
+            pending[username] = influencer
+    
+    if messages:
+        progress_update_yolo("generating", f"Reusing {len(messages)} stored drafts", 
+                           {"usernames": list(messages.keys()), "from_cache": True})
+    
+    if not pending:
+        return messages
+    
+    client = async_openai_client()
+    
+    if len(pending) > 1:
+        profile_data = [
+            {"username": username, "full_name": influencer.get('full_name') or '', "bio": influencer.get('bio') or ''}
+            for username, influencer in pending.items()
+        ]
+        
+        user_prompt = (f"Create one outreach message for each of these golf influencers: {json.dumps(profile_data)}\n"
+                       "Product: Ace Trace - Golf shot tracking app\n"
+                       "Offer: 15% commission on sales, free app access, 10% discount for followers\n"
+                       "Return a 'messages' array with one object per influencer with 'username', 'subject' and 'body' fields.")
+        
+        try:
+            progress_update_yolo("generating", f"Generating {len(pending)} messages in one request...", 
+                               {"batch_size": len(pending)})
+            response = await client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                response_format=MessageBatch,
+                messages=[
+                    {"role": "system", "content": MESSAGE_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ]
+            )
+            
+            content = response.choices[0].message.content
+            
+            # Validate item by item so one bad entry doesn't discard the whole batch
+            for item in json.loads(content).get('messages', []):
+                try:
+                    message = InfluencerMessage.model_validate(item)
+                except Exception:
+                    continue
+                
+                influencer = pending.get(message.username)
+                if influencer is None or message.username in messages:
+                    continue
+                if not message.subject.strip() or not message.body.strip():
+                    continue
+                
+                message_data = {"subject": message.subject, "body": message.body}
+                if drafts is not None:
+                    await asyncio.to_thread(drafts.save, influencer, message_data)
+                messages[message.username] = message_data
+        
+        except (BudgetExhausted, CassetteMiss):
+            raise
+        except Exception as e:
+            progress_update_yolo("error", f"Batch message generation failed: {e}", {"error": str(e)})
+    
+    # Re-queue missing or invalid items individually
+    missing = [influencer for username, influencer in pending.items() if username not in messages]
+    if missing and len(pending) > 1:
+        progress_update_yolo("generating", f"Re-generating {len(missing)} messages individually", 
+                           {"usernames": [influencer.get('username') for influencer in missing]})
+    
+    results = await asyncio.gather(*(_generate_message(influencer, drafts, client) for influencer in missing))
+    for influencer, message_data in zip(missing, results):
+        messages[influencer.get('username')] = message_data
+    
+    return messages
+
+async def generate_opening_lines(influencers: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Ask the LLM for a short personalized opening line for each influencer in one request."""
+    if not influencers:
+        return {}
+    
+    client = async_openai_client()
+    profile_data = [
+        {"username": influencer.get('username'), "full_name": influencer.get('full_name') or '', 
+         "bio": influencer.get('bio') or ''}
+        for influencer in influencers
+    ]
+    
+    system_prompt = (
+        "You write the first sentence of outreach messages to golf influencers. "
+        "For each profile write one short, friendly opening line (max 25 words) that references "
+        "something specific from their bio or name. Use the same language as the profile. "
+        "Do not mention any product, offer or greeting - the rest of the message is written separately."
+    )
+    user_prompt = (f"Write an opening line for each of these Instagram profiles: {json.dumps(profile_data)}\n"
+                   "Return a 'lines' array of objects with 'username' and 'opening_line' fields.")
+    
+    try:
+        response = await client.beta.chat.completions.parse(
+            model="gpt-4o-mini",
+            response_format=OpeningLines,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        )
+        
+        content = response.choices[0].message.content
+        mapping = OpeningLines.model_validate_json(content)
+        return {item.username: item.opening_line for item in mapping.lines}
+    
+    except (BudgetExhausted, CassetteMiss):
+        raise
+    except Exception as e:
+        progress_update_yolo("error", f"Failed to generate opening lines: {e}", {"error": str(e)})
+        return {}
+
+async def generate_templated_messages(influencers: List[Dict[str, Any]], 
+                                      drafts: Optional[DraftStore] = None) -> Dict[str, Dict[str, str]]:
+    """Render messages from the local template, with only the opening lines written by the LLM."""
+    messages: Dict[str, Dict[str, str]] = {}
+    pending = []
+    
+    for influencer in influencers:
+        stored = drafts.get(influencer) if drafts is not None else None
+        if stored:
+            messages[influencer.get('username')] = stored
+        else:
+            pending.append(influencer)
+    
+    opening_lines = await generate_opening_lines(pending)
+    
+    for influencer in pending:
+        username = influencer.get('username')
+        opening_line = clean_opening_line(opening_lines.get(username))
+        message_data = render_message(influencer, opening_line, version=template_version())
+        # Drafts without a usable personalized line are rendered again next run
+        if drafts is not None and opening_line:
+            await asyncio.to_thread(drafts.save, influencer, message_data)
+        messages[username] = message_data
+    
+    return messages
+
+async def generate_messages(influencers: List[Dict[str, Any]], 
+                            drafts: Optional[DraftStore] = None) -> Dict[str, Dict[str, str]]:
+    """Generate messages for a batch of influencers using the configured message mode."""
+    if message_mode() == "template":
+        return await generate_templated_messages(influencers, drafts)
+    if len(influencers) == 1:
+        influencer = influencers[0]
+        return {influencer.get('username'): await generate_email_for_influencer(influencer, drafts)}
+    return await generate_emails_for_influencers(influencers, drafts)
+
+# Shared SMTP sender, keeps authenticated sessions alive between emails
+_smtp_sender: Optional[SmtpSender] = None
+
+def get_smtp_sender() -> SmtpSender:
+    """Get the shared SMTP sender, creating it on first use."""
+    global _smtp_sender
+    if _smtp_sender is None:
+        _smtp_sender = SmtpSender.from_env()
+    return _smtp_sender
+
+async def close_smtp_sender() -> Optional[Dict[str, Any]]:
+    """Close the shared SMTP sender and return its send statistics."""
+    global _smtp_sender
+    if _smtp_sender is None:
+        return None
+    stats = _smtp_sender.stats()
+    await _smtp_sender.close()
+    _smtp_sender = None
+    return stats
 
 async def send_email(to_email: str, subject: str, body: str, username: str) -> bool:
-    """Send email using SMTP."""
+    """
+    Send email using SMTP.
+
+    Senders report without checking for a stop: a stop raised after the send
+    would keep the delivery worker from recording it, and the message would
+    go out again once its lease ran out.
+    """
     try:
-        smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
         sender_email = os.getenv("SENDER_EMAIL")
         sender_password = os.getenv("SENDER_PASSWORD")
         
         if not sender_email or not sender_password:
-            progress_update_yolo("error", f"Email credentials not configured for {username}")
+            progress_update_yolo("error", f"Email credentials not configured for {username}", check_stop=False)
             return False
         
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        server.send_message(msg)
-        server.quit()
+        await get_smtp_sender().send(to_email, subject, body)
         
-        progress_update_yolo("email_sent", f"Email sent successfully to {username} ({to_email})")
+        progress_update_yolo("email_sent", f"Email sent successfully to {username} ({to_email})", check_stop=False)
         return True
         
     except Exception as e:
-        progress_update_yolo("error", f"Failed to send email to {username}: {e}")
+        progress_update_yolo("error", f"Failed to send email to {username}: {e}", check_stop=False)
         return False
 
 async def send_instagram_dm(username: str, message: str) -> bool:
-    """Send Instagram DM using the existing script."""
+    """
+    Send Instagram DM through the long-lived DM worker.
+
+    Raises SendRefused when the DM was deliberately not sent, e.g. because a
+    conversation with the user already exists, so it isn't retried.
+    """
+    # The DM worker logs in with the same session settings as this process
+    await get_rate_limiter().acquire("instagram_dms", key=BrowserProfile.from_env().account)
     try:
-        # Create temporary message file
-        temp_file = f"/tmp/yolo_dm_{username}_{int(time.time())}.json"
-        with open(temp_file, 'w') as f:
-            json.dump({
-                'username': username,
-                'message': message,
-                'timestamp': datetime.now().isoformat()
-            }, f)
-        
-        # Call the Instagram DM script
-        script_path = os.path.join(os.path.dirname(__file__), 'send_instagram_dm.py')
-        process = subprocess.Popen(
-            ['python', script_path, username, temp_file],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Wait for up to 120 seconds
-        try:
-            stdout, stderr = process.communicate(timeout=120)
-            
-            # Clean up temp file
-            os.unlink(temp_file)
-            
-            # Check result
-            if stdout:
-                result = json.loads(stdout)
-                if result.get('success'):
-                    progress_update_yolo("dm_sent", f"Instagram DM sent successfully to {username}")
-                    return True
-        except subprocess.TimeoutExpired:
-            process.kill()
-            os.unlink(temp_file)
-            # Assume success if timeout (based on previous fix)
-            progress_update_yolo("dm_sent", f"Instagram DM likely sent to {username} (timeout)")
+        result = await send_dm_via_worker(username, message, timeout=120)
+        if result.get('success'):
+            progress_update_yolo("dm_sent", f"Instagram DM sent successfully to {username}", 
+                               {"username": username, "elapsed": result.get('elapsed'), "path": result.get('path')}, 
+                               check_stop=False)
             return True
-            
+        if result.get('existing_thread'):
+            raise SendRefused(result.get('error'))
+        progress_update_yolo("error", f"Failed to send DM to {username}: {result.get('error')}", check_stop=False)
+    except SendRefused:
+        raise
+    except asyncio.TimeoutError:
+        # Assume success if timeout (based on previous fix)
+        progress_update_yolo("dm_sent", f"Instagram DM likely sent to {username} (timeout)", check_stop=False)
+        return True
     except Exception as e:
-        progress_update_yolo("error", f"Failed to send DM to {username}: {e}")
-        if os.path.exists(temp_file):
-            os.unlink(temp_file)
+        progress_update_yolo("error", f"Failed to send DM to {username}: {e}", check_stop=False)
     
     return False
 
-async def check_if_influencer(username: str, ctrl: Controller) -> bool:
-    """Check if user is an influencer using browser automation."""
-    browser = Browser(
-        config=BrowserConfig(
-            browser_binary_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
-            chrome_profile_path='/Users/macbook/Library/Application Support/Google/Chrome/Default'
-        )
-    )
+def outbox_senders() -> Dict[str, Callable[[Dict[str, Any]], Awaitable[bool]]]:
+    """Channel senders used by the delivery worker to send outbox messages."""
+    async def send_email_item(item: Dict[str, Any]) -> bool:
+        payload = item['payload']
+        return await send_email(payload['to'], payload['subject'], payload['body'], item['username'])
     
+    async def send_dm_item(item: Dict[str, Any]) -> bool:
+        return await send_instagram_dm(item['username'], item['payload']['body'])
+    
+    return {"email": send_email_item, "dm": send_dm_item}
+
+async def check_if_influencer(username: str, engine: VerificationEngine, 
+                              db: DatabaseHelper) -> Optional[bool]:
+    """
+    Check if user is an influencer using browser automation.
+    
+    Returns None if the check failed; the failure is recorded and the check
+    retried in a later run.
+    """
     try:
-        async with await browser.new_context() as ctx:
-            agent = Agent(
-                task=get_view_count.format(username=username),
-                llm=ChatOpenAI(model='gpt-4o'),
-                browser=browser,
-                controller=ctrl,
-            )
-            history = await agent.run()
-            data = Influencer.model_validate_json(history.final_result())
-            return data.is_influencer
+        data = await engine.check(username)
+        return data.is_influencer
+    except BudgetExhausted:
+        raise
     except Exception as e:
-        progress_update_yolo("error", f"Failed to check influencer status for {username}: {e}")
-        return False
-    finally:
-        await browser.close()
+        retry = await schedule_retry(db, username, e)
+        progress_update_yolo("error", f"Failed to check influencer status for {username} ({retry['error_class']}): {e}", 
+                           {"username": username, "error": str(e), **retry})
+        return None
 
-async def yolo_process():
-    """Main YOLO automated outreach process."""
+async def yolo_process(resume: bool = False, engine: Optional[VerificationEngine] = None):
+    """Main YOLO automated outreach process; a given verification engine is reused and left open."""
     progress_update_yolo("start", "Starting YOLO automated outreach process...", {"percent": 5})
     db = DatabaseHelper()
+    campaign = get_campaign("yolo")
+    ledger = None
+    # Candidate, generation and delivery tasks, cancelled if the run ends early
+    tasks: List[asyncio.Task] = []
+    # Time, LLM, Apify, browser check and send limits of this run (BUDGET_* variables
+    # and the campaign's own limits)
+    budget = start_budget(campaign.new_budget())
     
     try:
-        # Step 1: Get usernames from hashtags (5-15%)
+        # Step 1: Get usernames from hashtags (5-15%). A resumed run reuses the
+        # usernames of the interrupted run and skips candidates it already finished.
         progress_update_yolo("discovery", "Discovering new influencers from hashtags...", {"percent": 5})
-        usernames = await get_usernames()
+        ledger = await RunLedger.begin(campaign.progress_id, get_usernames, resume=resume, db=db)
+        
+        def finished(username: str) -> bool:
+            return ledger.done(username, "queued") or ledger.get(username, "checked") is False
+        
+        usernames = [username for username in ledger.usernames if not finished(username)]
+        
+        # Drop candidates that were already contacted or checked as non-influencers
+        # in bulk, before any browser or LLM work
+        contacts = ContactIndex(db)
+        await asyncio.to_thread(contacts.preload, usernames)
+        usernames, contacted, not_influencers = contacts.partition(usernames)
+        if contacted or not_influencers:
+            progress_update_yolo("discovery", f"Skipping {len(contacted)} already contacted and {len(not_influencers)} known non-influencers", 
+                               {"contacted": len(contacted), "not_influencers": len(not_influencers)})
+        
+        # Another campaign running in this process may be contacting some of them right now
+        usernames, taken = claim_usernames(usernames, campaign.progress_id)
+        if taken:
+            progress_update_yolo("discovery", f"Skipping {len(taken)} candidates other campaigns are already handling", 
+                               {"taken": len(taken), "campaigns": sorted(set(taken.values()))})
+        
+        if ledger.resumed:
+            progress_update_yolo("resume", f"Resuming run {ledger.run_id}: {len(ledger.usernames) - len(usernames)} of {len(ledger.usernames)} candidates already done", 
+                               {"run_id": ledger.run_id, "done": len(ledger.usernames) - len(usernames), 
+                                "total": len(ledger.usernames)})
         progress_update_yolo("discovery", f"Found {len(usernames)} potential influencers", 
-                           {"count": len(usernames), "percent": 15})
+                           {"count": len(usernames), "run_id": ledger.run_id, "percent": 15})
         
         # Step 2: Get user profiles (15-25%)
         progress_update_yolo("profiles", "Fetching user profiles...", {"percent": 15})
@@ -228,113 +502,255 @@ async def yolo_process():
         # Step 4: Check influencer status and send outreach (35-95%)
         progress_update_yolo("outreach", "Starting automated outreach...", {"percent": 35})
         
-        ctrl = Controller(output_model=Influencer)
-        total_sent = 0
-        email_sent = 0
-        dm_sent = 0
+        own_engine = engine is None
+        engine = engine or VerificationEngine(get_view_count, Influencer)
+        
+        # In data mode most candidates are decided from scraped reel metrics up front
+        verdicts = {}
+        if QUALIFY_MODE == "data":
+            unchecked = [username for username in usernames 
+                         if not ledger.done(username, "checked") and contacts.verdict(username) is None]
+            verdicts = await qualify_by_post_data(unchecked, progress=progress_update_yolo)
+        stats = {"queued": 0, "generating": 0, "processed": 0}
         
         # Calculate progress per user
         progress_per_user = 60 / len(usernames) if usernames else 0
-        current_progress = 35
         
-        for username in usernames:
+        # Drafts are generated ahead of sending: checks keep running while earlier
+        # drafts are being generated, and generated messages go to the outbox,
+        # which the delivery worker drains independently. The semaphore bounds
+        # how many generation batches can be in flight at once.
+        generation_slots = asyncio.Semaphore(GENERATION_CONCURRENCY)
+        generation_tasks = []
+        generation_buffer: List[Dict[str, Any]] = []
+        
+        # Stored drafts are checked first; only missing or stale ones are generated
+        drafts = DraftStore(message_version(), db)
+        await asyncio.to_thread(drafts.preload, usernames)
+        
+        # The worker also delivers anything left in the outbox by an earlier run
+        delivery = DeliveryWorker(outbox_senders(), db, progress=progress_update_yolo, 
+                                  on_delivered=contacts.mark_sent)
+        generation_done = asyncio.Event()
+        delivery_task = asyncio.create_task(delivery.run(generation_done))
+        tasks.append(delivery_task)
+        
+        def outbox_backlog() -> int:
+            """Messages queued in this run that the worker hasn't handled yet."""
+            handled = sum(sum(channel_stats.values()) for channel_stats in delivery.stats.values())
+            return max(0, stats["queued"] - handled)
+        
+        async def generate_drafts(batch: List[Dict[str, Any]]):
+            """Generate message drafts for a batch and queue them for delivery."""
+            try:
+                # The draft store saves new drafts right away, so a crash before
+                # sending doesn't lose the generation
+                budget.check("llm_usd", "llm_tokens")
+                messages = await generate_messages(batch, drafts)
+                
+                for profile in batch:
+                    username = profile['username']
+                    message_data = messages[username]
+                    email = profile.get('email')
+                    if email and email != "null":
+                        channel = "email"
+                        payload = {"to": email, "subject": message_data['subject'], "body": message_data['body']}
+                    else:
+                        channel = "dm"
+                        payload = {"subject": message_data['subject'], "body": message_data['body']}
+                    
+                    if await asyncio.to_thread(db.enqueue_outbox, username, channel, payload):
+                        stats["queued"] += 1
+                        progress_update_yolo("generating", f"Queued {channel} for {username}", 
+                                           {"username": username, "channel": channel, "queued": outbox_backlog()})
+                    contacts.mark_queued(username)
+                    await ledger.record(username, "queued", channel)
+            except BudgetExhausted as e:
+                progress_update_yolo("stopping", f"Not generating messages for {len(batch)} influencers: {e}", 
+                                   {"usernames": [profile['username'] for profile in batch]})
+            finally:
+                stats["generating"] -= len(batch)
+                generation_slots.release()
+        
+        async def flush_generation_buffer():
+            """Start generating the buffered influencers as one batch."""
+            if not generation_buffer:
+                return
+            batch = generation_buffer[:]
+            generation_buffer.clear()
+            await generation_slots.acquire()
+            stats["generating"] += len(batch)
+            generation_tasks.append(asyncio.create_task(generate_drafts(batch)))
+            tasks.append(generation_tasks[-1])
+        
+        def current_progress() -> float:
+            return 35 + stats["processed"] * progress_per_user
+        
+        async def process_candidate(username: str):
+            """Check one candidate and buffer it for generation if it's an influencer."""
             profile = user_profiles.get(username, {})
             
-            # Check if already contacted
-            existing = db.get_profiles_by_usernames([username])
-            if existing.get(username, {}).get('email_sent') or existing.get(username, {}).get('dm_sent'):
+            # Candidates are started best first, so the ones left over when a
+            # budget runs out are the lowest-value ones
+            if budget.exhausted():
+                stats["processed"] += 1
+                return
+            
+            # Check if already contacted (another candidate path may have queued them meanwhile)
+            if contacts.is_contacted(username):
+                stats["processed"] += 1
                 progress_update_yolo("skip", f"Skipping {username} - already contacted", 
-                                   {"username": username, "percent": current_progress})
-                current_progress += progress_per_user
-                continue
+                                   {"username": username, "percent": current_progress()})
+                return
             
             # Check if influencer
             progress_update_yolo("checking", f"Checking if {username} is an influencer...", 
-                               {"username": username, "percent": current_progress})
+                               {"username": username, "percent": current_progress()})
             
-            is_influencer = await check_if_influencer(username, ctrl)
-            
-            # Save influencer status
-            db.save_influencer(
-                username=username,
-                is_influencer=is_influencer,
-                full_name=profile.get('full_name'),
-                bio=profile.get('bio'),
-                email=profile.get('email'),
-                checked_influencer=True
-            )
+            if ledger.done(username, "checked"):
+                # Checked and saved before the interruption, but never queued
+                is_influencer = ledger.get(username, "checked")
+            elif contacts.verdict(username) is not None:
+                # Checked by an earlier run
+                is_influencer = contacts.verdict(username)
+            else:
+                is_influencer = verdicts.get(username)
+                if is_influencer is None:
+                    try:
+                        is_influencer = await check_if_influencer(username, engine, db)
+                    except BudgetExhausted:
+                        stats["processed"] += 1
+                        return
+                if is_influencer is None:
+                    stats["processed"] += 1
+                    progress_update_yolo("skip", f"Skipping {username} - check failed, retry scheduled", 
+                                       {"username": username, "percent": current_progress()})
+                    return
+                await asyncio.to_thread(db.resolve_verification_retries, {username: is_influencer})
+                
+                # Save influencer status
+                await asyncio.to_thread(
+                    db.save_influencer,
+                    username=username,
+                    is_influencer=is_influencer,
+                    full_name=profile.get('full_name'),
+                    bio=profile.get('bio'),
+                    email=profile.get('email'),
+                    checked_influencer=True
+                )
+                contacts.mark_checked(username, is_influencer)
+                await ledger.record(username, "checked", is_influencer)
             
+            stats["processed"] += 1
             if not is_influencer:
                 progress_update_yolo("skip", f"{username} is not an influencer", 
-                                   {"username": username, "percent": current_progress + progress_per_user * 0.5})
-                current_progress += progress_per_user
-                continue
+                                   {"username": username, "percent": current_progress(),
+                                    "verification": engine.stats()})
+                return
             
-            # Generate personalized message
+            # Generate personalized messages in the background while checks continue.
+            # Batches are flushed when full, or right away if the delivery worker
+            # would otherwise sit idle waiting for a message.
             progress_update_yolo("generating", f"Generating message for {username}...", 
-                               {"username": username, "percent": current_progress + progress_per_user * 0.5})
-            
-            message_data = await generate_email_for_influencer(profile)
-            
-            # Send outreach
-            email = profile.get('email')
-            if email and email != "null":
-                # Send email
-                success = await send_email(email, message_data['subject'], message_data['body'], username)
-                if success:
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE influencers SET email_sent = 1, email_sent_at = datetime('now'), "
-                        "email_subject = ?, email_body = ? WHERE username = ?",
-                        (message_data['subject'], message_data['body'], username)
-                    )
-                    conn.commit()
-                    conn.close()
-                    email_sent += 1
-                    total_sent += 1
-            else:
-                # Send Instagram DM
-                success = await send_instagram_dm(username, message_data['body'])
-                if success:
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE influencers SET dm_sent = 1, dm_sent_at = datetime('now'), "
-                        "dm_message = ? WHERE username = ?",
-                        (message_data['body'], username)
-                    )
-                    conn.commit()
-                    conn.close()
-                    dm_sent += 1
-                    total_sent += 1
-            
-            current_progress += progress_per_user
-            progress_update_yolo("progress", f"Processed {username}", 
-                               {"username": username, "percent": min(current_progress, 95)})
-            
-            # Small delay between outreach
-            await asyncio.sleep(2)
+                               {"username": username, "percent": current_progress(),
+                                "verification": engine.stats()})
+            generation_buffer.append({**profile, 'username': username})
+            if (len(generation_buffer) >= GENERATION_BATCH_SIZE or 
+                    (outbox_backlog() == 0 and stats["generating"] == 0)):
+                await flush_generation_buffer()
+        
+        # Candidates are checked concurrently on the engine's context pool
+        candidate_tasks = [asyncio.create_task(process_candidate(username)) for username in usernames]
+        tasks.extend(candidate_tasks)
+        try:
+            await asyncio.gather(*candidate_tasks)
+        finally:
+            if own_engine:
+                await engine.close()
+        
+        # Wait for the remaining drafts, then let the worker drain the outbox
+        await flush_generation_buffer()
+        await asyncio.gather(*generation_tasks)
+        generation_done.set()
+        delivery_stats = await delivery_task
+        
+        smtp_stats = await close_smtp_sender()
+        
+        email_sent = delivery_stats.get("email", {}).get("sent", 0)
+        dm_sent = delivery_stats.get("dm", {}).get("sent", 0)
+        total_sent = email_sent + dm_sent
+        
+        outbox_counts = await asyncio.to_thread(db.get_outbox_counts)
         
         # Final summary
         progress_update_yolo("complete", 
                            f"YOLO process complete! Sent {total_sent} messages ({email_sent} emails, {dm_sent} DMs)", 
-                           {"total_sent": total_sent, "email_sent": email_sent, "dm_sent": dm_sent, "percent": 100})
+                           {"total_sent": total_sent, "email_sent": email_sent, "dm_sent": dm_sent, 
+                            "drafts_reused": drafts.hits, "drafts_generated": drafts.misses, 
+                            "delivery": delivery_stats, "outbox": outbox_counts, 
+                            "smtp": smtp_stats, "verification": engine.stats(), 
+                            "budget": budget.summary(), "rate_limits": get_rate_limiter().stats(), 
+                            "percent": 100})
+        # A run cut short by its budget can be resumed with the rest of its candidates
+        await ledger.finish("stopped" if budget.stopped_by else "completed")
         
+    except BudgetExhausted as e:
+        progress_update_yolo("stopped", f"YOLO process stopped: {e}", {"budget": budget.summary()})
+        if ledger:
+            await ledger.finish("stopped")
+        raise
+    except StopRequested:
+        if ledger:
+            await ledger.finish("stopped")
+        raise
     except Exception as e:
         progress_update_yolo("error", f"YOLO process failed: {str(e)}", {"error": str(e)})
+        if ledger:
+            await ledger.finish("failed")
         raise
+    finally:
+        # Nothing of this run keeps going after it ends (messages being
+        # delivered stay in the outbox for the next run)
+        for task in tasks:
+            task.cancel()
+        # Also collects what finished tasks raised (e.g. a stop hit while queueing)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        release_usernames(campaign.progress_id)
 
-async def main():
+async def main(resume: bool = False, engine: Optional[VerificationEngine] = None):
     """Main entry point."""
+    # Everything this run reports, also from the outreach helpers, goes to its monitor
+    monitor = progress_monitor.current_monitor("yolo")
+    progress_monitor.use_monitor(monitor)
+    
+    # Record anything that blocks the event loop in the progress data
+    lag_monitor = LoopLagMonitor.from_env()
+    if lag_monitor:
+        lag_monitor.start(monitor)
+    
     try:
-        await yolo_process()
-        monitor.mark_complete("YOLO process completed successfully")
+        # Make sure the draft and DM tracking columns exist before the run
+        await asyncio.to_thread(check_db_columns)
+        await yolo_process(resume=resume, engine=engine)
+        monitor.mark_complete("YOLO process completed successfully", 
+                              {"llm_cassette": cassette_stats(), "budget": get_budget().summary()})
+    except BudgetExhausted as e:
+        # Ran out of budget before any candidate could be processed (e.g. during discovery)
+        monitor.mark_complete(f"YOLO process stopped: {e}", {"budget": get_budget().summary()})
+    except StopRequested:
+        monitor.mark_stopped("YOLO process stopped on request", {"budget": get_budget().summary()})
     except KeyboardInterrupt:
         monitor.mark_failed("Process interrupted by user")
     except Exception as e:
         monitor.mark_failed(f"Process failed: {str(e)}")
         raise
+    finally:
+        if lag_monitor:
+            await lag_monitor.stop()
+        # Runs given an engine share the process's clients with other runs
+        if engine is None:
+            await close_clients()
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    # --resume picks up the last interrupted run instead of starting a new one
+    asyncio.run(main(resume='--resume' in sys.argv[1:]))
\ No newline at end of file